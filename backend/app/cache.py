@@ -0,0 +1,93 @@
+"""Bounded in-process cache with LRU and TTL eviction.
+
+Each cache counts hits, misses and evictions. The counts are kept on the
+instance (``stats()``) and are also exported to Prometheus when
+``prometheus_client`` is installed. Entries are keyed by tuples whose first
+element is the owning tenant (company id), so ``invalidate(company_id)`` can
+drop a single tenant's entries.
+
+The cache is per process. Writes made through the app invalidate it
+explicitly; the TTL bounds staleness for writes made elsewhere, e.g. by
+another worker or by a script.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+try:
+    from prometheus_client import Counter
+except Exception:  # pragma: no cover - optional dependency
+    Counter = None
+
+if Counter is not None:
+    _EVENTS = Counter("app_cache_events_total", "In-process cache lookups and evictions", ["cache", "event"])
+else:  # pragma: no cover - optional dependency
+    _EVENTS = None
+
+
+class TTLCache:
+    """Thread-safe LRU mapping whose entries also expire ``ttl`` seconds
+    after they were stored."""
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts = {"hit": 0, "miss": 0, "eviction": 0}
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _count(self, event: str, n: int = 1) -> None:
+        self._counts[event] += n
+        if _EVENTS is not None:
+            _EVENTS.labels(cache=self.name, event=event).inc(n)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for ``key``, or None on a miss."""
+        if self.maxsize <= 0:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > now:
+                self._data.move_to_end(key)
+                self._count("hit")
+                return entry[1]
+            if entry is not None:
+                del self._data[key]
+                self._count("eviction")
+            self._count("miss")
+            return None
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store ``value``; ``ttl`` overrides the cache-wide lifetime for
+        this entry."""
+        if self.maxsize <= 0:
+            return
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._count("eviction")
+
+    def invalidate(self, company_id: Optional[int] = None) -> None:
+        """Drop the entries of ``company_id``, or every entry.
+
+        Explicit invalidation is not counted as an eviction.
+        """
+        with self._lock:
+            if company_id is None:
+                self._data.clear()
+                return
+            for key in [k for k in self._data if k[0] == company_id]:
+                del self._data[key]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts, size=len(self._data))
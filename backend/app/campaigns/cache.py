@@ -0,0 +1,26 @@
+"""Read-through caches for campaign detail payloads and list pages.
+
+Detail entries are keyed by ``(company_id, campaign name)`` and list pages
+by ``(company_id, <normalized query parameters>)``. Both hold
+JSON-ready payloads, not ORM objects, so a hit never touches a session.
+``app.campaigns.crud`` write paths and the seed loader call ``invalidate``;
+ORM writes from any session also drop their companies' entries when the
+transaction commits (see ``app.campaigns.models``).
+"""
+import os
+from typing import Optional
+
+from ..cache import TTLCache
+
+CAMPAIGN_CACHE_TTL_SECONDS = float(os.getenv("CAMPAIGN_CACHE_TTL_SECONDS", "60"))
+# 0 disables caching.
+CAMPAIGN_CACHE_MAX_ENTRIES = int(os.getenv("CAMPAIGN_CACHE_MAX_ENTRIES", "1024"))
+
+detail_cache = TTLCache("campaign_detail", CAMPAIGN_CACHE_MAX_ENTRIES, CAMPAIGN_CACHE_TTL_SECONDS)
+page_cache = TTLCache("campaign_list", CAMPAIGN_CACHE_MAX_ENTRIES, CAMPAIGN_CACHE_TTL_SECONDS)
+
+
+def invalidate(company_id: Optional[int] = None) -> None:
+    """Drop cached detail and list entries of ``company_id``, or of every company."""
+    detail_cache.invalidate(company_id)
+    page_cache.invalidate(company_id)
@@ -1,11 +1,23 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from datetime import datetime
-from typing import Optional
-from ..campaigns import models
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import and_, or_, tuple_, func, literal_column, select
+from datetime import date, datetime, time, timedelta
+from typing import Any, Iterator, List, Optional, Tuple
+from ..campaigns import models, schemas, intervals, cache
+from .. import query_plans
 import logging
 
 
+# Stable sort key for campaign listings. Keyset pagination relies on it and it
+# is served by the (company_id, fecha_inicio, name) index declared on the model.
+CAMPAIGN_SORT_KEY = (models.Campaign.fecha_inicio, models.Campaign.name)
+
+# Columns returned by projected listings: exactly the fields of the API schema
+LIST_COLUMNS = tuple(getattr(models.Campaign, field) for field in schemas.Campaign.model_fields)
+_LIST_KEYS = tuple(column.key for column in LIST_COLUMNS)
+PERIOD_COLUMNS = tuple(getattr(models.CampaignPeriod, field) for field in schemas.CampaignPeriod.model_fields)
+SITE_COLUMNS = tuple(getattr(models.CampaignSite, field) for field in schemas.CampaignSite.model_fields)
+
+
 def get_campaigns(
     db: Session,
     skip: int = 0,
@@ -31,6 +43,264 @@ def get_campaigns_for_company(
 ):
     logger = logging.getLogger("app.campaigns.crud")
     logger.debug("get_campaigns_for_company", extra={"company_id": company_id, "skip": skip, "limit": limit, "tipo_campania": tipo_campania})
+    query = _company_campaigns_query(db, company_id, tipo_campania, start_date, end_date)
+    return query.order_by(*CAMPAIGN_SORT_KEY).offset(skip).limit(limit).all()
+
+
+def get_campaigns_after_for_company(
+    db: Session,
+    company_id: int,
+    after: Optional[Tuple[Optional[date], str]] = None,
+    limit: int = 10,
+    tipo_campania: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
+):
+    """Keyset variant of ``get_campaigns_for_company``.
+
+    ``after`` is the ``(fecha_inicio, name)`` key of the last row the client
+    has already seen. Returns ``(campaigns, next_key)`` where ``next_key`` is
+    None on the last page.
+    """
+    campaigns, _, next_key = get_campaigns_page_for_company(
+        db,
+        company_id,
+        after=after,
+        limit=limit,
+        tipo_campania=tipo_campania,
+        start_date=start_date,
+        end_date=end_date,
+        count="none",
+    )
+    return campaigns, next_key
+
+
+def get_campaigns_page_for_company(
+    db: Session,
+    company_id: int,
+    skip: int = 0,
+    limit: int = 10,
+    after: Optional[Tuple[Optional[date], str]] = None,
+    tipo_campania: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    count: str = "exact",
+    projected: bool = False
+) -> Tuple[List[Any], Optional[int], Optional[Tuple[Optional[date], str]]]:
+    """Fetch one listing page together with its total.
+
+    Returns ``(campaigns, total, next_key)``. One extra row is fetched to know
+    whether a further page exists, so ``next_key`` is exact in every mode.
+
+    With ``projected=True`` only ``LIST_COLUMNS`` are selected and campaigns
+    come back as plain dicts ready for JSON encoding, skipping ORM identity
+    map and attribute instrumentation.
+
+    ``count`` selects how ``total`` is produced:
+
+    - ``exact``: the total rides along with the page as an uncorrelated
+      ``(SELECT count(*) ... )`` column, so page and total cost one round
+      trip. The database evaluates it once, from the covering index, and it
+      ignores the keyset predicate, so it also works for cursor pages. (A
+      ``COUNT(*) OVER ()`` window would force every matching row to be
+      materialized before LIMIT applies.)
+    - ``estimate``: the planner's row estimate on PostgreSQL; other dialects
+      have no cheap estimate and fall back to ``exact``.
+    - ``none``: no count at all; ``total`` is None.
+    """
+    rows, total, next_key, _ = _campaigns_page(
+        db, company_id, skip, limit, after, tipo_campania, start_date, end_date, count, projected
+    )
+    return rows, total, next_key
+
+
+def get_stamped_campaigns_page_for_company(
+    db: Session,
+    company_id: int,
+    skip: int = 0,
+    limit: int = 10,
+    after: Optional[Tuple[Optional[date], str]] = None,
+    tipo_campania: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    count: str = "exact"
+) -> Tuple[List[dict], Optional[int], Optional[Tuple[Optional[date], str]], Tuple[tuple, Optional[datetime]]]:
+    """Projected ``get_campaigns_page_for_company`` plus the page's version
+    stamp (see ``get_campaigns_page_stamp_for_company``), in the same query."""
+    return _campaigns_page(
+        db, company_id, skip, limit, after, tipo_campania, start_date, end_date, count,
+        projected=True, stamped=True
+    )
+
+
+def _campaigns_page(
+    db: Session,
+    company_id: int,
+    skip: int = 0,
+    limit: int = 10,
+    after: Optional[Tuple[Optional[date], str]] = None,
+    tipo_campania: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    count: str = "exact",
+    projected: bool = False,
+    stamped: bool = False
+):
+    logger = logging.getLogger("app.campaigns.crud")
+    logger.debug("get_campaigns_page_for_company", extra={"company_id": company_id, "skip": skip, "after": str(after), "limit": limit, "tipo_campania": tipo_campania, "count": count})
+    base = _company_campaigns_query(db, company_id, tipo_campania, start_date, end_date)
+    if count == "estimate" and db.get_bind().dialect.name != "postgresql":
+        count = "exact"
+    inline_total = count == "exact"
+
+    query = base.with_entities(*LIST_COLUMNS) if projected else base
+    if projected and stamped:
+        # Trailing extras are dropped by zip() with the column keys below
+        query = query.add_columns(models.Campaign.version, models.Campaign.updated_at)
+    if after is not None:
+        query = query.filter(_after_key_filter(db, after))
+    if inline_total:
+        total_subquery = base.with_entities(func.count()).order_by(None).correlate(None).scalar_subquery()
+        query = query.add_columns(total_subquery.label("total"))
+    query = query.order_by(*CAMPAIGN_SORT_KEY)
+    if after is None:
+        query = query.offset(skip)
+    rows = query.limit(limit + 1).all()
+
+    total = None
+    if inline_total:
+        if rows:
+            total = rows[0].total
+            if not projected:
+                # Projected rows keep the trailing total; zip() with the
+                # column keys drops it below.
+                rows = [row[0] for row in rows]
+        elif skip == 0 and after is None:
+            total = 0
+        else:
+            # Past the last page the total has no row to ride on
+            total = _count(base)
+    elif count == "estimate":
+        total = _estimate_count(db, base)
+
+    stamp = _page_stamp(rows, total) if stamped else None
+    next_key = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_key = (rows[-1].fecha_inicio, rows[-1].name)
+    if projected:
+        rows = [dict(zip(_LIST_KEYS, row)) for row in rows]
+    return rows, total, next_key, stamp
+
+
+def get_campaigns_page_stamp_for_company(
+    db: Session,
+    company_id: int,
+    skip: int = 0,
+    limit: int = 10,
+    after: Optional[Tuple[Optional[date], str]] = None,
+    tipo_campania: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    count: str = "exact"
+) -> Tuple[tuple, Optional[datetime]]:
+    """Version stamp of the page ``get_campaigns_page_for_company`` would return.
+
+    Selects only ``(name, version, updated_at)`` of the same rows (plus the
+    total for ``count=exact``/``estimate``), so a conditional GET can be
+    answered without building the page. Returns ``(stamp, last_updated)``;
+    the stamp changes whenever any row or the total of the page would.
+    """
+    base = _company_campaigns_query(db, company_id, tipo_campania, start_date, end_date)
+    if count == "estimate" and db.get_bind().dialect.name != "postgresql":
+        count = "exact"
+    Campaign = models.Campaign
+    query = base.with_entities(Campaign.name, Campaign.version, Campaign.updated_at)
+    if after is not None:
+        query = query.filter(_after_key_filter(db, after))
+    query = query.order_by(*CAMPAIGN_SORT_KEY)
+    if after is None:
+        query = query.offset(skip)
+    rows = query.limit(limit + 1).all()
+    total = None
+    if count == "exact":
+        total = _count(base)
+    elif count == "estimate":
+        total = _estimate_count(db, base)
+    return _page_stamp(rows, total)
+
+
+def _page_stamp(rows, total) -> Tuple[tuple, Optional[datetime]]:
+    """``((total, ((name, version), ...)), max(updated_at))`` over a page's
+    rows, including the look-ahead row that decides ``next_key``."""
+    stamp = (total, tuple((row.name, row.version) for row in rows))
+    last_updated = max((row.updated_at for row in rows if row.updated_at is not None), default=None)
+    return stamp, last_updated
+
+
+def get_campaign_stamp_for_company(db: Session, campaign_id: str, company_id: int) -> Optional[Tuple[int, datetime]]:
+    """``(version, updated_at)`` of one campaign without loading it or its children."""
+    row = db.query(models.Campaign.version, models.Campaign.updated_at).filter(
+        models.Campaign.name == campaign_id,
+        models.Campaign.company_id == company_id
+    ).first()
+    return tuple(row) if row is not None else None
+
+
+def iter_campaigns_for_export(
+    db: Session,
+    company_id: int,
+    tipo_campania: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    include_children: bool = False,
+    batch_size: int = 500
+) -> Iterator[List[dict]]:
+    """Yield every matching campaign as plain dicts, ``batch_size`` at a time.
+
+    Campaigns are read from a server-side cursor (``stream_results`` +
+    ``yield_per``), so memory stays flat regardless of tenant size. With
+    ``include_children`` each dict also carries ``periods`` and ``sites``,
+    fetched with one ``IN`` query per table per batch.
+    """
+    statement = (
+        _company_campaigns_query(db, company_id, tipo_campania, start_date, end_date)
+        .with_entities(*LIST_COLUMNS)
+        .order_by(*CAMPAIGN_SORT_KEY)
+        .statement
+        .execution_options(stream_results=True, yield_per=batch_size)
+    )
+    for partition in db.execute(statement).partitions():
+        batch = [dict(zip(_LIST_KEYS, row)) for row in partition]
+        if include_children:
+            by_name = {campaign["name"]: campaign for campaign in batch}
+            for campaign in batch:
+                campaign["periods"] = []
+                campaign["sites"] = []
+            for key, model, columns in (
+                ("periods", models.CampaignPeriod, PERIOD_COLUMNS),
+                ("sites", models.CampaignSite, SITE_COLUMNS),
+            ):
+                keys = [column.key for column in columns]
+                children = db.execute(
+                    select(*columns)
+                    .where(model.campaign_name.in_(list(by_name)))
+                    .order_by(model.campaign_name, model.id)
+                    .execution_options(stream_results=True, yield_per=batch_size)
+                )
+                for row in children:
+                    child = dict(zip(keys, row))
+                    by_name[child["campaign_name"]][key].append(child)
+        yield batch
+
+
+def _company_campaigns_query(
+    db: Session,
+    company_id: int,
+    tipo_campania: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
+):
     query = db.query(models.Campaign).filter(models.Campaign.company_id == company_id)
     if tipo_campania:
         query = query.filter(models.Campaign.tipo_campania == tipo_campania)
@@ -41,7 +311,36 @@ def get_campaigns_for_company(
                 models.Campaign.fecha_fin >= start_date
             )
         )
-    return query.offset(skip).limit(limit).all()
+    return query
+
+
+def _after_key_filter(db: Session, after: Tuple[Optional[date], str]):
+    """Row-value ``(fecha_inicio, name) > after`` that honours NULL ordering.
+
+    A row-value comparison (rather than the equivalent OR expansion) lets
+    both SQLite and PostgreSQL turn the predicate into an index range seek.
+    SQLite sorts NULL dates first and PostgreSQL sorts them last, so the
+    NULL handling has to match whatever ORDER BY the dialect produces.
+    """
+    fecha, name = after
+    col_fecha, col_name = CAMPAIGN_SORT_KEY
+    nulls_last = db.get_bind().dialect.name == "postgresql"
+    if fecha is None:
+        same_null = and_(col_fecha.is_(None), col_name > name)
+        return same_null if nulls_last else or_(same_null, col_fecha.isnot(None))
+    greater = tuple_(col_fecha, col_name) > tuple_(fecha, name)
+    return or_(greater, col_fecha.is_(None)) if nulls_last else greater
+
+
+def _count(query) -> int:
+    # SELECT count(*) FROM campaigns WHERE ... -- unlike Query.count() this
+    # does not wrap the filtered SELECT in a subquery.
+    return query.with_entities(func.count()).order_by(None).scalar()
+
+
+def _estimate_count(db: Session, query) -> int:
+    """Return PostgreSQL's planner row estimate for ``query`` without running it."""
+    return query_plans.estimated_rows(db, query)
 
 
 def create_campaign(db: Session, campaign_in: dict, company_id: int):
@@ -52,13 +351,19 @@ def create_campaign(db: Session, campaign_in: dict, company_id: int):
     db.add(campaign)
     db.commit()
     db.refresh(campaign)
+    intervals.invalidate(company_id)
+    cache.invalidate(company_id)
     # Campaign primary key is 'name'
     logger.debug("create_campaign_done", extra={"campaign_name": campaign.name})
     return campaign
 
 
 def update_campaign(db: Session, campaign_id: str, update_data: dict, company_id: int):
-    campaign = get_campaign_for_company(db, campaign_id, company_id)
+    # Updates only touch campaign columns; skip loading periods and sites
+    campaign = db.query(models.Campaign).filter(
+        models.Campaign.name == campaign_id,
+        models.Campaign.company_id == company_id
+    ).first()
     if not campaign:
         return None
     for k, v in update_data.items():
@@ -66,6 +371,8 @@ def update_campaign(db: Session, campaign_id: str, update_data: dict, company_id
             setattr(campaign, k, v)
     db.commit()
     db.refresh(campaign)
+    intervals.invalidate(company_id)
+    cache.invalidate(company_id)
     logging.getLogger("app.campaigns.crud").info("update_campaign", extra={"campaign_id": campaign_id, "company_id": company_id, "changes": update_data})
     return campaign
 
@@ -77,6 +384,8 @@ def delete_campaign(db: Session, campaign_id: str, company_id: int):
     logging.getLogger("app.campaigns.crud").info("delete_campaign", extra={"campaign_id": campaign_id, "company_id": company_id})
     db.delete(campaign)
     db.commit()
+    intervals.invalidate(company_id)
+    cache.invalidate(company_id)
     return True
 
 def get_campaign(db: Session, campaign_id: str):
@@ -84,10 +393,61 @@ def get_campaign(db: Session, campaign_id: str):
 
 
 def get_campaign_for_company(db: Session, campaign_id: str, company_id: int):
-    return db.query(models.Campaign).filter(
+    # Load periods and sites with one SELECT ... WHERE campaign_name IN (...)
+    # each. joinedload on both collections would return
+    # len(periods) x len(sites) rows for SQLAlchemy to de-duplicate.
+    return db.query(models.Campaign).options(
+        selectinload(models.Campaign.periods),
+        selectinload(models.Campaign.sites),
+    ).filter(
+        models.Campaign.name == campaign_id,
+        models.Campaign.company_id == company_id
+    ).first()
+
+def get_campaign_stats_for_company(db: Session, campaign_id: str, company_id: int, top: int = 10):
+    """Chart aggregates for one campaign, computed with GROUP BY / ORDER BY ... LIMIT.
+
+    Mirrors what the detail view's site and period charts used to reduce in
+    the browser. Returns None when the campaign does not belong to the company.
+    """
+    exists = db.query(models.Campaign.name).filter(
         models.Campaign.name == campaign_id,
         models.Campaign.company_id == company_id
     ).first()
+    if exists is None:
+        return None
+    Site, Period = models.CampaignSite, models.CampaignPeriod
+    impactos = func.coalesce(func.sum(Site.impactos_mensuales), 0)
+    sites = func.count(Site.id)
+
+    by_mueble = db.query(
+        Site.tipo_de_mueble, sites, impactos, func.coalesce(func.sum(Site.alcance_mensual), 0.0)
+    ).filter(Site.campaign_name == campaign_id).group_by(Site.tipo_de_mueble).order_by(impactos.desc()).all()
+    by_estado = db.query(
+        Site.estado, sites, impactos
+    ).filter(Site.campaign_name == campaign_id).group_by(Site.estado).order_by(sites.desc(), Site.estado).all()
+    top_sites = db.query(
+        Site.codigo_del_sitio, func.coalesce(Site.impactos_mensuales, 0)
+    ).filter(Site.campaign_name == campaign_id).order_by(Site.impactos_mensuales.desc().nulls_last(), Site.id).limit(top).all()
+    periods = db.query(
+        Period.period,
+        func.coalesce(func.sum(Period.impactos_periodo_personas), 0),
+        func.coalesce(func.sum(Period.impactos_periodo_vehiculos), 0),
+    ).filter(Period.campaign_name == campaign_id).group_by(Period.period).order_by(Period.period).all()
+
+    return {
+        "campaign_name": campaign_id,
+        "total_sites": sum(row[1] for row in by_mueble),
+        "by_tipo_de_mueble": [
+            {"tipo_de_mueble": m, "sites": n, "impactos_mensuales": i, "alcance_mensual": a} for m, n, i, a in by_mueble
+        ],
+        "by_estado": [{"estado": e, "sites": n, "impactos_mensuales": i} for e, n, i in by_estado],
+        "top_sites": [{"codigo_del_sitio": c, "impactos_mensuales": i} for c, i in top_sites],
+        "periods": [
+            {"period": p, "impactos_periodo_personas": pe, "impactos_periodo_vehiculos": ve} for p, pe, ve in periods
+        ],
+    }
+
 
 def search_campaigns_by_date(
     db: Session,
@@ -117,6 +477,81 @@ def search_campaigns_by_date_for_company(
     ).all()
 
 
+def search_campaigns_by_date_page_for_company(
+    db: Session,
+    company_id: int,
+    start_date: datetime,
+    end_date: datetime,
+    after: Optional[Tuple[Optional[date], str]] = None,
+    limit: int = 100
+):
+    """Bounded, keyset-paginated variant of ``search_campaigns_by_date_for_company``.
+
+    Returns ``(campaigns, next_key)`` ordered by ``(fecha_inicio, name)``.
+    PostgreSQL answers the overlap through the GiST daterange index; other
+    dialects ask the per-company in-process interval tree for the page's
+    keys and then load just those rows by primary key.
+    """
+    logger = logging.getLogger("app.campaigns.crud")
+    logger.debug("search_campaigns_by_date_page_for_company", extra={"company_id": company_id, "after": str(after), "limit": limit})
+    first_day, last_day = _overlap_bounds(start_date, end_date)
+    if first_day > last_day:
+        return [], None
+    if after is not None and after[0] is None:
+        # Campaigns without dates never overlap, so the cursor is the start
+        after = None
+
+    if db.get_bind().dialect.name == "postgresql":
+        query = db.query(models.Campaign).filter(
+            models.Campaign.company_id == company_id,
+            _date_range(models.Campaign.fecha_inicio, models.Campaign.fecha_fin).op("&&")(
+                func.daterange(first_day, last_day, "[]")
+            ),
+            models.Campaign.fecha_inicio <= last_day,
+            models.Campaign.fecha_fin >= first_day,
+        )
+        if after is not None:
+            query = query.filter(tuple_(*CAMPAIGN_SORT_KEY) > tuple_(*after))
+        rows = query.order_by(*CAMPAIGN_SORT_KEY).limit(limit + 1).all()
+    else:
+        keys = intervals.get_company_index(db, company_id).overlapping(first_day, last_day, after=after, limit=limit + 1)
+        names = [name for _, name in keys]
+        by_name = {}
+        if names:
+            by_name = {
+                c.name: c
+                for c in db.query(models.Campaign).filter(
+                    models.Campaign.company_id == company_id,
+                    models.Campaign.name.in_(names),
+                )
+            }
+        rows = [by_name[name] for name in names if name in by_name]
+
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, (rows[-1].fecha_inicio, rows[-1].name)
+
+
+def _overlap_bounds(start_date: datetime, end_date: datetime) -> Tuple[date, date]:
+    """Translate datetime bounds into the inclusive day range they select.
+
+    ``fecha_fin >= start_date`` compares a date (midnight) with a datetime,
+    so a start with a time of day only matches campaigns ending the next day.
+    """
+    first_day = start_date.date() if isinstance(start_date, datetime) else start_date
+    if isinstance(start_date, datetime) and start_date.time() != time(0):
+        first_day += timedelta(days=1)
+    last_day = end_date.date() if isinstance(end_date, datetime) else end_date
+    return first_day, last_day
+
+
+def _date_range(start_col, end_col):
+    # Must match the indexed expression in migration 0006 exactly. LEAST /
+    # GREATEST keep rows with inverted dates from making daterange() raise.
+    return func.daterange(func.least(start_col, end_col), func.greatest(start_col, end_col), literal_column("'[]'"))
+
+
 def get_campaigns_count_for_company(
     db: Session,
     company_id: int,
@@ -124,14 +559,5 @@ def get_campaigns_count_for_company(
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None
 ):
-    query = db.query(models.Campaign).filter(models.Campaign.company_id == company_id)
-    if tipo_campania:
-        query = query.filter(models.Campaign.tipo_campania == tipo_campania)
-    if start_date and end_date:
-        query = query.filter(
-            and_(
-                models.Campaign.fecha_inicio <= end_date,
-                models.Campaign.fecha_fin >= start_date
-            )
-        )
-    return query.count()
+    query = _company_campaigns_query(db, company_id, tipo_campania, start_date, end_date)
+    return _count(query)
@@ -0,0 +1,58 @@
+"""Encoders for the streaming campaign export (CSV and NDJSON).
+
+Both take the batches produced by ``crud.iter_campaigns_for_export`` and
+yield one encoded chunk per batch, so a ``StreamingResponse`` never holds
+more than a batch in memory.
+"""
+import csv
+import io
+from typing import Iterable, Iterator, List
+
+from . import crud
+from ..responses import dumps
+
+CAMPAIGN_FIELDS = [column.key for column in crud.LIST_COLUMNS]
+# Child columns in the flat CSV layout; campaign_name is implied by `name`
+# and the `id` columns are prefixed so periods and sites do not collide.
+PERIOD_FIELDS = ["period_id" if c.key == "id" else c.key for c in crud.PERIOD_COLUMNS if c.key != "campaign_name"]
+SITE_FIELDS = ["site_id" if c.key == "id" else c.key for c in crud.SITE_COLUMNS if c.key != "campaign_name"]
+
+
+def ndjson_chunks(batches: Iterable[List[dict]]) -> Iterator[bytes]:
+    """One JSON object per line, one campaign (with any children) per object."""
+    for batch in batches:
+        yield b"".join(dumps(campaign) + b"\n" for campaign in batch)
+
+
+def _child_row(child: dict, id_field: str) -> dict:
+    row = {k: v for k, v in child.items() if k not in ("id", "campaign_name")}
+    row[id_field] = child["id"]
+    return row
+
+
+def csv_chunks(batches: Iterable[List[dict]], include_children: bool = False) -> Iterator[bytes]:
+    """Flat CSV. With children every row has a ``record_type`` of
+    ``campaign``, ``period`` or ``site``; child rows repeat only the
+    campaign ``name`` and leave the other campaign columns empty."""
+    fields = list(CAMPAIGN_FIELDS)
+    if include_children:
+        fields = ["record_type"] + fields + PERIOD_FIELDS + SITE_FIELDS
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    for batch in batches:
+        for campaign in batch:
+            if not include_children:
+                writer.writerow(campaign)
+                continue
+            writer.writerow(dict(campaign, record_type="campaign"))
+            for period in campaign["periods"]:
+                writer.writerow(dict(_child_row(period, "period_id"), record_type="period", name=campaign["name"]))
+            for site in campaign["sites"]:
+                writer.writerow(dict(_child_row(site, "site_id"), record_type="site", name=campaign["name"]))
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+    # Header-only exports still need the header flushed
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
@@ -0,0 +1,117 @@
+"""In-process interval index for campaign date-overlap searches.
+
+PostgreSQL answers overlap queries with a GiST index on a daterange
+expression (see migration 0006). Other dialects (SQLite) have no index that
+can serve ``fecha_inicio <= end AND fecha_fin >= start``, so each company's
+campaign date ranges are kept in a static interval tree built on first use
+and dropped whenever the company's campaigns change.
+"""
+import bisect
+import os
+import threading
+import time
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from . import models
+
+Key = Tuple[date, str]
+
+# Safety net for writes made by other processes (e.g. a second API worker or
+# the seed script); writes through app.campaigns.crud invalidate immediately.
+INTERVAL_INDEX_TTL_SECONDS = float(os.getenv("INTERVAL_INDEX_TTL_SECONDS", "300"))
+
+
+class IntervalIndex:
+    """Static interval tree over ``(start, end, name)`` triples.
+
+    Intervals are sorted by ``(start, name)`` -- the campaign listing order --
+    and viewed as an implicit balanced BST over that array: the node for the
+    slice ``[lo, hi)`` sits at ``(lo + hi) // 2`` and stores the maximum end
+    of its slice. A query walks the tree in order, pruning slices whose
+    maximum end is before the query start or whose starts are all after the
+    query end, so it costs O(log n + k) and yields matches already sorted.
+    """
+
+    def __init__(self, intervals: Iterable[Tuple[date, date, str]]):
+        ordered = sorted((start, name, end) for start, end, name in intervals)
+        self._keys: List[Key] = [(start, name) for start, name, _ in ordered]
+        self._starts = [start for start, _, _ in ordered]
+        self._ends = [end for _, _, end in ordered]
+        self._max_end: List[Optional[date]] = [None] * len(ordered)
+        self._build(0, len(ordered))
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _build(self, lo: int, hi: int) -> Optional[date]:
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2
+        best = self._ends[mid]
+        for child in (self._build(lo, mid), self._build(mid + 1, hi)):
+            if child is not None and child > best:
+                best = child
+        self._max_end[mid] = best
+        return best
+
+    def overlapping(self, start: date, end: date, after: Optional[Key] = None, limit: Optional[int] = None) -> List[Key]:
+        """Return ``(start, name)`` keys of intervals overlapping ``[start, end]``.
+
+        Keys come back in ascending order, strictly after ``after`` when
+        given, and at most ``limit`` of them.
+        """
+        first = bisect.bisect_right(self._keys, after) if after is not None else 0
+        out: List[Key] = []
+        cap = limit if limit is not None else len(self._keys)
+
+        def visit(lo: int, hi: int) -> None:
+            if lo >= hi or hi <= first or len(out) >= cap:
+                return
+            mid = (lo + hi) // 2
+            if self._max_end[mid] < start:
+                return
+            if mid > first:
+                visit(lo, mid)
+            if len(out) >= cap or self._starts[mid] > end:
+                return
+            if mid >= first and self._ends[mid] >= start:
+                out.append(self._keys[mid])
+            visit(mid + 1, hi)
+
+        visit(0, len(self._keys))
+        return out
+
+
+_indexes: Dict[int, Tuple[float, IntervalIndex]] = {}
+_lock = threading.Lock()
+
+
+def get_company_index(db: Session, company_id: int) -> IntervalIndex:
+    """Return the interval index for ``company_id``, building it if needed."""
+    now = time.monotonic()
+    with _lock:
+        cached = _indexes.get(company_id)
+    if cached is not None and now - cached[0] < INTERVAL_INDEX_TTL_SECONDS:
+        return cached[1]
+    Campaign = models.Campaign
+    rows = db.query(Campaign.fecha_inicio, Campaign.fecha_fin, Campaign.name).filter(
+        Campaign.company_id == company_id,
+        Campaign.fecha_inicio.isnot(None),
+        Campaign.fecha_fin.isnot(None),
+    ).all()
+    index = IntervalIndex(rows)
+    with _lock:
+        _indexes[company_id] = (now, index)
+    return index
+
+
+def invalidate(company_id: Optional[int] = None) -> None:
+    """Drop the cached index of ``company_id``, or of every company."""
+    with _lock:
+        if company_id is None:
+            _indexes.clear()
+        else:
+            _indexes.pop(company_id, None)
@@ -1,8 +1,14 @@
-from sqlalchemy import Column, String, Float, Integer, Date, ForeignKey
-from sqlalchemy.orm import relationship
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, String, Float, Integer, Date, DateTime, ForeignKey, Index, event, func, update
+from sqlalchemy.orm import Session, attributes, relationship
 from ..database import Base
 
 
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+
 class Campaign(Base):
     __tablename__ = "campaigns"
     name = Column(String, primary_key=True)
@@ -38,10 +44,25 @@ class Campaign(Base):
     hombres = Column(Float)
     mujeres = Column(Float)
 
+    # Bumped on every change to the campaign or to its periods and sites
+    # (see _bump_campaign_versions); drives ETag / Last-Modified.
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=_utcnow, server_default=func.now())
+
     # Relationships
     periods = relationship("CampaignPeriod", back_populates="campaign")
     sites = relationship("CampaignSite", back_populates="campaign")
 
+    __table_args__ = (
+        # Serves tenant-scoped listings ordered by the keyset (fecha_inicio, name)
+        # and the fecha_inicio side of date-overlap searches
+        Index("ix_campaigns_company_fecha_inicio_name", "company_id", "fecha_inicio", "name"),
+        # Same ordering for listings filtered by tipo_campania
+        Index("ix_campaigns_company_tipo_fecha_inicio_name", "company_id", "tipo_campania", "fecha_inicio", "name"),
+        # fecha_fin side of date-overlap searches
+        Index("ix_campaigns_company_fecha_fin", "company_id", "fecha_fin"),
+    )
+
 
 class CampaignPeriod(Base):
     __tablename__ = "campaign_periods"
@@ -54,6 +75,11 @@ class CampaignPeriod(Base):
 
     campaign = relationship("Campaign", back_populates="periods")
 
+    __table_args__ = (
+        # Detail loads by campaign and the seed's (name, period) existence check
+        Index("ix_campaign_periods_campaign_name_period", "campaign_name", "period"),
+    )
+
 
 class CampaignSite(Base):
     __tablename__ = "campaign_sites"
@@ -73,3 +99,62 @@ class CampaignSite(Base):
     alcance_mensual = Column(Float)
 
     campaign = relationship("Campaign", back_populates="sites")
+
+    __table_args__ = (
+        # Detail loads by campaign and the seed's (name, codigo_del_sitio) existence check
+        Index("ix_campaign_sites_campaign_name_codigo", "campaign_name", "codigo_del_sitio"),
+    )
+
+
+# session.info key of the companies whose cached payloads go stale when
+# the session's transaction commits
+_STALE_COMPANIES = "campaigns_stale_companies"
+
+
+@event.listens_for(Session, "before_flush")
+def _bump_campaign_versions(session, flush_context, instances):
+    """Bump ``version``/``updated_at`` of campaigns whose columns, periods or
+    sites are about to be written, and note their companies so their cached
+    payloads are dropped once the transaction commits: dropping them now
+    would let a concurrent reader cache the old committed rows again."""
+    now = _utcnow()
+    companies = set()
+    for obj in session.dirty:
+        if isinstance(obj, Campaign) and session.is_modified(obj, include_collections=False):
+            obj.version = Campaign.version + 1
+            obj.updated_at = now
+            companies.add(obj.company_id)
+    touched = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, (CampaignPeriod, CampaignSite)):
+            continue
+        if obj in session.dirty and not session.is_modified(obj, include_collections=False):
+            continue
+        history = attributes.get_history(obj, "campaign_name")
+        for names in (history.added, history.deleted, history.unchanged):
+            touched.update(name for name in names or () if name)
+    if touched:
+        result = session.execute(
+            update(Campaign)
+            .where(Campaign.name.in_(touched))
+            .values(version=Campaign.version + 1, updated_at=now)
+            .returning(Campaign.company_id)
+            .execution_options(synchronize_session="fetch")
+        )
+        companies.update(result.scalars())
+    companies.discard(None)
+    if companies:
+        session.info.setdefault(_STALE_COMPANIES, set()).update(companies)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_campaigns(session):
+    from . import cache
+
+    for company_id in session.info.pop(_STALE_COMPANIES, ()):
+        cache.invalidate(company_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_campaigns(session):
+    session.info.pop(_STALE_COMPANIES, None)
@@ -1,21 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Body
-from typing import List, Optional, Dict, Any
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Body, Request, Response
+from typing import List, Literal, Optional, Dict, Any
 from datetime import datetime
 from sqlalchemy.orm import Session
-from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, StreamingResponse
 
-from . import crud as crud_module, schemas as schemas, models as models
-from ..database import get_db
+from . import crud as crud_module, schemas as schemas, models as models, export, cache, snapshots
+from ..conditional import http_date, make_etag, not_modified, not_modified_response, validator_headers
+from ..database import SessionLocal, get_db
+from ..pagination import InvalidCursor, decode_cursor, encode_cursor
+from ..responses import FastJSONResponse
 from ..security import get_current_user, role_required
 from ..users import models as users_models
 
 router = APIRouter(prefix="/campaigns", tags=["campaigns"])
 
 
-@router.get("/", response_model=Dict[str, Any])
+@router.get("/", response_model=Dict[str, Any], response_class=FastJSONResponse)
 def read_campaigns(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(5, ge=1, le=100),
+    after: Optional[str] = Query(None, description="Opaque cursor returned as next_cursor by a previous page"),
+    count: Literal["exact", "estimate", "none"] = Query("exact", description="How to compute `total`"),
     tipo_campania: Optional[str] = None,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
@@ -24,49 +32,235 @@ def read_campaigns(
 ):
     """
     Get all campaigns with pagination and optional filtering by campaign type.
+
+    Two pagination modes are supported. The legacy offset mode uses
+    `skip`/`limit`. Passing `after` (the `next_cursor` of a previous
+    response) switches to keyset mode, whose cost does not grow with page
+    depth. Both modes order by `(fecha_inicio, name)` and return a
+    `next_cursor`, which is null on the last page.
+
+    `count=exact` (default) returns the filtered total, computed in the same
+    query as the page. `count=estimate` returns the planner's estimate where
+    the database offers one. `count=none` skips counting (`total` is null);
+    use `has_more` / `next_cursor` to drive "load more" UIs.
+
+    Responses carry a strong `ETag` (and `Last-Modified`) derived from the
+    page's row versions and total; matching `If-None-Match` requests get a
+    304 without the page being built.
     """
     # Return only campaigns that belong to the user's company
     if current_user.company_id is None:
-        return {"data": [], "total": 0, "page": 0, "pageSize": limit}
-    campaigns = crud_module.get_campaigns_for_company(
+        return {"data": [], "total": 0, "page": 0, "pageSize": limit, "next_cursor": None, "has_more": False}
+    after_key = None
+    if after is not None:
+        try:
+            after_key = tuple(decode_cursor(after, size=2))
+        except InvalidCursor:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    cache_key = (current_user.company_id, skip, limit, after_key, count, tipo_campania, start_date, end_date)
+    cached = cache.page_cache.get(cache_key)
+    if cached is not None:
+        etag, last_modified, page = cached
+        if not_modified(request, etag, last_modified):
+            return not_modified_response(etag, last_modified)
+        return FastJSONResponse(page, headers=validator_headers(etag, last_modified))
+    conditional = "if-none-match" in request.headers or "if-modified-since" in request.headers
+    if conditional:
+        # Revalidate from row versions alone before building the page
+        stamp, last_updated = crud_module.get_campaigns_page_stamp_for_company(
+            db,
+            company_id=current_user.company_id,
+            skip=skip,
+            limit=limit,
+            after=after_key,
+            tipo_campania=tipo_campania,
+            start_date=start_date,
+            end_date=end_date,
+            count=count,
+        )
+        etag, last_modified = make_etag(cache_key, stamp), http_date(last_updated)
+        if not_modified(request, etag, last_modified):
+            return not_modified_response(etag, last_modified)
+    # Projected rows are plain dicts of the schema's columns, so they are
+    # encoded straight to bytes without jsonable_encoder or re-validation.
+    campaigns, total, next_key, (stamp, last_updated) = crud_module.get_stamped_campaigns_page_for_company(
         db,
         company_id=current_user.company_id,
         skip=skip,
         limit=limit,
+        after=after_key,
         tipo_campania=tipo_campania,
         start_date=start_date,
         end_date=end_date,
+        count=count,
     )
-    total = crud_module.get_campaigns_count_for_company(
-        db,
-        company_id=current_user.company_id,
-        tipo_campania=tipo_campania,
-        start_date=start_date,
-        end_date=end_date,
-    )
-    campaigns_json = jsonable_encoder(campaigns)
-    return {
-        "data": campaigns_json,
+    etag, last_modified = make_etag(cache_key, stamp), http_date(last_updated)
+    page = {
+        "data": campaigns,
         "total": total,
-        "page": skip // limit,
-        "pageSize": limit
+        "page": skip // limit if after is None else None,
+        "pageSize": limit,
+        "next_cursor": encode_cursor(next_key) if next_key is not None else None,
+        "has_more": next_key is not None,
     }
+    cache.page_cache.set(cache_key, (etag, last_modified, page))
+    return FastJSONResponse(page, headers=validator_headers(etag, last_modified))
+
+
+@router.get("/export")
+def export_campaigns(
+    format: Literal["csv", "ndjson"] = Query("ndjson"),
+    include_children: bool = Query(False, description="Also export each campaign's periods and sites"),
+    tipo_campania: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    current_user: users_models.User = Depends(get_current_user)
+):
+    """
+    Stream every campaign matching the `read_campaigns` filters as CSV or NDJSON.
+
+    Rows are read from a server-side cursor and written out batch by batch,
+    so a full-tenant export (optionally with periods and sites) completes in
+    one request with flat memory use.
+    """
+    if current_user.company_id is None:
+        raise HTTPException(status_code=404, detail="User has no company")
+    company_id = current_user.company_id
+
+    def batches():
+        # The request-scoped session may be closed before the body is
+        # streamed, so the export owns its session for the whole stream.
+        db = SessionLocal()
+        try:
+            yield from crud_module.iter_campaigns_for_export(
+                db,
+                company_id=company_id,
+                tipo_campania=tipo_campania,
+                start_date=start_date,
+                end_date=end_date,
+                include_children=include_children,
+            )
+        finally:
+            db.close()
+
+    if format == "csv":
+        body, media_type = export.csv_chunks(batches(), include_children=include_children), "text/csv; charset=utf-8"
+    else:
+        body, media_type = export.ndjson_chunks(batches()), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="campaigns.{format}"'},
+    )
+
 
+@router.post("/snapshots", response_model=schemas.Snapshot, status_code=201)
+def create_snapshot(current_user: users_models.User = Depends(role_required("admin"))):
+    """
+    Write a new Parquet snapshot of the company's campaigns, periods and sites.
 
-@router.get("/{campaign_id}", response_model=schemas.CampaignDetail)
-def read_campaign(campaign_id: str, db: Session = Depends(get_db), current_user: users_models.User = Depends(get_current_user)):
+    One file per table, with dictionary-encoded strings and per-row-group
+    statistics, versioned on the server's disk (see
+    `app.campaigns.snapshots`). Returns the snapshot's manifest. Needs
+    pyarrow on the server; without it the answer is 501.
+    """
+    if current_user.company_id is None:
+        raise HTTPException(status_code=400, detail="User has no company")
+    try:
+        return snapshots.write(current_user.company_id)
+    except snapshots.SnapshotsUnavailable:
+        raise HTTPException(status_code=501, detail="Parquet snapshots need pyarrow installed on the server")
+
+
+@router.get("/snapshots", response_model=List[schemas.Snapshot])
+def list_snapshots(current_user: users_models.User = Depends(get_current_user)):
+    """Snapshots of the company, newest first."""
+    if current_user.company_id is None:
+        return []
+    return [snapshots.manifest(current_user.company_id, version)
+            for version in snapshots.versions(current_user.company_id)]
+
+
+@router.get("/snapshots/{version}/{table}")
+def download_snapshot(
+    version: str,
+    table: Literal["campaigns", "campaign_periods", "campaign_sites"],
+    current_user: users_models.User = Depends(get_current_user),
+):
+    """
+    Download one table of a snapshot as Parquet. `version` may be `latest`.
+    """
+    if current_user.company_id is None:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    file = snapshots.path(current_user.company_id, table, version)
+    if file is None:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    version = os.path.basename(os.path.dirname(file))
+    return FileResponse(file, media_type="application/vnd.apache.parquet", filename=f"{table}-{version}.parquet")
+
+
+@router.get("/{campaign_id}", response_model=schemas.CampaignDetail, response_class=FastJSONResponse)
+def read_campaign(
+    campaign_id: str,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: users_models.User = Depends(get_current_user)
+):
     """
     Get detailed information for a specific campaign.
+
+    Payloads are served from a per-process cache keyed by company and
+    campaign name; writes through this API invalidate it. The `ETag` follows
+    the campaign's row version, which also moves when its periods or sites
+    change, so `If-None-Match` is answered with a 304 from a single-row
+    lookup without loading children.
     """
     if current_user.company_id is None:
         raise HTTPException(status_code=404, detail="Campaign not found")
-    campaign = crud_module.get_campaign_for_company(db, campaign_id, current_user.company_id)
-    if campaign is None:
-        raise HTTPException(status_code=404, detail="Campaign not found")
-    return campaign
+    cache_key = (current_user.company_id, campaign_id)
+    cached = cache.detail_cache.get(cache_key)
+    if cached is None:
+        stamp = crud_module.get_campaign_stamp_for_company(db, campaign_id, current_user.company_id)
+        if stamp is None:
+            raise HTTPException(status_code=404, detail="Campaign not found")
+        etag, last_modified = make_etag(cache_key, stamp[0]), http_date(stamp[1])
+        if not_modified(request, etag, last_modified):
+            return not_modified_response(etag, last_modified)
+        campaign = crud_module.get_campaign_for_company(db, campaign_id, current_user.company_id)
+        if campaign is None:
+            raise HTTPException(status_code=404, detail="Campaign not found")
+        # Validators follow the row actually serialized
+        etag, last_modified = make_etag(cache_key, campaign.version), http_date(campaign.updated_at)
+        payload = schemas.CampaignDetail.model_validate(campaign).model_dump(mode="json")
+        cached = (etag, last_modified, payload)
+        cache.detail_cache.set(cache_key, cached)
+    etag, last_modified, payload = cached
+    if not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+    return FastJSONResponse(payload, headers=validator_headers(etag, last_modified))
 
 
 
+@router.get("/{campaign_id}/stats", response_model=schemas.CampaignStats)
+def read_campaign_stats(
+    campaign_id: str,
+    top: int = Query(10, ge=1, le=100, description="Number of top sites by impactos_mensuales"),
+    db: Session = Depends(get_db),
+    current_user: users_models.User = Depends(get_current_user)
+):
+    """
+    Aggregates behind the campaign detail charts: impacts and site counts per
+    tipo_de_mueble and estado, the top sites by monthly impacts, and
+    per-period impacts. A few hundred bytes instead of every site row.
+    """
+    if current_user.company_id is None:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    stats = crud_module.get_campaign_stats_for_company(db, campaign_id, current_user.company_id, top=top)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return stats
+
+
 @router.post("/", response_model=schemas.Campaign, status_code=201)
 def create_campaign_endpoint(
     campaign_in: schemas.CampaignBase = Body(...),
@@ -113,11 +307,18 @@ def delete_campaign_endpoint(
 def search_campaigns_by_date(
     start_date: datetime,
     end_date: datetime,
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    after: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of a previous page"),
     db: Session = Depends(get_db),
     current_user: users_models.User = Depends(get_current_user)
 ):
     """
     Search campaigns by date range.
+
+    Results are ordered by `(fecha_inicio, name)` and capped at `limit`.
+    When more matches exist the `X-Next-Cursor` response header carries the
+    cursor to pass as `after` for the next page.
     """
     if start_date > end_date:
         raise HTTPException(
@@ -127,10 +328,20 @@ def search_campaigns_by_date(
     
     if current_user.company_id is None:
         return []
-    campaigns = crud_module.search_campaigns_by_date_for_company(
+    after_key = None
+    if after is not None:
+        try:
+            after_key = tuple(decode_cursor(after, size=2))
+        except InvalidCursor:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    campaigns, next_key = crud_module.search_campaigns_by_date_page_for_company(
         db,
         company_id=current_user.company_id,
         start_date=start_date,
-        end_date=end_date
+        end_date=end_date,
+        after=after_key,
+        limit=limit,
     )
+    if next_key is not None:
+        response.headers["X-Next-Cursor"] = encode_cursor(next_key)
     return campaigns
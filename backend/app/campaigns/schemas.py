@@ -1,6 +1,6 @@
 from pydantic import BaseModel, ConfigDict
-from datetime import date
-from typing import List, Optional
+from datetime import date, datetime
+from typing import Dict, List, Optional
 
 
 class CampaignPeriodBase(BaseModel):
@@ -72,3 +72,49 @@ class CampaignDetail(Campaign):
     periods: List[CampaignPeriod]
     sites: List[CampaignSite]
     model_config = ConfigDict(from_attributes=True)
+
+
+class MuebleStats(BaseModel):
+    tipo_de_mueble: Optional[str] = None
+    sites: int
+    impactos_mensuales: int
+    alcance_mensual: float
+
+
+class EstadoStats(BaseModel):
+    estado: Optional[str] = None
+    sites: int
+    impactos_mensuales: int
+
+
+class TopSite(BaseModel):
+    codigo_del_sitio: Optional[str] = None
+    impactos_mensuales: int
+
+
+class PeriodStats(BaseModel):
+    period: Optional[str] = None
+    impactos_periodo_personas: int
+    impactos_periodo_vehiculos: int
+
+
+class CampaignStats(BaseModel):
+    campaign_name: str
+    total_sites: int
+    by_tipo_de_mueble: List[MuebleStats]
+    by_estado: List[EstadoStats]
+    top_sites: List[TopSite]
+    periods: List[PeriodStats]
+
+
+class SnapshotTable(BaseModel):
+    file: str
+    rows: int
+    bytes: int
+
+
+class Snapshot(BaseModel):
+    version: str
+    company_id: int
+    created_at: datetime
+    tables: Dict[str, SnapshotTable]
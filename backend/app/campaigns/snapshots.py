@@ -0,0 +1,223 @@
+"""Versioned Parquet snapshots of a company's campaign tables.
+
+``write`` dumps the company's ``campaigns``, ``campaign_periods`` and
+``campaign_sites`` rows to one Parquet file per table under
+``SNAPSHOT_DIR/company_<id>/<version>/``:
+
+- string columns are dictionary-encoded (campaign names, states, furniture
+  types repeat on every row), the rest zstd-compressed;
+- every row group carries min/max/null-count statistics, and rows are
+  sorted by campaign, so filters on ``name``/``campaign_name`` skip most
+  row groups;
+- rows come from a server-side cursor and go out one row group of
+  ``SNAPSHOT_BATCH_ROWS`` at a time, so memory stays flat.
+
+The three tables are read in one REPEATABLE READ transaction on
+PostgreSQL, so they agree with each other. A snapshot is written to a
+hidden directory and renamed into place, so readers never see a partial
+one. ``manifest.json`` lists the files with their row counts and sizes.
+The newest ``SNAPSHOT_KEEP`` versions of each company are kept.
+
+``read`` and ``read_table`` memory-map the files. A notebook loads
+millions of site rows straight into Arrow buffers without touching the
+database. pyarrow is optional; without it ``pa`` is None and writing
+raises ``SnapshotsUnavailable``.
+"""
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import Date, DateTime, Float, Integer, select
+
+from . import models
+from .models import _utcnow
+from ..database import engine
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except Exception:  # pragma: no cover - optional dependency
+    pa = pq = None
+
+logger = logging.getLogger("app.campaigns.snapshots")
+
+# Next to the CSVs in backend/data, whatever the working directory
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SNAPSHOT_DIR = os.path.abspath(os.getenv("SNAPSHOT_DIR", os.path.join(_BACKEND_DIR, "data", "snapshots")))
+SNAPSHOT_KEEP = int(os.getenv("SNAPSHOT_KEEP", "5"))
+SNAPSHOT_BATCH_ROWS = int(os.getenv("SNAPSHOT_BATCH_ROWS", "100000"))
+COMPRESSION = "zstd"
+MANIFEST = "manifest.json"
+# UTC, microseconds: unique per company and sorts chronologically
+VERSION_FORMAT = "%Y%m%dT%H%M%S%fZ"
+TABLES = (models.Campaign, models.CampaignPeriod, models.CampaignSite)
+TABLE_NAMES = tuple(model.__tablename__ for model in TABLES)
+
+
+class SnapshotsUnavailable(Exception):
+    """pyarrow is not installed."""
+
+
+def _require() -> None:
+    if pa is None:
+        raise SnapshotsUnavailable("Parquet snapshots need pyarrow installed")
+
+
+def _arrow_type(column):
+    if isinstance(column.type, Integer):
+        return pa.int64()
+    if isinstance(column.type, Float):
+        return pa.float64()
+    if isinstance(column.type, DateTime):
+        return pa.timestamp("us", tz="UTC")
+    if isinstance(column.type, Date):
+        return pa.date32()
+    return pa.string()
+
+
+def schema(model):
+    """Arrow schema of ``model``'s table, column for column."""
+    _require()
+    return pa.schema([pa.field(c.name, _arrow_type(c)) for c in model.__table__.columns])
+
+
+def _statement(model, company_id: int):
+    table = model.__table__
+    if model is models.Campaign:
+        return select(table).where(table.c.company_id == company_id).order_by(table.c.name)
+    campaigns = models.Campaign.__table__
+    return (
+        select(table)
+        .join(campaigns, campaigns.c.name == table.c.campaign_name)
+        .where(campaigns.c.company_id == company_id)
+        .order_by(table.c.campaign_name, table.c.id)
+    )
+
+
+def _write_table(conn, model, company_id: int, path: str) -> dict:
+    table_schema = schema(model)
+    strings = [field.name for field in table_schema if pa.types.is_string(field.type)]
+    rows = 0
+    result = conn.execution_options(stream_results=True, yield_per=SNAPSHOT_BATCH_ROWS).execute(
+        _statement(model, company_id))
+    with pq.ParquetWriter(path, table_schema, compression=COMPRESSION, use_dictionary=strings,
+                          write_statistics=True) as writer:
+        for partition in result.partitions():
+            columns = zip(*partition)
+            batch = pa.RecordBatch.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, table_schema)],
+                schema=table_schema,
+            )
+            writer.write_batch(batch, row_group_size=SNAPSHOT_BATCH_ROWS)
+            rows += len(partition)
+    return {"file": os.path.basename(path), "rows": rows, "bytes": os.path.getsize(path)}
+
+
+def company_dir(company_id: int, root: Optional[str] = None) -> str:
+    return os.path.join(root or SNAPSHOT_DIR, f"company_{company_id}")
+
+
+def write(company_id: int, root: Optional[str] = None, keep: int = SNAPSHOT_KEEP) -> dict:
+    """Write a new snapshot of ``company_id``'s tables and return its
+    manifest. Older versions beyond ``keep`` are removed."""
+    _require()
+    start = time.perf_counter()
+    created = _utcnow()
+    version = created.strftime(VERSION_FORMAT)
+    base = company_dir(company_id, root)
+    os.makedirs(base, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=f".{version}.", dir=base)
+    try:
+        with engine.connect() as conn:
+            if conn.dialect.name == "postgresql":
+                # One consistent view of the three tables
+                conn = conn.execution_options(isolation_level="REPEATABLE READ")
+            with conn.begin():
+                tables = {model.__tablename__: _write_table(conn, model, company_id,
+                                                            os.path.join(staging, f"{model.__tablename__}.parquet"))
+                          for model in TABLES}
+        manifest = {"version": version, "company_id": company_id, "created_at": created.isoformat(),
+                    "tables": tables}
+        with open(os.path.join(staging, MANIFEST), "w") as out:
+            json.dump(manifest, out, indent=2)
+        os.rename(staging, os.path.join(base, version))
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    prune(company_id, keep, root)
+    logger.info("snapshot_written", extra={
+        "company_id": company_id, "version": version, "elapsed": round(time.perf_counter() - start, 3),
+        **{f"{name}_rows": table["rows"] for name, table in tables.items()},
+        "bytes": sum(table["bytes"] for table in tables.values()),
+    })
+    return manifest
+
+
+def versions(company_id: int, root: Optional[str] = None) -> List[str]:
+    """Complete snapshot versions of ``company_id``, newest first."""
+    base = company_dir(company_id, root)
+    if not os.path.isdir(base):
+        return []
+    return sorted((name for name in os.listdir(base)
+                   if not name.startswith(".") and os.path.isfile(os.path.join(base, name, MANIFEST))),
+                  reverse=True)
+
+
+def _resolve(company_id: int, version: Optional[str], root: Optional[str]) -> Optional[str]:
+    """``version`` if it exists (None or ``latest``: the newest one)."""
+    available = versions(company_id, root)
+    if version in (None, "latest"):
+        return available[0] if available else None
+    return version if version in available else None
+
+
+def manifest(company_id: int, version: Optional[str] = None, root: Optional[str] = None) -> Optional[dict]:
+    version = _resolve(company_id, version, root)
+    if version is None:
+        return None
+    with open(os.path.join(company_dir(company_id, root), version, MANIFEST)) as f:
+        return json.load(f)
+
+
+def path(company_id: int, table: str, version: Optional[str] = None, root: Optional[str] = None) -> Optional[str]:
+    """File of ``table`` in a snapshot, or None when either does not exist.
+    Only known versions and table names are joined into the path."""
+    version = _resolve(company_id, version, root)
+    if version is None or table not in TABLE_NAMES:
+        return None
+    return os.path.join(company_dir(company_id, root), version, f"{table}.parquet")
+
+
+def read_table(company_id: int, table: str, version: Optional[str] = None, columns=None, filters=None,
+               dictionary: bool = True, root: Optional[str] = None):
+    """One table of a snapshot, memory-mapped. ``filters`` (pyarrow's DNF
+    list, e.g. ``[("estado", "=", "Jalisco")]``) skip row groups by their
+    statistics. With ``dictionary`` string columns stay dictionary-encoded
+    (pandas categoricals after ``to_pandas``) instead of one Python string
+    per cell; filtered reads keep plain strings, since pyarrow does not
+    prune row groups on dictionary columns."""
+    _require()
+    file = path(company_id, table, version, root)
+    if file is None:
+        raise FileNotFoundError(f"No snapshot {version or 'latest'} of {table} for company {company_id}")
+    strings = [f.name for f in pq.read_schema(file, memory_map=True) if pa.types.is_string(f.type)]
+    return pq.read_table(file, columns=columns, filters=filters, memory_map=True,
+                         read_dictionary=strings if dictionary and not filters else None)
+
+
+def read(company_id: int, version: Optional[str] = None, root: Optional[str] = None) -> Dict[str, object]:
+    """Every table of a snapshot as memory-mapped ``pyarrow.Table``s."""
+    version = _resolve(company_id, version, root) or version
+    return {name: read_table(company_id, name, version, root=root) for name in TABLE_NAMES}
+
+
+def prune(company_id: int, keep: int = SNAPSHOT_KEEP, root: Optional[str] = None) -> List[str]:
+    """Remove all but the newest ``keep`` snapshots; returns the removed versions."""
+    removed = versions(company_id, root)[max(keep, 1):]
+    for version in removed:
+        shutil.rmtree(os.path.join(company_dir(company_id, root), version), ignore_errors=True)
+    return removed
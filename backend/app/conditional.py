@@ -0,0 +1,59 @@
+"""Validators for conditional GETs (``ETag`` / ``Last-Modified``).
+
+Handlers compute a strong ETag from whatever versions the representation
+depends on. ``not_modified`` then applies the RFC 9110 precedence: when
+``If-None-Match`` is present it decides alone, and ``If-Modified-Since`` is
+only consulted without it.
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+# Browsers may store the response but must revalidate it on every use, which
+# turns repeat navigations into cheap 304s.
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag over the ``repr`` of ``parts``."""
+    digest = hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+
+def http_date(value: Optional[datetime]) -> Optional[str]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        # SQLite hands back naive datetimes; they are stored as UTC
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def validator_headers(etag: str, last_modified: Optional[str]) -> Dict[str, str]:
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if last_modified is not None:
+        headers["Last-Modified"] = last_modified
+    return headers
+
+
+def not_modified(request: Request, etag: str, last_modified: Optional[str]) -> bool:
+    """True when the request's validators still match the representation."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [t.strip() for t in if_none_match.split(",")]
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+
+def not_modified_response(etag: str, last_modified: Optional[str]) -> Response:
+    return Response(status_code=304, headers=validator_headers(etag, last_modified))
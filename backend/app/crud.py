@@ -1,4 +1,4 @@
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import Session, selectinload
 from sqlalchemy import and_
 from datetime import datetime
 from typing import Optional
@@ -66,10 +66,11 @@ def get_campaign(db: Session, campaign_id: str):
 def get_campaign_for_company(db: Session, campaign_id: str, company_id: int):
     # Eager-load related periods and sites to avoid lazy-loading after the
     # DB session is closed (which can raise DetachedInstanceError during
-    # response serialization).
+    # response serialization). selectinload issues one query per collection;
+    # joinedload on both would multiply periods by sites.
     return db.query(models.Campaign).options(
-        joinedload(models.Campaign.periods),
-        joinedload(models.Campaign.sites),
+        selectinload(models.Campaign.periods),
+        selectinload(models.Campaign.sites),
     ).filter(
         models.Campaign.name == campaign_id,
         models.Campaign.company_id == company_id
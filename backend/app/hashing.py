@@ -0,0 +1,192 @@
+"""Bounded password hashing off the request threads.
+
+``pbkdf2_sha256``/``bcrypt`` are CPU-bound by design. Run inline in
+FastAPI's threadpool, a burst of logins pins every worker thread and starves
+unrelated reads. Here hashes run in a dedicated process pool, and two limits
+bound how many request threads a login storm can occupy:
+
+- at most ``HASH_CONCURRENCY`` hashes in flight, and
+- at most ``HASH_MAX_QUEUE`` callers waiting for a slot, each for at most
+  ``HASH_QUEUE_TIMEOUT_SECONDS``.
+
+A caller that hits either limit gets ``HashingBusy``, which the app turns
+into a 503 with ``Retry-After``. ``hash_passwords`` (bulk provisioning) is
+admitted like one caller and then spreads its batch over at most
+``HASH_BATCH_PARALLELISM`` slots that happen to be free. ``HASH_WORKERS=0`` hashes in the calling
+thread (still under the same limits), which is the default under
+``TESTING=1``.
+
+Queue depth, hash latency and rejections are exported to Prometheus when
+``prometheus_client`` is installed.
+"""
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional
+
+try:
+    from prometheus_client import Counter, Gauge, Histogram
+except Exception:  # pragma: no cover - optional dependency
+    Counter = Gauge = Histogram = None
+
+_default_workers = "0" if os.getenv("TESTING") == "1" else str(min(4, os.cpu_count() or 1))
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", _default_workers))
+HASH_CONCURRENCY = int(os.getenv("HASH_CONCURRENCY", str(max(HASH_WORKERS, 1))))
+HASH_MAX_QUEUE = int(os.getenv("HASH_MAX_QUEUE", "16"))
+HASH_QUEUE_TIMEOUT_SECONDS = float(os.getenv("HASH_QUEUE_TIMEOUT_SECONDS", "2"))
+# Slots one hash_passwords batch may hold at once; the rest stay free for logins
+HASH_BATCH_PARALLELISM = int(os.getenv("HASH_BATCH_PARALLELISM", str(max(HASH_CONCURRENCY // 2, 1))))
+
+if Histogram is not None:
+    _QUEUE_DEPTH = Gauge("app_password_hash_queue_depth", "Callers waiting for a password hashing slot")
+    _LATENCY = Histogram("app_password_hash_seconds", "Password hash/verify time, excluding queueing", ["op"],
+                         buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5))
+    _WAIT = Histogram("app_password_hash_wait_seconds", "Time spent waiting for a hashing slot",
+                      buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5))
+    _REJECTED = Counter("app_password_hash_rejected_total", "Hash requests answered with 503", ["reason"])
+else:  # pragma: no cover - optional dependency
+    _QUEUE_DEPTH = _LATENCY = _WAIT = _REJECTED = None
+
+
+class HashingBusy(Exception):
+    """Raised when no hashing slot frees up within the configured limits."""
+
+    def __init__(self, reason: str):
+        super().__init__(f"password hashing unavailable: {reason}")
+        self.reason = reason
+
+
+_slots = threading.BoundedSemaphore(HASH_CONCURRENCY)
+_lock = threading.Lock()
+_waiting = 0
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _hash(password: str) -> str:
+    from .security import pwd_context
+
+    return pwd_context.hash(password)
+
+
+def _verify(password: str, hashed: str) -> bool:
+    from .security import pwd_context
+
+    return pwd_context.verify(password, hashed)
+
+
+def _pool() -> ProcessPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=HASH_WORKERS)
+        return _executor
+
+
+def _reject(reason: str) -> None:
+    if _REJECTED is not None:
+        _REJECTED.labels(reason=reason).inc()
+    raise HashingBusy(reason)
+
+
+def _acquire() -> None:
+    global _waiting
+    with _lock:
+        full = _waiting >= HASH_MAX_QUEUE
+        if not full:
+            _waiting += 1
+            if _QUEUE_DEPTH is not None:
+                _QUEUE_DEPTH.inc()
+    if full:
+        _reject("queue_full")
+    t0 = time.perf_counter()
+    try:
+        acquired = _slots.acquire(timeout=HASH_QUEUE_TIMEOUT_SECONDS)
+    finally:
+        with _lock:
+            _waiting -= 1
+            if _QUEUE_DEPTH is not None:
+                _QUEUE_DEPTH.dec()
+    if _WAIT is not None:
+        _WAIT.observe(time.perf_counter() - t0)
+    if not acquired:
+        _reject("timeout")
+
+
+def _run(op: str, fn, *args):
+    global _executor
+    _acquire()
+    t0 = time.perf_counter()
+    try:
+        if HASH_WORKERS <= 0:
+            return fn(*args)
+        try:
+            return _pool().submit(fn, *args).result()
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool for the next caller
+            with _lock:
+                _executor = None
+            raise
+    finally:
+        _slots.release()
+        if _LATENCY is not None:
+            _LATENCY.labels(op=op).observe(time.perf_counter() - t0)
+
+
+def hash_password(password: str) -> str:
+    return _run("hash", _hash, password)
+
+
+def hash_passwords(passwords: List[str]) -> List[str]:
+    """Hash a batch in parallel, in order.
+
+    Admission is the same as for one hash; extra slots are only taken if
+    free, and at most ``HASH_BATCH_PARALLELISM`` hashes are submitted at a
+    time, so a login arriving mid-batch is not queued behind the whole batch.
+    """
+    global _executor
+    if not passwords:
+        return []
+    _acquire()
+    held = 1
+    while held < min(HASH_BATCH_PARALLELISM, len(passwords)) and _slots.acquire(blocking=False):
+        held += 1
+    t0 = time.perf_counter()
+    try:
+        if HASH_WORKERS <= 0:
+            return [_hash(password) for password in passwords]
+        pool = _pool()
+        results: List[Optional[str]] = [None] * len(passwords)
+        todo = iter(enumerate(passwords))
+        pending = {}
+        try:
+            for i, password in todo:
+                pending[pool.submit(_hash, password)] = i
+                if len(pending) >= held:
+                    break
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[pending.pop(future)] = future.result()
+                    nxt = next(todo, None)
+                    if nxt is not None:
+                        pending[pool.submit(_hash, nxt[1])] = nxt[0]
+        except BrokenProcessPool:
+            with _lock:
+                _executor = None
+            raise
+        return results
+    finally:
+        for _ in range(held):
+            _slots.release()
+        if _LATENCY is not None:
+            _LATENCY.labels(op="hash_batch").observe(time.perf_counter() - t0)
+
+
+def verify_password(password: str, hashed: str) -> bool:
+    return _run("verify", _verify, password, hashed)
+
+
+def queue_depth() -> int:
+    return _waiting
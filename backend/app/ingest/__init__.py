@@ -0,0 +1,6 @@
+"""Ingest package: CSV loading, delta sync against the ingest manifest and
+bulk imports through the API."""
+
+from . import models, loader, delta
+
+__all__ = ["models", "loader", "delta"]
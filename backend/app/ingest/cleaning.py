@@ -0,0 +1,197 @@
+"""Vectorized cleaning of the numeric CSV columns.
+
+The rules are those the seed has always applied per cell:
+
+- date-formatted numbers (``"14566-06-26"``, Excel's doing) keep the part
+  before the first dash;
+- values above 1e12 are divided by 1e12, and by 1000 more if still above
+  1e5, with a floor of 1000;
+- values above 1e6 are divided by 1000, above 1e5 by 10;
+- everything is truncated to an integer;
+- missing values stay missing.
+
+Whatever else does not parse, or ends up infinite or out of the range of a
+32-bit INTEGER column (negative and dashed values are not scaled down),
+gets a value from a ``Fallback``, so every result fits the tables. Instead
+of ``np.random`` it hashes the cell's raw text (and, when given, the row's
+natural key and the column) with a seed, so the same file always cleans to
+the same values, whatever the chunking or the order of the rows.
+"""
+import hashlib
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+CLEANING_SEED = int(os.getenv("CLEANING_SEED", "42"))
+
+HUGE = 1000000000000
+LARGE = 1000000
+BIG = 100000
+# Largest value of a 32-bit INTEGER column
+INTEGER_MAX = 2147483647
+
+# Code points of the fixed-width unicode arrays parse() works on
+ZERO, NINE, DASH = ord("0"), ord("9"), ord("-")
+# Longer cells skip the fixed-width arrays, which are as wide as their
+# longest cell; no sensible number is this long
+MAX_FAST_CHARS = 32
+# Digit strings this long still fit an int64 exactly
+MAX_FAST_DIGITS = 18
+
+
+def _heads(text: np.ndarray):
+    """``(dashed, head, numbers)`` of short strings: whether each contains a
+    dash, the part before the first one, and that part's value when it is
+    a plain run of ASCII digits (NaN otherwise, for ``to_numeric``).
+
+    The strings are viewed as a matrix of code points, so all of it is
+    array arithmetic with no per-cell Python call: numpy 1.x parses
+    strings to floats through Python, and ``str.isdigit`` accepts "²" or
+    "①", which ``float`` rejects.
+    """
+    fixed = text.astype(str)
+    width = fixed.dtype.itemsize // 4
+    # A view: blanking the code points after a dash leaves the head in ``fixed``
+    codes = fixed.view(np.uint32).reshape(len(fixed), width)
+    is_dash = codes == DASH
+    dashed = is_dash.any(axis=1)
+    tails = np.arange(width) >= is_dash[dashed].argmax(axis=1)[:, None]
+    rows = codes[dashed]
+    rows[tails] = 0
+    codes[dashed] = rows
+
+    # Unicode arrays pad each string with NULs after its end
+    used = codes != 0
+    length = used.sum(axis=1)
+    plain = np.all((codes >= ZERO) & (codes <= NINE) | ~used, axis=1) & (length > 0) & (length <= MAX_FAST_DIGITS)
+    numbers = np.full(len(fixed), np.nan)
+    # Place values of the digits as if every string had ``places`` of them,
+    # then drop the padding: exact in int64
+    places = min(width, MAX_FAST_DIGITS)
+    digits = codes[plain][:, :places].astype(np.int64)
+    padding = digits == 0
+    digits -= ZERO
+    digits[padding] = 0
+    value = digits @ 10 ** np.arange(places - 1, -1, -1, dtype=np.int64)
+    numbers[plain] = value // 10 ** (places - length[plain])
+    return dashed, fixed, numbers
+
+
+def parse(values: pd.Series):
+    """``(present, dashed, numbers)``: which cells are not missing, which
+    are strings with a dash, and each cell as a float (for dashed ones, the
+    part before the first dash; NaN where missing or not a number).
+
+    Without pyarrow, pandas' ``.str`` methods and ``to_numeric`` call back
+    into Python per cell, so the strings go through ``_heads`` instead.
+    Plain ASCII digit strings, nearly all of them, are converted in C; only
+    the rest (decimals, exponents, other digits, garbage) takes
+    ``to_numeric``.
+    """
+    present = values.notna().to_numpy()
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return present, np.zeros(len(values), dtype=bool), values.to_numpy(dtype=float, na_value=np.nan)
+    cells = values.to_numpy(dtype=object)
+    # Only actual strings take the dash rule (CSV text columns are always
+    # strings; mixed object columns need the per-cell check)
+    if pd.api.types.is_object_dtype(values) and pd.api.types.infer_dtype(cells, skipna=True) != "string":
+        is_str = np.fromiter((isinstance(v, str) for v in cells), dtype=bool, count=len(cells))
+    else:
+        is_str = present
+    numbers = np.full(len(cells), np.nan)
+    dashed = np.zeros(len(cells), dtype=bool)
+    if is_str.any():
+        text = np.where(is_str, cells, "")
+        short = np.fromiter(map(len, text), dtype=np.int64, count=len(text)) <= MAX_FAST_CHARS
+        rows = np.flatnonzero(short)
+        dashed[rows], head, numbers[rows] = _heads(text[rows])
+        # Heads that are not plain digits: decimals, exponents, other
+        # digits, garbage
+        left = np.isnan(numbers[rows]) & (head != "")
+        rows, head = rows[left], head[left].astype(object)
+        long_rows = np.flatnonzero(~short)
+        if len(long_rows):
+            parts = [cell.partition("-") for cell in text[long_rows]]
+            dashed[long_rows] = [part[1] == "-" for part in parts]
+            rows = np.concatenate([rows, long_rows])
+            head = np.concatenate([head, np.array([part[0] for part in parts], dtype=object)])
+        if len(rows):
+            numbers[rows] = pd.to_numeric(pd.Series(head), errors="coerce")
+    loose = ~is_str & present
+    if loose.any():
+        numbers[loose] = pd.to_numeric(pd.Series(cells[loose]), errors="coerce")
+    return present, dashed, numbers
+
+
+def rescale(values: np.ndarray) -> np.ndarray:
+    """Magnitude rules over a float array, truncated; NaN stays NaN."""
+    v = np.asarray(values, dtype=float)
+    with np.errstate(invalid="ignore"):
+        huge = np.trunc(v / HUGE)
+        huge = np.maximum(np.where(huge > BIG, np.trunc(huge / 1000), huge), 1000)
+        return np.select([v > HUGE, v > LARGE, v > BIG], [huge, np.trunc(v / 1000), np.trunc(v / 10)], np.trunc(v))
+
+
+@dataclass(frozen=True)
+class Fallback:
+    """Replacement for cells that do not parse: an integer in
+    ``[low, high)``, derived from a seeded hash of the cell."""
+
+    low: int = 1000
+    high: int = 10000
+    seed: int = CLEANING_SEED
+
+    def values(self, raw: pd.Series, keys: Optional[pd.DataFrame] = None, salt: str = "") -> np.ndarray:
+        """Replacements for every cell of ``raw``; ``keys`` (same index) and
+        ``salt`` (e.g. the column name) tell equal texts in different rows
+        or columns apart."""
+        hash_key = hashlib.sha256(f"{self.seed}:{salt}".encode()).hexdigest()[:16]
+        parts = {"raw": raw.astype(object).astype(str)}
+        if keys is not None:
+            parts.update({f"key_{c}": keys[c].astype(object).astype(str) for c in keys.columns})
+        hashed = pd.util.hash_pandas_object(pd.DataFrame(parts, index=raw.index), index=False,
+                                            hash_key=hash_key, categorize=False).to_numpy()
+        return self.low + (hashed % np.uint64(self.high - self.low)).astype(np.int64)
+
+
+DEFAULT_FALLBACK = Fallback()
+
+
+def clean_numbers(values, fallback: Fallback = DEFAULT_FALLBACK, keys: Optional[pd.DataFrame] = None,
+                  salt: str = "") -> pd.Series:
+    """Clean a whole column; returns a nullable ``Int64`` series with the
+    index of ``values``. See ``Fallback.values`` for ``keys`` and ``salt``."""
+    values = pd.Series(values)
+    present, dashed, numbers = parse(values)
+    out = np.where(dashed, np.trunc(numbers), rescale(numbers))
+    # NaN (did not parse), inf ("inf", "1e400") or too large for the
+    # column: no integer to keep, so the cell takes the fallback like
+    # garbage text
+    garbage = present & ~(np.abs(out) <= INTEGER_MAX)
+    if garbage.any():
+        subset = None if keys is None else keys[garbage]
+        out[garbage] = fallback.values(values[garbage], subset, salt)
+    # Straight to the Int64 buffers: astype("Int64") rechecks every float
+    missing = np.isnan(out)
+    return pd.Series(pd.arrays.IntegerArray(np.where(missing, 0, out).astype(np.int64), missing),
+                     index=values.index)
+
+
+def clean_value(value, fallback: Fallback = DEFAULT_FALLBACK):
+    """``clean_numbers`` for a single cell: an int, or None when missing."""
+    cleaned = clean_numbers(pd.Series([value], dtype=object), fallback).iloc[0]
+    return None if pd.isna(cleaned) else int(cleaned)
+
+
+def clean_frame(frame: pd.DataFrame, columns, fallback: Fallback = DEFAULT_FALLBACK, keys=None) -> pd.DataFrame:
+    """Copy of ``frame`` with ``columns`` cleaned. ``keys`` names the
+    natural-key columns that seed each row's fallback values."""
+    cleaned = frame.copy()
+    key_frame = frame[list(keys)] if keys else None
+    for column in columns:
+        if column in cleaned:
+            cleaned[column] = clean_numbers(frame[column], fallback, key_frame, salt=column)
+    return cleaned
@@ -0,0 +1,263 @@
+"""Incremental ingest of the campaign CSVs against the ingest manifest.
+
+Every CSV row is identified by its natural key (``name``, ``(name,
+period)``, ``(name, codigo_del_sitio)``) and fingerprinted with a 64-bit
+hash of its raw values, computed for the whole file at once. ``sync``
+compares those hashes with the ones stored in ``ingest_manifest`` and then
+only writes the difference:
+
+- keys not in the manifest are inserted, or updated when the table already
+  has them (rows loaded before the manifest existed are adopted this way,
+  so the first sync on such a database rewrites them once);
+- keys whose hash changed are updated;
+- with ``delete_missing``, keys in the manifest but no longer in the file
+  are deleted. Rows the ingest never wrote (created through the API) are
+  not in the manifest and are left alone.
+
+Hashes are taken over the raw values, before cleaning, so a change to the
+cleaning rules alone does not rewrite every row.
+"""
+import logging
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Column, MetaData, String, Table, and_, bindparam, delete, func, insert, select, text, update
+
+from ..campaigns import cache, intervals
+from ..campaigns.models import _utcnow
+from . import loader
+from .loader import DATA_DIR, SOURCES
+from .models import IngestManifest
+
+logger = logging.getLogger("app.ingest.delta")
+
+# Joins the parts of composite keys; cannot occur in CSV text
+KEY_SEPARATOR = "\x1f"
+# Keys per IN (...) list
+CHUNK = 500
+
+
+@dataclass
+class SyncResult:
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+
+
+def row_keys(frame, columns) -> pd.Series:
+    """Natural key of each row of ``frame`` as one string."""
+    key = frame[columns[0]].astype(str)
+    for column in columns[1:]:
+        key = key + KEY_SEPARATOR + frame[column].astype(str)
+    return key
+
+
+def row_hashes(frame) -> np.ndarray:
+    """Signed 64-bit hash of each row of ``frame``.
+
+    Numbers are hashed as floats and everything else as objects, so a
+    column read as int one night and as float the next (because a blank
+    appeared elsewhere in it) does not change every hash.
+    """
+    canonical = {}
+    for column in frame.columns:
+        values = frame[column]
+        if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            canonical[column] = values.astype("float64")
+        else:
+            canonical[column] = values.astype(object)
+    hashed = pd.util.hash_pandas_object(pd.DataFrame(canonical, index=frame.index), index=False, categorize=False)
+    return hashed.to_numpy().view(np.int64)
+
+
+def _chunks(values, size=CHUNK):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _manifest(db, source, keys=None) -> pd.DataFrame:
+    """Stored hashes of ``source``: all of them, or those of ``keys``."""
+    stmt = select(IngestManifest.key, IngestManifest.row_hash).where(IngestManifest.source == source.name)
+    # Core execution: no ORM row processing for a million keys
+    if keys is None:
+        rows = db.connection().execute(stmt).all()
+    else:
+        rows = []
+        for chunk in _chunks(keys):
+            rows.extend(db.connection().execute(stmt.where(IngestManifest.key.in_(chunk))).all())
+    return pd.DataFrame(rows, columns=["key", "stored"]).astype({"key": object, "stored": "Int64"})
+
+
+def _lookup_table(db, source) -> Table:
+    """Per-connection temporary table holding keys of ``source`` to look up."""
+    table = Table(f"ingest_lookup_{source.name}", MetaData(), *(Column(k, String) for k in source.keys))
+    columns = ", ".join(f'"{k}" TEXT' for k in source.keys)
+    db.execute(text(f"CREATE TEMPORARY TABLE IF NOT EXISTS {table.name} ({columns})"))
+    db.execute(table.delete())
+    return table
+
+
+def _stored_keys(db, source, raw, scan=False) -> set:
+    """Keys of ``raw`` rows that the table already has; with ``scan`` all
+    stored keys, read at once.
+
+    Composite keys are joined against a temporary table of the wanted
+    keys: a row-value IN list does not use the index on SQLite.
+    """
+    columns = [getattr(source.model, k) for k in source.model_keys]
+    conn = db.connection()
+    if scan:
+        rows = conn.execute(select(*columns)).all()
+    elif len(columns) == 1:
+        rows = []
+        for chunk in _chunks(raw[source.keys[0]].unique()):
+            rows.extend(conn.execute(select(*columns).where(columns[0].in_(chunk))).all())
+    else:
+        lookup = _lookup_table(conn, source)
+        wanted = raw[list(source.keys)].drop_duplicates()
+        conn.execute(insert(lookup), loader.records(wanted))
+        rows = conn.execute(
+            select(*columns).join(lookup, and_(*(c == lookup.c[k] for c, k in zip(columns, source.keys))))
+        ).all()
+    return set(row_keys(pd.DataFrame(rows, columns=list(source.keys)), source.keys))
+
+
+def untracked_rows(db, source) -> int:
+    """Rows of ``source``'s table that the manifest does not know about
+    (loaded before it existed, or created through the API)."""
+    conn = db.connection()
+    stored = conn.execute(select(func.count()).select_from(source.model.__table__)).scalar()
+    tracked = conn.execute(select(func.count()).select_from(IngestManifest.__table__)
+                           .where(IngestManifest.source == source.name)).scalar()
+    return stored - tracked
+
+
+def _update(db, source, frame) -> None:
+    """UPDATE the rows of ``frame`` by natural key, as one executemany per
+    ``BATCH_SIZE`` rows."""
+    table = source.model.__table__
+    stmt = update(table).where(*(table.c[k] == bindparam(f"key_{k}") for k in source.model_keys))
+    rows = loader.records(frame.rename(columns={k: f"key_{k}" for k in source.model_keys}))
+    for start in range(0, len(rows), loader.BATCH_SIZE):
+        db.execute(stmt, rows[start:start + loader.BATCH_SIZE])
+
+
+def _delete(db, source, keys) -> None:
+    table = source.model.__table__
+    stmt = delete(table).where(*(table.c[k] == bindparam(f"key_{k}") for k in source.model_keys))
+    parts = [key.split(KEY_SEPARATOR) for key in keys]
+    rows = [{f"key_{k}": value for k, value in zip(source.model_keys, part)} for part in parts]
+    for start in range(0, len(rows), loader.BATCH_SIZE):
+        db.execute(stmt, rows[start:start + loader.BATCH_SIZE])
+    for chunk in _chunks(keys):
+        db.execute(delete(IngestManifest).where(IngestManifest.source == source.name,
+                                                IngestManifest.key.in_(chunk)))
+
+
+def _record(db, source, keys, hashes, known) -> None:
+    """Store ``hashes`` for ``keys``: UPDATE the ``known`` ones, INSERT the rest."""
+    now = _utcnow()
+    table = IngestManifest.__table__
+    changed = [{"key_source": source.name, "key_key": key, "row_hash": int(h), "updated_at": now}
+               for key, h, k in zip(keys, hashes, known) if k]
+    fresh = [{"source": source.name, "key": key, "row_hash": int(h), "updated_at": now}
+             for key, h, k in zip(keys, hashes, known) if not k]
+    stmt = update(table).where(table.c.source == bindparam("key_source"), table.c.key == bindparam("key_key"))
+    for start in range(0, len(changed), loader.BATCH_SIZE):
+        db.execute(stmt, changed[start:start + loader.BATCH_SIZE])
+    for start in range(0, len(fresh), loader.BATCH_SIZE):
+        db.execute(insert(table), fresh[start:start + loader.BATCH_SIZE])
+
+
+def _write(db, source, raw, result, manifest=None, lookup=True):
+    """Insert/update the new and changed rows of ``raw``, adding to the
+    counts of ``result``. Compares against ``manifest`` (default: all of
+    ``source``'s); keys not in it are looked up in the table unless
+    ``lookup`` is false (every stored row is known to be tracked). Returns the manifest keys missing from ``raw``, the
+    campaign names of the written rows and of the inserted ones."""
+    raw = raw.dropna(subset=list(source.keys)).drop_duplicates(list(source.keys))
+    keys = row_keys(raw, source.keys)
+    incoming = pd.DataFrame({"key": keys.to_numpy(dtype=object), "row_hash": row_hashes(raw)})
+    # Whole file against the whole manifest: on a first sync most keys are
+    # unknown, and one scan beats thousands of lookups
+    scan = manifest is None and len(raw) > CHUNK * 20
+    if manifest is None:
+        manifest = _manifest(db, source)
+    merged = incoming.merge(manifest, on="key", how="left")
+    known = merged["stored"].notna().to_numpy()
+    changed = known & (merged["stored"].fillna(0).to_numpy(dtype=np.int64) != merged["row_hash"].to_numpy())
+    unknown = ~known
+    adopt = np.zeros(len(raw), dtype=bool)
+    if lookup and unknown.any():
+        # Not ingested before: insert unless the table has the key already
+        present = merged["key"][unknown].isin(_stored_keys(db, source, raw[unknown], scan)).to_numpy()
+        adopt[np.flatnonzero(unknown)[present]] = True
+    new = unknown & ~adopt
+    dirty = changed | adopt
+
+    if new.any():
+        result.inserted += loader.bulk_insert(db, source.model, source.prepare(raw[new].copy()))
+    if dirty.any():
+        _update(db, source, source.prepare(raw[dirty].copy()))
+        result.updated += int(dirty.sum())
+    result.unchanged += int(len(raw) - new.sum() - dirty.sum())
+    write = new | dirty
+    if write.any():
+        _record(db, source, merged["key"][write].tolist(), merged["row_hash"][write].to_numpy(),
+                known[write].tolist())
+    vanished = manifest["key"][~manifest["key"].isin(merged["key"])].tolist()
+    return vanished, set(raw["name"][write]), set(raw["name"][new])
+
+
+def sync(db, data_dir: str = DATA_DIR, delete_missing: bool = False, dry_run: bool = False,
+         sources: Iterable[loader.Source] = SOURCES) -> Dict[str, SyncResult]:
+    """Bring the campaign tables in line with the CSVs in ``data_dir``.
+
+    One transaction: every file is read first, rows are written parents
+    first and deleted children first, campaigns whose rows changed get
+    their version bumped, and the caches are dropped after the commit.
+    ``dry_run`` rolls the transaction back and only reports the counts.
+    """
+    start = time.perf_counter()
+    sources = list(sources)
+    frames = {source.name: source.read(data_dir) for source in sources}
+    results = {source.name: SyncResult() for source in sources}
+    vanished = {}
+    touched, created = set(), set()
+    try:
+        for source in sources:
+            vanished[source.name], written, inserted = _write(db, source, frames[source.name], results[source.name])
+            touched |= written
+            if source.name == "campaigns":
+                created |= inserted
+        if delete_missing:
+            for source in reversed(sources):
+                keys = vanished[source.name]
+                if not keys:
+                    continue
+                _delete(db, source, keys)
+                results[source.name].deleted = len(keys)
+                if source.name != "campaigns":
+                    touched.update(key.split(KEY_SEPARATOR)[0] for key in keys)
+        # New campaigns start at version 1
+        loader.bump_versions(db, touched - created)
+        if dry_run:
+            db.rollback()
+        else:
+            db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    if not dry_run:
+        intervals.invalidate()
+        cache.invalidate()
+    logger.info("ingest_synced", extra={
+        "data_dir": data_dir, "dry_run": dry_run, "elapsed": round(time.perf_counter() - start, 3),
+        **{f"{name}_{field}": value for name, result in results.items() for field, value in asdict(result).items()},
+    })
+    return results
@@ -0,0 +1,373 @@
+"""Asynchronous bulk imports behind ``POST /campaigns/import``.
+
+The request only spools the upload to ``IMPORT_DIR``, checks its header and
+records an ``ImportJob``. A dedicated thread pool (``IMPORT_WORKERS``) does
+the rest, so a large file neither holds the request open nor occupies the
+threads that serve the API.
+
+The worker reads the file ``IMPORT_CHUNK_ROWS`` rows at a time. Each chunk
+is validated as a whole, written with the loader's bulk insert (``COPY`` on
+PostgreSQL) and the delta sync's batched update, and committed together
+with the job's counters, which is what ``GET /jobs/{id}`` reports. Rows
+are matched by natural key within the uploading company: known keys are
+updated, new ones inserted. Rejected rows are skipped and listed on the
+job. An interrupted import keeps its committed chunks; uploading the file
+again updates them in place.
+
+Jobs live in this process's pool, so a restart loses them. ``recover``
+runs at startup: queued jobs whose upload is still spooled are queued
+again, jobs left running are marked failed, and stray spool files are
+removed. It assumes one API process per ``IMPORT_DIR``.
+
+Rows written here are not in the ingest manifest, so the CSV sync leaves
+them alone.
+"""
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Float, Integer, select
+
+from ..campaigns import cache, intervals
+from ..campaigns.models import Campaign, _utcnow
+from ..database import SessionLocal
+from . import delta, loader, stream
+from .cleaning import INTEGER_MAX
+from .loader import KEY_DTYPES, SOURCES
+from .models import ImportJob
+
+try:
+    import pyarrow.parquet as pq
+except Exception:  # pragma: no cover - optional dependency
+    pq = None
+
+logger = logging.getLogger("app.ingest.imports")
+
+IMPORT_DIR = os.getenv("IMPORT_DIR", os.path.join(tempfile.gettempdir(), "campaign-imports"))
+# Jobs processed at once; 0 runs each job in the request thread (tests)
+_default_workers = "0" if os.getenv("TESTING") == "1" else "1"
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", _default_workers))
+IMPORT_CHUNK_ROWS = int(os.getenv("IMPORT_CHUNK_ROWS", "50000"))
+IMPORT_MAX_BYTES = int(os.getenv("IMPORT_MAX_MB", "512")) * 1024 * 1024
+# Rejected rows listed on a job; ``failed`` still counts all of them
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+COPY_BUFFER = 1024 * 1024
+
+SOURCES_BY_NAME = {source.name: source for source in SOURCES}
+FORMATS = {".csv": "csv", ".parquet": "parquet", ".pq": "parquet"}
+DATE_COLUMNS = ("fecha_inicio", "fecha_fin")
+# Columns that go through app.ingest.cleaning, which always yields a value
+CLEANED_COLUMNS = set(loader.PERIOD_NUMBER_COLUMNS) | set(loader.SITE_NUMBER_COLUMNS)
+
+_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+class ImportRejected(Exception):
+    """The upload cannot be queued; ``status_code`` is the HTTP answer."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def file_format(filename: Optional[str], content_type: Optional[str] = None) -> str:
+    """``csv`` or ``parquet``, from the file extension or, without one, the
+    content type."""
+    extension = os.path.splitext(filename or "")[1].lower()
+    fmt = FORMATS.get(extension)
+    if not extension and content_type:
+        if "parquet" in content_type:
+            fmt = "parquet"
+        elif content_type in ("text/csv", "application/csv"):
+            fmt = "csv"
+    if fmt is None:
+        raise ImportRejected(415, "Upload a .csv or .parquet file")
+    if fmt == "parquet" and pq is None:
+        raise ImportRejected(501, "Parquet imports need pyarrow installed on the server")
+    return fmt
+
+
+def spool_path(job_id: str, fmt: str) -> str:
+    return os.path.join(IMPORT_DIR, f"{job_id}.{fmt}")
+
+
+def _spool(upload: BinaryIO, path: str):
+    """Copy ``upload`` to ``path`` block by block; returns its size in bytes
+    and number of lines."""
+    size = lines = 0
+    last = b"\n"
+    with open(path, "wb") as out:
+        while True:
+            block = upload.read(COPY_BUFFER)
+            if not block:
+                break
+            size += len(block)
+            if size > IMPORT_MAX_BYTES:
+                raise ImportRejected(413, f"Uploads are limited to {IMPORT_MAX_BYTES // (1024 * 1024)} MB")
+            lines += block.count(b"\n")
+            last = block[-1:]
+            out.write(block)
+    return size, lines + (last != b"\n")
+
+
+def _header(path: str, fmt: str):
+    """Column names and row count (estimated for CSV) of the spooled file."""
+    try:
+        if fmt == "parquet":
+            parquet = pq.ParquetFile(path)
+            return parquet.schema_arrow.names, parquet.metadata.num_rows
+        return list(pd.read_csv(path, nrows=0).columns), None
+    except Exception as e:
+        raise ImportRejected(422, f"Could not read the {fmt} file: {e}")
+
+
+def _discard(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def create_job(db, upload: BinaryIO, filename: Optional[str], content_type: Optional[str], source_name: str,
+               company_id: int) -> ImportJob:
+    """Spool ``upload`` and queue its import into ``source_name``'s table
+    for ``company_id``. Raises ``ImportRejected`` when the file cannot be
+    imported at all (format, size, missing columns)."""
+    source = SOURCES_BY_NAME[source_name]
+    fmt = file_format(filename, content_type)
+    job_id = uuid.uuid4().hex
+    os.makedirs(IMPORT_DIR, exist_ok=True)
+    path = spool_path(job_id, fmt)
+    try:
+        size, lines = _spool(upload, path)
+        columns, rows = _header(path, fmt)
+        missing = [c for c in source.columns if c not in columns]
+        if missing:
+            raise ImportRejected(422, f"Missing columns: {', '.join(missing)}")
+    except BaseException:
+        _discard(path)
+        raise
+    job = ImportJob(id=job_id, company_id=company_id, source=source.name, format=fmt, filename=filename,
+                    status="queued", rows_total=rows if rows is not None else max(lines - 1, 0),
+                    rows_processed=0, inserted=0, updated=0, failed=0, errors=[])
+    db.add(job)
+    db.commit()
+    logger.info("import_queued", extra={"job_id": job_id, "company_id": company_id, "source": source.name,
+                                        "format": fmt, "bytes": size})
+    submit(job_id)
+    db.refresh(job)
+    return job
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=IMPORT_WORKERS, thread_name_prefix="import")
+        return _executor
+
+
+def submit(job_id: str) -> None:
+    if IMPORT_WORKERS <= 0:
+        run(job_id)
+    else:
+        _pool().submit(run, job_id)
+
+
+def _read(path: str, fmt: str, source):
+    """The spooled file as frames of at most ``IMPORT_CHUNK_ROWS`` rows."""
+    columns = list(source.columns)
+    if fmt == "parquet":
+        keys = {c: "str" for c in KEY_DTYPES if c in columns}
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=IMPORT_CHUNK_ROWS, columns=columns):
+            yield batch.to_pandas().astype(keys)
+    else:
+        with pd.read_csv(path, usecols=columns, dtype=KEY_DTYPES, chunksize=IMPORT_CHUNK_ROWS) as reader:
+            yield from reader
+
+
+def _invalid(source, raw):
+    """``(mask, message)`` for values the table cannot take as they are."""
+    table = source.model.__table__
+    for column in source.columns:
+        if column in source.keys or column in CLEANED_COLUMNS:
+            continue
+        values = raw[column]
+        if column in DATE_COLUMNS:
+            parsed = pd.to_datetime(values, format="%Y-%m-%d", errors="coerce")
+            yield values.notna() & parsed.isna(), f"Invalid {column}: expected YYYY-MM-DD"
+            continue
+        model_column = table.columns.get(column)
+        if model_column is None or not isinstance(model_column.type, (Integer, Float)):
+            continue
+        parsed = pd.to_numeric(values, errors="coerce")
+        yield values.notna() & parsed.isna(), f"Invalid {column}: not a number"
+        if isinstance(model_column.type, Integer):
+            yield parsed.abs() > INTEGER_MAX, f"Invalid {column}: out of range"
+
+
+def _owners(db, names) -> dict:
+    """Company of each existing campaign in ``names``."""
+    owners = {}
+    conn = db.connection()
+    for chunk in delta._chunks(names):
+        owners.update(conn.execute(select(Campaign.name, Campaign.company_id).where(Campaign.name.in_(chunk))).all())
+    return owners
+
+
+def _has_rows(db, source, names) -> bool:
+    """Whether ``source``'s table has rows of any campaign in ``names``: when
+    not, the per-key lookup can be skipped (first import of new campaigns)."""
+    column = getattr(source.model, source.model_keys[0])
+    conn = db.connection()
+    return any(conn.execute(select(column).where(column.in_(chunk)).limit(1)).first()
+               for chunk in delta._chunks(names))
+
+
+def _apply(db, source, company_id: int, raw, first_row: int, seen):
+    """Validate and write one chunk. Returns ``(inserted, updated,
+    rejected, seen)``, ``rejected`` as ``{"row", "error"}`` dicts and
+    ``seen`` the sorted key hashes imported so far."""
+    problems = pd.Series(None, index=raw.index, dtype=object)
+
+    def reject(mask, message):
+        problems[mask & problems.isna()] = message
+
+    for key in source.keys:
+        reject(raw[key].isna(), f"Missing {key}")
+    for mask, message in _invalid(source, raw):
+        reject(mask, message)
+
+    # Same rule as the seed: the first occurrence of a key wins
+    keys = delta.row_keys(raw, source.keys)
+    hashed = pd.util.hash_array(keys.to_numpy(dtype=object), categorize=False).view(np.int64)
+    valid = problems.isna().to_numpy()
+    repeated = stream._contains(seen, hashed)
+    repeated[valid] |= pd.Series(hashed[valid]).duplicated().to_numpy()
+    reject(pd.Series(valid & repeated, index=raw.index), "Duplicate key: an earlier row was imported")
+    seen = np.sort(np.concatenate([seen, hashed[valid & ~repeated]]), kind="stable")
+
+    owners = _owners(db, raw["name"][problems.isna()].unique().tolist())
+    owner = raw["name"].map(owners)
+    if source.name == "campaigns":
+        # Existing campaigns without a company (seeded ones) are no one's to
+        # claim: no company can see them, so none may overwrite them either
+        reject(raw["name"].isin(list(owners)) & (owner != company_id), "Campaign belongs to another company")
+    else:
+        reject(owner != company_id, "Unknown campaign")
+
+    good = problems.isna().to_numpy()
+    rows = raw[good]
+    if source.name == "campaigns":
+        exists = rows["name"].isin(list(owners)).to_numpy()
+    else:
+        exists = np.zeros(len(rows), dtype=bool)
+        if _has_rows(db, source, rows["name"].unique().tolist()):
+            exists = keys[good].isin(delta._stored_keys(db, source, rows)).to_numpy()
+    inserted = updated = 0
+    if (~exists).any():
+        prepared = source.prepare(rows[~exists].copy())
+        if source.name == "campaigns":
+            prepared["company_id"] = company_id
+        inserted = loader.bulk_insert(db, source.model, prepared)
+    if exists.any():
+        delta._update(db, source, source.prepare(rows[exists].copy()))
+        updated = int(exists.sum())
+    # New campaigns start at version 1; every child write moves its campaign
+    touched = rows["name"][exists] if source.name == "campaigns" else rows["name"]
+    loader.bump_versions(db, touched)
+
+    bad = ~good
+    numbers = np.arange(first_row, first_row + len(raw))[bad]
+    rejected = [{"row": int(n), "error": e} for n, e in zip(numbers, problems[bad])]
+    return inserted, updated, rejected, seen
+
+
+def run(job_id: str) -> None:
+    """Process queued job ``job_id`` to the end, committing chunk by chunk."""
+    db = SessionLocal()
+    try:
+        job = db.get(ImportJob, job_id)
+        if job is None or job.status != "queued":
+            return
+        path = spool_path(job.id, job.format)
+        source = SOURCES_BY_NAME[job.source]
+        job.status, job.started_at = "running", _utcnow()
+        db.commit()
+        start = time.perf_counter()
+        seen = np.empty(0, dtype=np.int64)
+        try:
+            for raw in _read(path, job.format, source):
+                inserted, updated, rejected, seen = _apply(db, source, job.company_id, raw,
+                                                           job.rows_processed + 1, seen)
+                job.rows_processed += len(raw)
+                job.inserted += inserted
+                job.updated += updated
+                job.failed += len(rejected)
+                if rejected and len(job.errors) < IMPORT_MAX_ERRORS:
+                    # A new list: the JSON column does not track in-place changes
+                    job.errors = job.errors + rejected[:IMPORT_MAX_ERRORS - len(job.errors)]
+                db.commit()
+                cache.invalidate(job.company_id)
+                intervals.invalidate(job.company_id)
+            job.rows_total = job.rows_processed
+            job.status = "succeeded"
+        except Exception as e:
+            db.rollback()
+            logger.exception("import_failed", extra={"job_id": job_id, "error": str(e)})
+            job.status, job.detail = "failed", str(e)
+        job.finished_at = _utcnow()
+        db.commit()
+        _discard(path)
+        logger.info("import_finished", extra={
+            "job_id": job_id, "company_id": job.company_id, "source": job.source, "status": job.status,
+            "rows": job.rows_processed, "inserted": job.inserted, "updated": job.updated, "failed": job.failed,
+            "elapsed": round(time.perf_counter() - start, 3),
+        })
+    finally:
+        db.close()
+
+
+def recover() -> dict:
+    """Settle the jobs a previous process left behind: re-queue ``queued``
+    jobs whose spooled file survived, fail the others and every
+    ``running`` one, and delete spool files no queued job needs. Returns
+    the job ids by outcome."""
+    outcome = {"requeued": [], "failed": []}
+    db = SessionLocal()
+    try:
+        jobs = db.execute(select(ImportJob).where(ImportJob.status.in_(("queued", "running")))
+                          .order_by(ImportJob.created_at, ImportJob.id)).scalars().all()
+        for job in jobs:
+            if job.status == "queued" and os.path.exists(spool_path(job.id, job.format)):
+                outcome["requeued"].append(job.id)
+                continue
+            if job.status == "running":
+                job.detail = (f"Interrupted by a server restart after {job.rows_processed} rows; "
+                              "those rows were kept, upload the file again to finish")
+            else:
+                job.detail = "The uploaded file was lost in a server restart; upload it again"
+            job.status, job.finished_at = "failed", _utcnow()
+            outcome["failed"].append(job.id)
+        db.commit()
+    finally:
+        db.close()
+    keep = {f"{job_id}." for job_id in outcome["requeued"]}
+    if os.path.isdir(IMPORT_DIR):
+        for name in os.listdir(IMPORT_DIR):
+            if not any(name.startswith(prefix) for prefix in keep):
+                _discard(os.path.join(IMPORT_DIR, name))
+    if outcome["requeued"] or outcome["failed"]:
+        logger.warning("import_jobs_recovered", extra={k: len(v) for k, v in outcome.items()})
+    for job_id in outcome["requeued"]:
+        submit(job_id)
+    return outcome
@@ -0,0 +1,141 @@
+"""Reading, cleaning and bulk-writing the campaign CSVs.
+
+The three source files map to one table each. ``SOURCES`` describes them:
+the file, the columns read, the natural key and how raw rows become table
+rows. Everything works on whole columns; no helper here loops per row in
+Python.
+"""
+import io
+import os
+from dataclasses import dataclass
+from typing import Callable, Tuple
+
+import pandas as pd
+from sqlalchemy import Float, Integer, insert, update
+
+from ..campaigns.models import Campaign, CampaignPeriod, CampaignSite, _utcnow
+from . import cleaning
+
+DATA_DIR = 'data'
+# Rows per INSERT statement on databases without COPY
+BATCH_SIZE = 10000
+
+CAMPAIGN_COLUMNS = [
+    'name', 'tipo_campania', 'fecha_inicio', 'fecha_fin', 'universo_zona_metro', 'impactos_personas',
+    'impactos_vehiculos', 'frecuencia_calculada', 'frecuencia_promedio', 'alcance',
+    'nse_ab', 'nse_c', 'nse_cmas', 'nse_d', 'nse_dmas', 'nse_e',
+    'edad_0a14', 'edad_15a19', 'edad_20a24', 'edad_25a34', 'edad_35a44', 'edad_45a64', 'edad_65mas',
+    'hombres', 'mujeres',
+]
+PERIOD_COLUMNS = ['name', 'period', 'impactos_periodo_personas', 'impactos_periodo_vehículos']
+SITE_COLUMNS = [
+    'name', 'codigo_del_sitio', 'tipo_de_mueble', 'tipo_de_anuncio', 'estado', 'municipio', 'zm',
+    'frecuencia_catorcenal', 'frecuencia_mensual', 'impactos_catorcenal', 'impactos_mensuales', 'alcance_mensual',
+]
+# Columns that go through app.ingest.cleaning
+PERIOD_NUMBER_COLUMNS = ['impactos_periodo_personas', 'impactos_periodo_vehículos']
+SITE_NUMBER_COLUMNS = ['impactos_catorcenal', 'impactos_mensuales', 'alcance_mensual']
+# Key columns are read as text so codes like "007" keep their zeros
+KEY_DTYPES = {'name': str, 'period': str, 'codigo_del_sitio': str}
+
+
+def coerce(frame, model):
+    """Cast numeric columns to what ``model`` stores (integers rounded, as
+    the database would on assignment)."""
+    for column in model.__table__.columns:
+        if column.name not in frame:
+            continue
+        if isinstance(column.type, Integer) and frame[column.name].dtype != "Int64":
+            frame[column.name] = pd.to_numeric(frame[column.name], errors="coerce").round().astype("Int64")
+        elif isinstance(column.type, Float):
+            frame[column.name] = pd.to_numeric(frame[column.name], errors="coerce")
+    return frame
+
+
+def prepare_campaigns(raw):
+    campaigns = raw.assign(
+        fecha_inicio=pd.to_datetime(raw['fecha_inicio'], format='%Y-%m-%d').dt.date,
+        fecha_fin=pd.to_datetime(raw['fecha_fin'], format='%Y-%m-%d').dt.date,
+    )
+    return coerce(campaigns, Campaign)
+
+
+def prepare_periods(raw):
+    cleaned = cleaning.clean_frame(raw, PERIOD_NUMBER_COLUMNS, keys=('name', 'period'))
+    return pd.DataFrame({
+        'campaign_name': raw['name'],
+        'period': raw['period'],
+        'impactos_periodo_personas': cleaned['impactos_periodo_personas'],
+        'impactos_periodo_vehiculos': cleaned['impactos_periodo_vehículos'],
+    })
+
+
+def prepare_sites(raw):
+    sites = cleaning.clean_frame(raw, SITE_NUMBER_COLUMNS, keys=('name', 'codigo_del_sitio'))
+    return coerce(sites.rename(columns={'name': 'campaign_name'}), CampaignSite)
+
+
+@dataclass(frozen=True)
+class Source:
+    """One CSV file and the table it feeds."""
+
+    name: str
+    filename: str
+    columns: Tuple[str, ...]
+    # Natural key, as CSV columns and as the matching table columns
+    keys: Tuple[str, ...]
+    model: type
+    model_keys: Tuple[str, ...]
+    prepare: Callable[[pd.DataFrame], pd.DataFrame]
+
+    def read(self, data_dir=DATA_DIR, **kwargs):
+        return pd.read_csv(os.path.join(data_dir, self.filename), usecols=list(self.columns),
+                           dtype=KEY_DTYPES, **kwargs)
+
+
+# Parents first: periods and sites reference campaigns
+SOURCES = (
+    Source('campaigns', 'bd_campanias_agrupado.csv', tuple(CAMPAIGN_COLUMNS), ('name',),
+           Campaign, ('name',), prepare_campaigns),
+    Source('periods', 'bd_campanias_periodos.csv', tuple(PERIOD_COLUMNS), ('name', 'period'),
+           CampaignPeriod, ('campaign_name', 'period'), prepare_periods),
+    Source('sites', 'bd_campanias_sitios.csv', tuple(SITE_COLUMNS), ('name', 'codigo_del_sitio'),
+           CampaignSite, ('campaign_name', 'codigo_del_sitio'), prepare_sites),
+)
+
+
+def records(frame):
+    """``frame`` as a list of dicts with None for missing values."""
+    names = list(frame.columns)
+    columns = [frame[c].to_numpy(dtype=object, na_value=None).tolist() for c in names]
+    return [dict(zip(names, row)) for row in zip(*columns)]
+
+
+def bulk_insert(db, model, frame):
+    """Insert ``frame`` in the session's transaction: ``COPY`` on
+    PostgreSQL, multi-row INSERTs of ``BATCH_SIZE`` elsewhere."""
+    if frame.empty:
+        return 0
+    table = model.__table__
+    if db.get_bind().dialect.name == "postgresql":
+        buffer = io.StringIO()
+        frame.to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        cursor = db.connection().connection.cursor()
+        cursor.copy_expert(f"COPY {table.name} ({', '.join(frame.columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    else:
+        rows = records(frame)
+        for start in range(0, len(rows), BATCH_SIZE):
+            db.execute(insert(table), rows[start:start + BATCH_SIZE])
+    return len(frame)
+
+
+def bump_versions(db, names):
+    """Bump ``version``/``updated_at`` of campaigns ``names``: Core writes
+    bypass the ORM hook that does it for session changes."""
+    names = sorted(set(names))
+    now = _utcnow()
+    for start in range(0, len(names), 500):
+        db.execute(update(Campaign).where(Campaign.name.in_(names[start:start + 500]))
+                   .values(version=Campaign.version + 1, updated_at=now)
+                   .execution_options(synchronize_session=False))
@@ -0,0 +1,51 @@
+from sqlalchemy import JSON, BigInteger, Column, DateTime, ForeignKey, Integer, String, func
+
+from ..campaigns.models import _utcnow
+from ..database import Base
+
+
+class IngestManifest(Base):
+    """Content hash of every ingested CSV row, by source and natural key.
+
+    ``key`` is the natural key of the row (see ``app.ingest.delta.row_keys``);
+    ``row_hash`` the 64-bit hash of its values as last written.
+    """
+
+    __tablename__ = "ingest_manifest"
+
+    source = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)
+    row_hash = Column(BigInteger, nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=_utcnow, server_default=func.now())
+
+
+class ImportJob(Base):
+    """One ``POST /campaigns/import`` upload and how far its processing got.
+
+    ``rows_total`` is estimated from the line count while spooling (exact
+    for Parquet) and set to the rows read once the job finishes. ``errors``
+    holds the first ``IMPORT_MAX_ERRORS`` rejected rows as ``{"row",
+    "error"}``; ``failed`` counts all of them.
+    """
+
+    __tablename__ = "import_jobs"
+
+    id = Column(String, primary_key=True)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False, index=True)
+    # Source name (campaigns, periods, sites) and file format (csv, parquet)
+    source = Column(String, nullable=False)
+    format = Column(String, nullable=False)
+    filename = Column(String)
+    # queued -> running -> succeeded | failed
+    status = Column(String, nullable=False, default="queued")
+    rows_total = Column(Integer)
+    rows_processed = Column(Integer, nullable=False, default=0)
+    inserted = Column(Integer, nullable=False, default=0)
+    updated = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    errors = Column(JSON, nullable=False, default=list)
+    # Why the job as a whole failed
+    detail = Column(String)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=_utcnow, server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
@@ -0,0 +1,58 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Response, UploadFile
+from sqlalchemy.orm import Session
+
+from . import imports, models, schemas
+from ..database import get_db
+from ..security import get_current_user, role_required
+from ..users import models as users_models
+
+# Full paths: the import lives under /campaigns, but app.campaigns cannot
+# import this package (app.ingest.models imports app.campaigns.models)
+router = APIRouter(tags=["imports"])
+
+
+@router.post("/campaigns/import", response_model=schemas.ImportJob, status_code=202)
+def import_campaigns(
+    response: Response,
+    file: UploadFile = File(..., description="CSV or Parquet file with the columns of the seed CSV for `source`"),
+    source: Literal["campaigns", "periods", "sites"] = Query("campaigns", description="Table the file feeds"),
+    db: Session = Depends(get_db),
+    current_user: users_models.User = Depends(role_required("admin")),
+):
+    """
+    Queue a bulk import of campaigns, periods or sites for the user's company.
+
+    The upload is spooled to disk and processed by a background worker with
+    bulk inserts; the response (202) only carries the job, whose progress,
+    row counts and per-row errors are polled at `GET /jobs/{id}` (also in
+    the `Location` header). Rows are matched by natural key: existing ones
+    are updated, new ones inserted. Periods and sites must reference
+    campaigns of the company.
+    """
+    if current_user.company_id is None:
+        raise HTTPException(status_code=400, detail="User has no company")
+    try:
+        job = imports.create_job(db, file.file, file.filename, file.content_type, source, current_user.company_id)
+    except imports.ImportRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    response.headers["Location"] = f"/jobs/{job.id}"
+    return job
+
+
+@router.get("/jobs/{job_id}", response_model=schemas.ImportJob)
+def read_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: users_models.User = Depends(get_current_user),
+):
+    """
+    Status of an import started with `POST /campaigns/import`: progress, row
+    counts and the rows that were rejected, with the reason. Poll until
+    `status` is `succeeded` or `failed`.
+    """
+    job = db.get(models.ImportJob, job_id)
+    if job is None or current_user.company_id is None or job.company_id != current_user.company_id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
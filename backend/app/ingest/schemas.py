@@ -0,0 +1,40 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, ConfigDict, computed_field
+
+
+class RowError(BaseModel):
+    # 1-based data row of the upload (the CSV header is not counted)
+    row: int
+    error: str
+
+
+class ImportJob(BaseModel):
+    id: str
+    source: str
+    format: str
+    filename: Optional[str] = None
+    status: str
+    rows_total: Optional[int] = None
+    rows_processed: int
+    inserted: int
+    updated: int
+    failed: int
+    errors: List[RowError]
+    detail: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    model_config = ConfigDict(from_attributes=True)
+
+    @computed_field
+    @property
+    def progress(self) -> Optional[float]:
+        """Share of the rows processed, 0 to 1 (``rows_total`` is an estimate
+        for CSV until the job finishes)."""
+        if self.status == "succeeded":
+            return 1.0
+        if not self.rows_total:
+            return None
+        return round(min(self.rows_processed / self.rows_total, 1.0), 4)
@@ -0,0 +1,232 @@
+"""Chunked variant of ``delta.sync`` for large CSVs, sized to a memory budget.
+
+Each file is read a chunk at a time; every chunk is hashed,
+compared with the manifest entries of its own keys, written and committed
+before the next one is read, so the rows of the file are never all in
+memory. Chunk sizes come from a memory budget (``INGEST_MEMORY_LIMIT_MB``):
+the bytes per row measured on the previous chunk (a small sample for the
+first one) times ``CHUNK_OVERHEAD`` for the copies made while cleaning and
+writing. Every chunk read is measured (``memory_usage(deep=True)``) before
+it is processed: one whose rows turn out wider than the previous ones is
+split in halves until each part fits, and when ``MIN_CHUNK_ROWS`` rows alone
+do not fit the load stops with ``MemoryBudgetExceeded`` (the chunks
+committed so far stay, as after any interruption). Memory the database
+driver buffers on its side is not counted.
+
+The state kept across chunks is one 8-byte hash per key seen, so a key
+repeated later in the file is skipped exactly as the full sync does. It
+grows with the number of distinct keys (8 MB per million rows) on top of
+the budget.
+
+Campaigns are loaded first; periods and sites then load concurrently, each
+on its own session and connection, with the budget split between them.
+SQLite allows a single writer, so there they run one after the other.
+
+Campaign versions are bumped once per table, after its last chunk. An
+interrupted run leaves the committed chunks in place (without that bump)
+and the next run skips them as unchanged. Vanished rows are not deleted in this mode (that
+needs every key of the file at once); use ``delta.sync`` with
+``delete_missing`` for that.
+"""
+import ctypes
+import logging
+import os
+import resource
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from ..campaigns import cache, intervals
+from ..database import SessionLocal, engine
+from . import delta, loader
+from .loader import DATA_DIR, SOURCES
+
+logger = logging.getLogger("app.ingest.stream")
+
+INGEST_MEMORY_LIMIT_MB = float(os.getenv("INGEST_MEMORY_LIMIT_MB", "256"))
+# Tables loaded at once after the campaigns (forced to 1 on SQLite)
+INGEST_PARALLELISM = int(os.getenv("INGEST_PARALLELISM", "2"))
+# Peak memory of processing a chunk, as a multiple of the chunk's own size
+CHUNK_OVERHEAD = 6
+SAMPLE_ROWS = 1000
+# Chunks are not split below this; a budget too small for it is an error
+MIN_CHUNK_ROWS = 100
+
+try:
+    # Hands the memory freed after each chunk back to the OS (glibc only);
+    # without it the allocator keeps it and RSS creeps up chunk by chunk
+    _malloc_trim = ctypes.CDLL("libc.so.6").malloc_trim
+except (OSError, AttributeError):  # pragma: no cover - not glibc
+    _malloc_trim = None
+
+
+class MemoryBudgetExceeded(Exception):
+    """Raised when the smallest chunk of a file does not fit the budget."""
+
+    def __init__(self, source: str, rows: int, needed: float, budget: float):
+        super().__init__(f"{source}: {rows} rows need {needed / 2 ** 20:.1f} MB to process, "
+                         f"over the {budget / 2 ** 20:.1f} MB memory budget")
+        self.source = source
+
+
+@dataclass
+class StreamResult(delta.SyncResult):
+    rows: int = 0
+    duplicates: int = 0
+    chunks: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+
+def chunk_rows(bytes_per_row: float, budget_bytes: int) -> int:
+    """Rows per chunk so that one chunk being processed stays within
+    ``budget_bytes``."""
+    return max(MIN_CHUNK_ROWS, int(budget_bytes / (max(bytes_per_row, 1.0) * CHUNK_OVERHEAD)))
+
+
+def peak_rss_mb() -> float:
+    """Peak resident memory of this process, in MB."""
+    # VmHWM starts over at exec; ru_maxrss keeps the parent's peak
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _contains(sorted_values, values) -> np.ndarray:
+    """Membership of ``values`` in the sorted array ``sorted_values``."""
+    if not len(sorted_values):
+        return np.zeros(len(values), dtype=bool)
+    positions = np.minimum(np.searchsorted(sorted_values, values), len(sorted_values) - 1)
+    return sorted_values[positions] == values
+
+
+def _frame_bytes(frame) -> float:
+    return float(frame.memory_usage(deep=True, index=False).sum())
+
+
+def _pieces(source, frame, size: float, budget_bytes: int):
+    """``frame`` (``size`` bytes) in consecutive parts whose processing fits
+    ``budget_bytes``, halving the ones that do not."""
+    if size * CHUNK_OVERHEAD <= budget_bytes:
+        yield frame
+    elif len(frame) <= MIN_CHUNK_ROWS:
+        raise MemoryBudgetExceeded(source.name, len(frame), size * CHUNK_OVERHEAD, budget_bytes)
+    else:
+        for part in (frame.iloc[:len(frame) // 2], frame.iloc[len(frame) // 2:]):
+            yield from _pieces(source, part, _frame_bytes(part), budget_bytes)
+
+
+def _load(source, data_dir, budget_bytes, created, progress, session_factory) -> StreamResult:
+    result = StreamResult()
+    start = time.perf_counter()
+    sample = source.read(data_dir, nrows=SAMPLE_ROWS)
+    per_row = _frame_bytes(sample) / max(len(sample), 1)
+    del sample
+    # Sorted hashes of the keys already loaded from this file
+    seen = np.empty(0, dtype=np.int64)
+    touched = set()
+    db = session_factory()
+    try:
+        # Unknown keys can only be in the table if it has untracked rows
+        lookup = delta.untracked_rows(db, source) > 0
+        with source.read(data_dir, iterator=True) as reader:
+            while True:
+                try:
+                    raw = reader.get_chunk(chunk_rows(per_row, budget_bytes))
+                except StopIteration:
+                    break
+                size = _frame_bytes(raw)
+                per_row = size / max(len(raw), 1)
+                # The whole chunk, unless it measures over the budget
+                for piece in _pieces(source, raw, size, budget_bytes):
+                    result.rows += len(piece)
+                    piece = piece.dropna(subset=list(source.keys))
+                    keys = delta.row_keys(piece, source.keys).to_numpy(dtype=object)
+                    hashed = pd.util.hash_array(keys, categorize=False).view(np.int64)
+                    first = ~_contains(seen, hashed) & ~pd.Series(hashed).duplicated().to_numpy()
+                    result.duplicates += int(len(piece) - first.sum())
+                    # kind="stable" is timsort for int64: ``seen`` is one sorted
+                    # run, so this costs a merge plus sorting the new keys
+                    # rather than a full re-sort
+                    seen = np.sort(np.concatenate([seen, hashed[first]]), kind="stable")
+                    piece = piece[first]
+
+                    manifest = delta._manifest(db, source, keys[first].tolist())
+                    _, written, inserted = delta._write(db, source, piece, result, manifest, lookup)
+                    if source.name == "campaigns":
+                        created |= inserted
+                        written -= inserted
+                    touched |= written
+                    db.commit()
+                    del piece, keys, hashed, manifest
+                    if _malloc_trim is not None:
+                        _malloc_trim(0)
+                    result.chunks += 1
+                    result.elapsed = time.perf_counter() - start
+                    if progress is not None:
+                        progress(source.name, result)
+        # Once per table rather than per chunk: the caches are only dropped
+        # at the end anyway
+        loader.bump_versions(db, touched - created)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def stream(data_dir: str = DATA_DIR, memory_limit_mb: int = INGEST_MEMORY_LIMIT_MB,
+           parallelism: int = INGEST_PARALLELISM,
+           progress: Optional[Callable[[str, StreamResult], None]] = None,
+           sources: Iterable[loader.Source] = SOURCES,
+           session_factory=SessionLocal) -> Dict[str, StreamResult]:
+    """Load the CSVs in ``data_dir`` chunk by chunk within
+    ``memory_limit_mb`` of working memory.
+
+    ``progress(source_name, result)`` is called after every committed
+    chunk with the running counts.
+    """
+    sources = list(sources)
+    if engine.dialect.name == "sqlite":
+        parallelism = 1
+    parallelism = max(1, parallelism)
+    budget = int(memory_limit_mb * 1024 * 1024)
+    start = time.perf_counter()
+    created = set()
+    results = {}
+    parents, children = sources[:1], sources[1:]
+    for source in parents:
+        results[source.name] = _load(source, data_dir, budget, created, progress, session_factory)
+    if children:
+        workers = min(parallelism, len(children))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest") as pool:
+            futures = {source.name: pool.submit(_load, source, data_dir, budget // workers, created, progress,
+                                                session_factory)
+                       for source in children}
+            for name, future in futures.items():
+                results[name] = future.result()
+    intervals.invalidate()
+    cache.invalidate()
+    logger.info("ingest_streamed", extra={
+        "data_dir": data_dir, "memory_limit_mb": memory_limit_mb, "parallelism": parallelism,
+        "elapsed": round(time.perf_counter() - start, 3), "peak_rss_mb": round(peak_rss_mb(), 1),
+        **{f"{name}_{field}": value for name, result in results.items()
+           for field, value in asdict(result).items()},
+    })
+    return results
@@ -1,15 +1,22 @@
 import os
+import math
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from logging import StreamHandler
 from fastapi import FastAPI, Response, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from . import hashing, ratelimit
 from .database import engine
 
 # Import package modules so SQLAlchemy models are registered
 from .users import models as users_models
 from .campaigns import models as campaigns_models
+from .ingest import models as ingest_models
 from .users import routers as users_router
 from .campaigns import routers as campaigns_router
+from .ingest import routers as ingest_router
 
 from .database import Base
 
@@ -36,7 +43,80 @@ logger.info("Starting Campaign Analytics API", extra={"allowed_origins": os.gete
 
 # NOTE: Runtime ALTER TABLE helpers were removed. Use Alembic migrations instead.
 
-app = FastAPI(title="Campaign Analytics API")
+# Optional periodic refresh-token GC inside the API process (0 = off; use
+# the cron script instead). Each run is capped by a time budget so it never
+# competes with requests for long.
+TOKEN_GC_INTERVAL_SECONDS = float(os.getenv("TOKEN_GC_INTERVAL_SECONDS", "0"))
+TOKEN_GC_TIME_BUDGET_SECONDS = float(os.getenv("TOKEN_GC_TIME_BUDGET_SECONDS", "10"))
+
+
+def _run_token_gc():
+    from .database import SessionLocal
+    from .users import token_gc
+
+    db = SessionLocal()
+    try:
+        token_gc.collect(db, throttle_seconds=0.05, time_budget_seconds=TOKEN_GC_TIME_BUDGET_SECONDS)
+    finally:
+        db.close()
+
+
+async def _token_gc_loop():
+    while True:
+        await asyncio.sleep(TOKEN_GC_INTERVAL_SECONDS)
+        try:
+            await run_in_threadpool(_run_token_gc)
+        except Exception as e:
+            logger.exception("token_gc_failed", extra={"error": str(e)})
+
+
+def _ensure_token_partitions():
+    from .users import partitions
+
+    try:
+        with engine.begin() as conn:
+            partitions.ensure(conn)
+    except Exception as e:
+        logger.exception("refresh_token_partitions_failed", extra={"error": str(e)})
+
+
+def _recover_import_jobs():
+    from .ingest import imports
+
+    try:
+        imports.recover()
+    except Exception as e:
+        logger.exception("import_recovery_failed", extra={"error": str(e)})
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await run_in_threadpool(_ensure_token_partitions)
+    await run_in_threadpool(_recover_import_jobs)
+    task = asyncio.create_task(_token_gc_loop()) if TOKEN_GC_INTERVAL_SECONDS > 0 else None
+    try:
+        yield
+    finally:
+        if task is not None:
+            task.cancel()
+
+
+app = FastAPI(title="Campaign Analytics API", lifespan=lifespan)
+
+
+@app.exception_handler(hashing.HashingBusy)
+async def hashing_busy_handler(request: Request, exc: hashing.HashingBusy):
+    """Shed password-hashing load instead of queueing it on request threads."""
+    logger.warning("password_hashing_busy", extra={"reason": exc.reason, "path": request.url.path})
+    return Response(status_code=503, content='{"detail":"Authentication is busy, retry shortly"}',
+                    media_type="application/json", headers={"Retry-After": "1"})
+
+
+@app.exception_handler(ratelimit.RateLimited)
+async def rate_limited_handler(request: Request, exc: ratelimit.RateLimited):
+    logger.warning("rate_limited", extra={"endpoint": exc.endpoint, "scope": exc.scope, "path": request.url.path})
+    return Response(status_code=429, content='{"detail":"Too many requests, retry later"}',
+                    media_type="application/json", headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))})
 
 
 @app.middleware("http")
@@ -116,8 +196,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let browsers read pagination cursors and cache validators sent as headers
+    expose_headers=["X-Next-Cursor", "ETag", "Last-Modified", "Location"],
 )
 
 # Register routers
 app.include_router(campaigns_router.router)
 app.include_router(users_router.router)
+app.include_router(ingest_router.router)
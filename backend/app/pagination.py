@@ -0,0 +1,57 @@
+"""Opaque cursor helpers for keyset pagination.
+
+A cursor is the sort key of the last row of a page (e.g. ``(fecha_inicio,
+name)`` for campaigns) serialized as URL-safe base64 JSON. Clients must treat
+it as opaque and only echo back the ``next_cursor`` they received.
+"""
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, List, Sequence
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client supplies a cursor that cannot be decoded."""
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+        raise InvalidCursor("unknown cursor value")
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Serialize a sort-key tuple into an opaque URL-safe token."""
+    payload = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, size: int) -> List[Any]:
+    """Decode a token produced by ``encode_cursor``.
+
+    ``size`` is the expected number of key components; anything else raises
+    ``InvalidCursor`` so routers can answer 400 instead of 500.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        raw = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+        values = [_decode_value(v) for v in raw]
+    except InvalidCursor:
+        raise
+    except Exception as e:
+        raise InvalidCursor("malformed cursor") from e
+    if not isinstance(raw, list) or len(values) != size:
+        raise InvalidCursor("malformed cursor")
+    return values
@@ -0,0 +1,214 @@
+"""Token-bucket rate limits for the password-hashing endpoints.
+
+Every ``/auth/token`` and ``/auth/register`` request costs a full password
+hash, so a single client can pin the CPU (see app.hashing). The handlers
+call ``hit`` first, before any hashing or query, with the client IP and the
+target email; each key has a bucket of ``capacity`` tokens refilled over
+``per`` seconds. A request that finds its bucket empty raises
+``RateLimited``, which the app turns into a 429 with ``Retry-After``.
+
+Limits are ``"<capacity>/<seconds>"`` strings in ``RATE_LIMIT_*`` variables,
+``0`` disables one; all are off by default under ``TESTING=1``.
+
+Buckets live in process memory by default, so each worker enforces the
+limits on its own. ``RATE_LIMIT_STORAGE=sqlite:///path/to/file.db`` shares
+them between the workers of one host through a small SQLite file (not the
+application database).
+
+Rejections are exported to Prometheus when ``prometheus_client`` is
+installed.
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+try:
+    from prometheus_client import Counter
+except Exception:  # pragma: no cover - optional dependency
+    Counter = None
+
+_TESTING = os.getenv("TESTING") == "1"
+
+
+def _limit_env(name: str, default: str) -> str:
+    return os.getenv(name, "0" if _TESTING else default)
+
+
+RATE_LIMIT_STORAGE = os.getenv("RATE_LIMIT_STORAGE", "memory")
+# Most-recently used buckets kept by the in-memory storage; an evicted key
+# starts again with a full bucket
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+# Proxies in front of the app that append the peer address to
+# X-Forwarded-For (0: none, key on the socket address). The client IP is the
+# entry that many hops from the right; anything further left came from the
+# client. Without it, behind a proxy every request shares the proxy's
+# bucket; set it only behind proxies that always append, otherwise clients
+# pick their own key.
+RATE_LIMIT_TRUST_PROXY = int(os.getenv("RATE_LIMIT_TRUST_PROXY", "0"))
+
+if Counter is not None:
+    _REJECTED = Counter("app_rate_limit_rejected_total", "Requests answered with 429", ["endpoint", "scope"])
+else:  # pragma: no cover - optional dependency
+    _REJECTED = None
+
+
+class RateLimited(Exception):
+    """Raised when a request's bucket is empty."""
+
+    def __init__(self, endpoint: str, scope: str, retry_after: float):
+        super().__init__(f"rate limit exceeded for {endpoint} by {scope}")
+        self.endpoint = endpoint
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+def parse_limit(spec: str) -> Optional[Tuple[float, float]]:
+    """``"20/60"`` -> (capacity 20, refill 20/60 tokens per second); ``"0"``
+    or an empty string -> None (no limit)."""
+    spec = (spec or "").strip()
+    if spec in ("", "0"):
+        return None
+    capacity, _, seconds = spec.partition("/")
+    capacity, seconds = float(capacity), float(seconds or 1)
+    if capacity <= 0 or seconds <= 0:
+        return None
+    return capacity, capacity / seconds
+
+
+LIMITS = {
+    "login": {
+        "ip": parse_limit(_limit_env("RATE_LIMIT_LOGIN_IP", "30/60")),
+        "email": parse_limit(_limit_env("RATE_LIMIT_LOGIN_EMAIL", "10/60")),
+    },
+    "register": {
+        "ip": parse_limit(_limit_env("RATE_LIMIT_REGISTER_IP", "10/600")),
+        "email": parse_limit(_limit_env("RATE_LIMIT_REGISTER_EMAIL", "5/600")),
+    },
+}
+
+
+def _refill(tokens: float, updated: float, capacity: float, rate: float, now: float) -> float:
+    return min(capacity, tokens + max(now - updated, 0.0) * rate)
+
+
+class MemoryStorage:
+    """Buckets in a bounded LRU, per process."""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: float, rate: float, now: float) -> float:
+        """Take one token from ``key``'s bucket. Returns 0 when it was
+        taken, else the seconds until one is available."""
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = _refill(tokens, updated, capacity, rate, now)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+            self._buckets[key] = (tokens - 1 if wait == 0 else tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+class SQLiteStorage:
+    """Buckets in a SQLite file shared by every worker on the host.
+
+    Each take is one ``BEGIN IMMEDIATE`` transaction, so concurrent workers
+    serialize on the file lock. Buckets idle long enough to be full again
+    are pruned every ``PRUNE_EVERY`` takes.
+    """
+
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._takes = 0
+        self._horizon = 0.0
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit_buckets "
+            "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key: str, capacity: float, rate: float, now: float) -> float:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM rate_limit_buckets WHERE key = ?", (key,)).fetchone()
+            tokens = _refill(row[0], row[1], capacity, rate, now) if row else capacity
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+            conn.execute(
+                "INSERT INTO rate_limit_buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (key, tokens - 1 if wait == 0 else tokens, now),
+            )
+            self._takes += 1
+            self._horizon = max(self._horizon, capacity / rate)
+            if self._takes % self.PRUNE_EVERY == 0:
+                conn.execute("DELETE FROM rate_limit_buckets WHERE updated < ?", (now - self._horizon,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def reset(self) -> None:
+        self._connect().execute("DELETE FROM rate_limit_buckets")
+
+
+def storage_from_url(url: str):
+    if url == "memory":
+        return MemoryStorage()
+    if url.startswith("sqlite:///"):
+        return SQLiteStorage(url[len("sqlite:///"):])
+    raise ValueError(f"unsupported RATE_LIMIT_STORAGE: {url!r}")
+
+
+storage = storage_from_url(RATE_LIMIT_STORAGE)
+
+
+def client_ip(request) -> str:
+    if RATE_LIMIT_TRUST_PROXY:
+        hops = [hop.strip() for header in request.headers.getlist("x-forwarded-for")
+                for hop in header.split(",") if hop.strip()]
+        if hops:
+            return hops[-min(RATE_LIMIT_TRUST_PROXY, len(hops))]
+    return request.client.host if request.client else "unknown"
+
+
+def hit(endpoint: str, ip: Optional[str] = None, email: Optional[str] = None) -> None:
+    """Charge one request to ``endpoint``'s IP and email buckets.
+
+    Raises ``RateLimited`` on the first empty bucket; later buckets are not
+    charged for a rejected request.
+    """
+    now = time.time()
+    keys = (("ip", ip), ("email", email.strip().lower() if email else None))
+    for scope, value in keys:
+        limit = LIMITS.get(endpoint, {}).get(scope)
+        if limit is None or not value:
+            continue
+        wait = storage.take(f"{endpoint}:{scope}:{value}", limit[0], limit[1], now)
+        if wait:
+            if _REJECTED is not None:
+                _REJECTED.labels(endpoint=endpoint, scope=scope).inc()
+            raise RateLimited(endpoint, scope, wait)
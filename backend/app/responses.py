@@ -0,0 +1,36 @@
+"""Fast JSON response for hot list endpoints.
+
+Handlers that already hold plain dicts/lists (e.g. projected rows) can return
+``FastJSONResponse`` to skip ``jsonable_encoder`` and response-model
+validation entirely. ``orjson`` is used when installed (it encodes dates and
+datetimes natively, straight to bytes); otherwise the stdlib encoder is used.
+"""
+import json
+from datetime import date, datetime
+from typing import Any
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except Exception:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
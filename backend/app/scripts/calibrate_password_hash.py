@@ -0,0 +1,66 @@
+"""Pick the pbkdf2_sha256 cost for this host from a target verify latency.
+
+Usage:
+    python -m app.scripts.calibrate_password_hash --target-ms 50
+
+Run it on the production hardware (or the same instance type). It prints a
+``PBKDF2_ROUNDS=...`` line to put in the environment. PBKDF2 cost is linear
+in rounds, so the rounds are scaled from a probe measurement and then
+re-measured to confirm.
+
+Existing hashes more than ``HASH_ROUNDS_TOLERANCE`` away from the new cost,
+and all legacy bcrypt hashes, are upgraded transparently on each user's next
+successful login; no password reset is needed.
+"""
+import argparse
+import time
+
+from passlib.hash import pbkdf2_sha256
+
+# Bounds for calibrated rounds; the floor keeps a slow or busy host from
+# calibrating itself below a sane minimum
+MIN_ROUNDS = 10000
+MAX_ROUNDS = 10_000_000
+
+
+def measure_verify_ms(rounds: int, samples: int = 5) -> float:
+    """Median wall time, in ms, of one verify at ``rounds``."""
+    hashed = pbkdf2_sha256.using(rounds=rounds).hash("calibration-password")
+    timings = []
+    for _ in range(samples):
+        t0 = time.perf_counter()
+        pbkdf2_sha256.verify("calibration-password", hashed)
+        timings.append((time.perf_counter() - t0) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+def calibrate(target_ms: float, samples: int = 5, probe_rounds: int = 50000) -> int:
+    rounds = probe_rounds
+    # Two scaling passes absorb fixed per-call overhead at small probe sizes
+    for _ in range(2):
+        elapsed = measure_verify_ms(rounds, samples)
+        rounds = int(rounds * target_ms / elapsed)
+        rounds = max(MIN_ROUNDS, min(MAX_ROUNDS, rounds))
+    # Round to 3 significant figures so repeated runs give stable values
+    magnitude = 10 ** max(len(str(rounds)) - 3, 0)
+    return max(MIN_ROUNDS, rounds // magnitude * magnitude)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate pbkdf2_sha256 rounds for a target verify latency")
+    parser.add_argument("--target-ms", type=float, default=50.0, help="Target verify time per login (default 50)")
+    parser.add_argument("--samples", type=int, default=5, help="Verifies per measurement (median is used)")
+    args = parser.parse_args()
+
+    current = pbkdf2_sha256.default_rounds
+    print(f"passlib default: {current} rounds -> {measure_verify_ms(current, args.samples):.1f} ms")
+    rounds = calibrate(args.target_ms, args.samples)
+    measured = measure_verify_ms(rounds, args.samples)
+    print(f"calibrated:      {rounds} rounds -> {measured:.1f} ms (target {args.target_ms:.0f} ms, "
+          f"~{1000 / measured:.0f} logins/s per hashing worker)")
+    print(f"PBKDF2_ROUNDS={rounds}")
+
+
+if __name__ == "__main__":
+    main()
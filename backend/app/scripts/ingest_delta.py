@@ -0,0 +1,74 @@
+"""Apply the changes in the campaign CSVs to the database.
+
+Usage:
+    python -m app.scripts.ingest_delta --help
+
+Compares every row of ``bd_campanias_agrupado.csv``,
+``bd_campanias_periodos.csv`` and ``bd_campanias_sitios.csv`` with the
+content hashes stored in ``ingest_manifest`` (see app.ingest.delta) and
+writes only new and changed rows, in one transaction. Meant for the nightly
+refresh; ``seed.py`` runs the same sync.
+
+``--stream`` reads the files in chunks sized to ``--memory-limit-mb`` and
+commits per chunk instead (see app.ingest.stream), printing progress and
+rows per second as it goes. It exits with status 1 when the budget is too
+small for the smallest chunk of a file.
+"""
+import argparse
+import logging
+import sys
+
+from ..database import SessionLocal
+from ..ingest import delta, stream
+from ..ingest.loader import DATA_DIR
+
+
+logger = logging.getLogger("app.scripts.ingest_delta")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync the campaign CSVs incrementally")
+    parser.add_argument("--data-dir", default=DATA_DIR, help=f"Directory with the CSVs (default: {DATA_DIR})")
+    parser.add_argument("--delete-missing", action="store_true",
+                        help="Delete rows that are no longer in the files (only rows a previous ingest wrote)")
+    parser.add_argument("--dry-run", action="store_true", help="Report the changes and roll them back")
+    parser.add_argument("--stream", action="store_true", help="Load chunk by chunk within a memory budget")
+    parser.add_argument("--memory-limit-mb", type=float, default=stream.INGEST_MEMORY_LIMIT_MB,
+                        help=f"Working memory for --stream (default: {stream.INGEST_MEMORY_LIMIT_MB})")
+    parser.add_argument("--parallelism", type=int, default=stream.INGEST_PARALLELISM,
+                        help=f"Tables loaded at once after campaigns with --stream (default: {stream.INGEST_PARALLELISM})")
+    args = parser.parse_args()
+
+    if args.stream:
+        if args.delete_missing or args.dry_run:
+            parser.error("--stream does not support --delete-missing or --dry-run")
+        try:
+            results = stream.stream(
+                args.data_dir, memory_limit_mb=args.memory_limit_mb, parallelism=args.parallelism,
+                progress=lambda name, r: print(f"... {name}: {r.rows} rows in {r.chunks} chunks "
+                                               f"({r.rows_per_second:.0f} rows/s)", flush=True),
+            )
+        except stream.MemoryBudgetExceeded as exc:
+            print(f"error: {exc}", file=sys.stderr)
+            return 1
+        for name, result in results.items():
+            print(f"Loaded {name}: {result.rows} rows in {result.elapsed:.1f}s ({result.rows_per_second:.0f} rows/s), "
+                  f"{result.inserted} inserted, {result.updated} updated, {result.unchanged} unchanged, "
+                  f"{result.duplicates} duplicate keys skipped")
+        print(f"Peak memory {stream.peak_rss_mb():.0f} MB")
+        return 0
+
+    db = SessionLocal()
+    try:
+        results = delta.sync(db, args.data_dir, delete_missing=args.delete_missing, dry_run=args.dry_run)
+        prefix = "Would apply" if args.dry_run else "Applied"
+        for name, result in results.items():
+            print(f"{prefix} {name}: {result.inserted} inserted, {result.updated} updated, "
+                  f"{result.deleted} deleted, {result.unchanged} unchanged")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
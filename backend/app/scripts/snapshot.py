@@ -0,0 +1,65 @@
+"""Write Parquet snapshots of companies' campaign data.
+
+Usage:
+    python -m app.scripts.snapshot --help
+
+Writes ``campaigns``, ``campaign_periods`` and ``campaign_sites`` of each
+company to ``SNAPSHOT_DIR/company_<id>/<version>/`` (see
+app.campaigns.snapshots) and keeps the newest ``--keep`` versions. Without
+``--company-id`` every company that has campaigns is snapshotted. Load a
+snapshot back in a notebook with::
+
+    from app.campaigns import snapshots
+    sites = snapshots.read_table(1, "campaign_sites").to_pandas()
+"""
+import argparse
+import sys
+
+from sqlalchemy import select
+
+from ..campaigns import snapshots
+from ..campaigns.models import Campaign
+from ..database import SessionLocal
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write Parquet snapshots of campaign data")
+    parser.add_argument("--company-id", type=int, action="append",
+                        help="Company to snapshot (repeatable; default: every company with campaigns)")
+    parser.add_argument("--dir", default=snapshots.SNAPSHOT_DIR,
+                        help=f"Snapshot root directory (default: {snapshots.SNAPSHOT_DIR})")
+    parser.add_argument("--keep", type=int, default=snapshots.SNAPSHOT_KEEP,
+                        help=f"Versions kept per company (default: {snapshots.SNAPSHOT_KEEP})")
+    parser.add_argument("--list", action="store_true", help="List existing snapshots instead of writing one")
+    args = parser.parse_args()
+
+    company_ids = args.company_id
+    if not company_ids:
+        db = SessionLocal()
+        try:
+            company_ids = db.execute(select(Campaign.company_id).where(Campaign.company_id.is_not(None))
+                                     .distinct().order_by(Campaign.company_id)).scalars().all()
+        finally:
+            db.close()
+
+    if args.list:
+        for company_id in company_ids:
+            for version in snapshots.versions(company_id, args.dir):
+                manifest = snapshots.manifest(company_id, version, args.dir)
+                rows = ", ".join(f"{name} {table['rows']}" for name, table in manifest["tables"].items())
+                print(f"company {company_id} {version}: {rows}")
+        return 0
+
+    if snapshots.pa is None:
+        print("Parquet snapshots need pyarrow: pip install pyarrow", file=sys.stderr)
+        return 1
+    for company_id in company_ids:
+        manifest = snapshots.write(company_id, args.dir, keep=args.keep)
+        size = sum(table["bytes"] for table in manifest["tables"].values()) / (1024 * 1024)
+        rows = ", ".join(f"{table['rows']} {name}" for name, table in manifest["tables"].items())
+        print(f"Wrote company {company_id} snapshot {manifest['version']}: {rows} ({size:.1f} MB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,19 @@
+import hashlib
 import os
+import time
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from passlib.hash import pbkdf2_sha256
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 
+from . import hashing
+from .cache import TTLCache
 from .database import get_db
 
 # Read from env or use defaults (in production, set a secure SECRET_KEY)
@@ -15,20 +21,53 @@ SECRET_KEY = os.getenv("SECRET_KEY", "change-me-in-prod")
 ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+# Verified access tokens kept per process, keyed by SHA-256 of the token, so
+# repeat requests skip signature verification (0 disables). Each entry is
+# dropped at the token's ``exp``.
+ACCESS_TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("ACCESS_TOKEN_CACHE_MAX_ENTRIES", "4096"))
+
+# pbkdf2_sha256 cost per deployment. Pick it with
+# `python -m app.scripts.calibrate_password_hash`; unset means the passlib
+# default. bcrypt is only accepted for legacy hashes, which are always
+# rehashed as pbkdf2_sha256.
+PBKDF2_ROUNDS = int(os.getenv("PBKDF2_ROUNDS", "0")) or None
+# Stored hashes whose cost is off by more than this fraction are rehashed on
+# the next successful login (see users.crud.authenticate_user).
+HASH_ROUNDS_TOLERANCE = float(os.getenv("HASH_ROUNDS_TOLERANCE", "0.25"))
+
+
+def _cost_policy() -> dict:
+    rounds = PBKDF2_ROUNDS or pbkdf2_sha256.default_rounds
+    return {
+        "pbkdf2_sha256__default_rounds": rounds,
+        "pbkdf2_sha256__min_rounds": int(rounds * (1 - HASH_ROUNDS_TOLERANCE)),
+        "pbkdf2_sha256__max_rounds": int(rounds * (1 + HASH_ROUNDS_TOLERANCE)),
+    }
+
 
 # Use pbkdf2_sha256 first for compatibility in test environments where bcrypt
 # native backend may cause issues. Keep bcrypt as an accepted scheme for
-# existing hashes.
-pwd_context = CryptContext(schemes=["pbkdf2_sha256", "bcrypt"], deprecated="auto")
+# existing hashes; deprecated="auto" makes needs_update() flag them.
+pwd_context = CryptContext(schemes=["pbkdf2_sha256", "bcrypt"], deprecated="auto", **_cost_policy())
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 
 
+# Hashing runs in app.hashing's bounded process pool, never inline on a
+# request thread; both may raise hashing.HashingBusy (served as 503).
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return hashing.verify_password(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return hashing.hash_password(password)
+
+
+def password_needs_update(hashed_password: str) -> bool:
+    """True for hashes made with a deprecated scheme or off-policy cost.
+
+    Only parses the hash, so it is cheap to call on every login.
+    """
+    return pwd_context.needs_update(hashed_password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None, token_type: str = "access"):
@@ -47,6 +86,60 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None, t
     return encoded_jwt
 
 
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated caller, as asserted by a signed access token.
+
+    Carries what authorization needs (``company_id``, ``role``) so routers
+    never have to load the ``User`` row. Anything else about the user must be
+    read from the database explicitly.
+    """
+    id: int
+    email: str
+    company_id: Optional[int]
+    role: Optional[str]
+    token_version: int = 0
+    is_active: bool = True
+
+
+_verified_tokens = TTLCache("access_token", ACCESS_TOKEN_CACHE_MAX_ENTRIES, ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+
+def decode_access_token(token: str) -> Optional[dict]:
+    """Claims of a valid access token, or None.
+
+    Results are cached until the token's ``exp``: a token's claims cannot
+    change, so only the first request with it pays for ``jwt.decode``.
+    Revocation is not cached; callers still check the deny-list.
+    """
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    payload = _verified_tokens.get(key)
+    if payload is not None:
+        return payload
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    if payload.get("sub") is None or payload.get("typ", "access") != "access":
+        return None
+    remaining = payload["exp"] - time.time() if "exp" in payload else None
+    if remaining is None or remaining > 0:
+        _verified_tokens.set(key, payload, ttl=remaining)
+    return payload
+
+
+def create_user_access_token(user, expires_delta: Optional[timedelta] = None) -> str:
+    """Access token whose claims are enough to build a ``Principal``."""
+    claims = {
+        "sub": user.email,
+        "uid": user.id,
+        "cid": user.company_id,
+        "role": user.role,
+        "tv": user.token_version or 0,
+    }
+    return create_access_token(data=claims, expires_delta=expires_delta, token_type="access")
+
+
 def verify_refresh_token(token: str) -> Optional[str]:
     """Verify refresh token and return subject (email) if valid."""
     try:
@@ -82,28 +175,39 @@ def verify_refresh_token_db(db: Session, token: str):
     return rt.user
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    from .users.schemas import TokenData
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Principal:
+    """Resolve the caller from the access token's claims.
+
+    No query is issued per request: the deny-list is refreshed from the
+    database at most every ``DENY_LIST_REFRESH_SECONDS``, and a token seen
+    before is not verified again (see ``decode_access_token``). Tokens minted
+    before principal claims existed fall back to a user lookup until they
+    expire.
+    """
+    from .users import revocation
 
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        token_data = TokenData(email=email)
-    except JWTError:
+    payload = decode_access_token(token)
+    if payload is None:
         raise credentials_exception
-    from .users import crud as users_crud
+    email = payload["sub"]
+    if "uid" not in payload or "tv" not in payload:
+        from .users import crud as users_crud
 
-    user = users_crud.get_user_by_email(db, email=token_data.email)
-    if user is None:
+        user = users_crud.get_user_by_email(db, email=email)
+        if user is None:
+            raise credentials_exception
+        return Principal(id=user.id, email=user.email, company_id=user.company_id, role=user.role,
+                         token_version=user.token_version or 0, is_active=bool(user.is_active))
+    revocation.refresh(db, max_token_age=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+    if revocation.is_revoked(payload["uid"], payload["tv"]):
         raise credentials_exception
-    return user
+    return Principal(id=payload["uid"], email=email, company_id=payload.get("cid"),
+                     role=payload.get("role"), token_version=payload["tv"])
 
 
 def role_required(min_role: str):
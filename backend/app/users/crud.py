@@ -1,10 +1,18 @@
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
+from typing import List, Optional
+import hashlib
 import secrets
 import logging
 
-from . import models
-from ..security import get_password_hash, verify_password
+from fastapi import BackgroundTasks
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+
+from . import models, revocation
+from .. import hashing
+from ..database import SessionLocal
+from ..security import get_password_hash, password_needs_update, verify_password
 
 
 def get_user_by_email(db: Session, email: str):
@@ -46,7 +54,78 @@ def create_user(db: Session, email: str, password: str, company_id: int = None,
     return user
 
 
-def authenticate_user(db: Session, email: str, password: str):
+def create_users(db: Session, company_id: int, entries: List[dict]) -> List[dict]:
+    """Create many users of ``company_id`` in one transaction.
+
+    ``entries`` are ``{"email", "password", "role"}`` dicts. Existing emails
+    are found with one ``IN`` query, passwords are hashed in parallel
+    (hashing.hash_passwords) and the new rows are inserted with a single
+    commit. Returns one ``{"index", "email", "user" | "error"}`` per entry,
+    in order; a failing entry does not stop the others.
+
+    Unlike ``create_user`` there is no first-user-becomes-owner rule: the
+    company already has the owner calling this.
+    """
+    logger = logging.getLogger("app.users.crud")
+    results = [{"index": i, "email": entry["email"], "user": None, "error": None} for i, entry in enumerate(entries)]
+    seen = set()
+    for result, entry in zip(results, entries):
+        if not entry["email"] or not entry["password"]:
+            result["error"] = "Email and password are required"
+        elif entry["email"] in seen:
+            result["error"] = "Duplicate email in request"
+        seen.add(entry["email"])
+
+    def reject_taken(rows):
+        emails = [r["email"] for r in rows]
+        taken = set(db.execute(select(models.User.email).where(models.User.email.in_(emails))).scalars()) if emails else set()
+        for r in rows:
+            if r["email"] in taken:
+                r["error"] = "Email already registered"
+        return [r for r in rows if r["error"] is None]
+
+    # Check before hashing, so rejected entries cost no hash
+    pending = reject_taken([r for r in results if r["error"] is None])
+    hashes = hashing.hash_passwords([entries[r["index"]]["password"] for r in pending])
+    hashed = {r["index"]: h for r, h in zip(pending, hashes)}
+    for attempt in range(2):
+        users = [
+            models.User(email=r["email"], hashed_password=hashed[r["index"]], company_id=company_id,
+                        is_active=True, role=entries[r["index"]]["role"])
+            for r in pending
+        ]
+        db.add_all(users)
+        try:
+            # Flush assigns ids; read them before commit expires the objects
+            db.flush()
+            for r, user in zip(pending, users):
+                r["user"] = {"id": user.id, "email": user.email, "is_active": True,
+                             "company_id": company_id, "role": user.role}
+            db.commit()
+            break
+        except IntegrityError:
+            # An email was registered concurrently: re-check and retry once
+            db.rollback()
+            for r in pending:
+                r["user"] = None
+            if attempt:
+                for r in pending:
+                    r["error"] = "Conflicting concurrent registration, retry"
+            else:
+                pending = reject_taken(pending)
+    created = sum(1 for r in results if r["user"] is not None)
+    logger.info("create_users_done", extra={"company_id": company_id, "created_count": created,
+                                            "failed_count": len(results) - created})
+    return results
+
+
+def authenticate_user(db: Session, email: str, password: str, background_tasks: Optional[BackgroundTasks] = None):
+    """Return the user if ``password`` matches, else False.
+
+    When the stored hash uses a deprecated scheme (bcrypt) or a cost outside
+    the configured policy, a rehash with the current policy is scheduled on
+    ``background_tasks``, so the login itself pays for one verify only.
+    """
     logger = logging.getLogger("app.users.crud")
     user = get_user_by_email(db, email)
     if not user:
@@ -55,50 +134,145 @@ def authenticate_user(db: Session, email: str, password: str):
     if not verify_password(password, user.hashed_password):
         logger.debug("authenticate_user_bad_password", extra={"email": email})
         return False
+    if background_tasks is not None and password_needs_update(user.hashed_password):
+        background_tasks.add_task(rehash_password, user.id, user.hashed_password, password)
     return user
 
 
-def create_refresh_token(db: Session, user_id: int, expires_in_days: int = 7):
+def rehash_password(user_id: int, old_hash: str, password: str) -> bool:
+    """Replace ``old_hash`` with a hash under the current policy.
+
+    Runs after the response is sent, in its own session. The UPDATE only
+    applies while the stored hash is still ``old_hash``, so a password change
+    made in the meantime is never overwritten.
+    """
     logger = logging.getLogger("app.users.crud")
+    try:
+        new_hash = get_password_hash(password)
+    except hashing.HashingBusy:
+        # Retried on the next login
+        logger.info("rehash_password_skipped_busy", extra={"user_id": user_id})
+        return False
+    db = SessionLocal()
+    try:
+        updated = db.query(models.User).filter(
+            models.User.id == user_id,
+            models.User.hashed_password == old_hash
+        ).update({models.User.hashed_password: new_hash}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+    logger.info("rehash_password", extra={"user_id": user_id, "updated": bool(updated)})
+    return bool(updated)
+
+
+def token_digest(token: str) -> bytes:
+    """Fixed-length lookup key stored for a refresh token."""
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+
+def _new_refresh_token(user_id: int, expires_in_days: int) -> models.RefreshToken:
     token = secrets.token_urlsafe(32)
-    expires_at = datetime.utcnow() + timedelta(days=expires_in_days)
-    rt = models.RefreshToken(token=token, user_id=user_id, expires_at=expires_at, revoked=False)
+    rt = models.RefreshToken(
+        token_hash=token_digest(token),
+        user_id=user_id,
+        expires_at=datetime.utcnow() + timedelta(days=expires_in_days),
+        revoked=False,
+    )
+    rt.token = token
+    return rt
+
+
+def create_refresh_token(db: Session, user_id: int, expires_in_days: int = 7):
+    logger = logging.getLogger("app.users.crud")
+    rt = _new_refresh_token(user_id, expires_in_days)
     db.add(rt)
     db.commit()
-    db.refresh(rt)
-    logger.info("create_refresh_token", extra={"user_id": user_id, "token": token})
+    logger.info("create_refresh_token", extra={"user_id": user_id})
     return rt
 
 
 def get_refresh_token(db: Session, token: str):
-    logger = logging.getLogger("app.users.crud")
-    logger.debug("get_refresh_token", extra={"token": token})
-    return db.query(models.RefreshToken).filter(models.RefreshToken.token == token).first()
+    """Look up an unexpired refresh token.
+
+    Expired tokens are never usable, and bounding ``expires_at`` lets a
+    partitioned table (app.users.partitions) skip every past month.
+    """
+    return db.query(models.RefreshToken).filter(
+        models.RefreshToken.token_hash == token_digest(token),
+        models.RefreshToken.expires_at > datetime.utcnow(),
+    ).first()
 
 
 def revoke_refresh_token(db: Session, token: str):
     logger = logging.getLogger("app.users.crud")
-    logger.info("revoke_refresh_token_request", extra={"token": token})
-    rt = get_refresh_token(db, token)
-    if not rt:
-        logger.warning("revoke_refresh_token_not_found", extra={"token": token})
-        return False
-    rt.revoked = True
-    db.add(rt)
+    revoked = db.query(models.RefreshToken).filter(
+        models.RefreshToken.token_hash == token_digest(token),
+        models.RefreshToken.expires_at > datetime.utcnow(),
+    ).update({models.RefreshToken.revoked: True}, synchronize_session=False)
     db.commit()
-    logger.info("revoke_refresh_token_done", extra={"token": token})
+    if not revoked:
+        logger.warning("revoke_refresh_token_not_found")
+        return False
+    logger.info("revoke_refresh_token_done")
     return True
 
 
-def rotate_refresh_token(db: Session, old_token: str, user_id: int, expires_in_days: int = 7):
+def rotate_refresh_token(db: Session, old_token: str, expires_in_days: int = 7):
+    """Consume ``old_token`` and issue its replacement in one transaction.
+
+    Validation and revocation are one conditional ``UPDATE ... WHERE
+    revoked = false AND expires_at > now RETURNING user_id``. Of two
+    concurrent refreshes with the same token only one matches the row; the
+    other gets None, as does an unknown, revoked or expired token.
+
+    Returns ``(user, new_refresh_token)``; ``user`` is a row with just the
+    ``User`` fields access tokens carry.
+    """
     logger = logging.getLogger("app.users.crud")
-    logger.info("rotate_refresh_token", extra={"old_token": old_token, "user_id": user_id})
-    old = get_refresh_token(db, old_token)
-    if old:
-        old.revoked = True
-        db.add(old)
-        db.commit()
-        logger.debug("rotate_refresh_token_old_revoked", extra={"old_token": old_token})
-    new = create_refresh_token(db, user_id=user_id, expires_in_days=expires_in_days)
-    logger.info("rotate_refresh_token_done", extra={"new_token": new.token, "user_id": user_id})
-    return new
+    RefreshToken, User = models.RefreshToken, models.User
+    user_id = db.execute(
+        update(RefreshToken)
+        .where(
+            RefreshToken.token_hash == token_digest(old_token),
+            RefreshToken.revoked.is_(False),
+            RefreshToken.expires_at > datetime.utcnow(),
+        )
+        .values(revoked=True)
+        .returning(RefreshToken.user_id)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    if user_id is None:
+        db.rollback()
+        logger.warning("rotate_refresh_token_rejected")
+        return None
+    user = db.query(User.id, User.email, User.company_id, User.role, User.token_version).filter(
+        User.id == user_id
+    ).one()
+    new = _new_refresh_token(user_id, expires_in_days)
+    db.add(new)
+    db.commit()
+    logger.info("rotate_refresh_token_done", extra={"user_id": user_id})
+    return user, new
+
+
+def revoke_user_tokens(db: Session, user_id: int):
+    """Invalidate every access and refresh token issued to ``user_id``.
+
+    Bumps ``token_version`` (access tokens carry the old one), logs the bump
+    for other processes' deny-lists and revokes outstanding refresh tokens.
+    """
+    logger = logging.getLogger("app.users.crud")
+    user = db.query(models.User).filter(models.User.id == user_id).first()
+    if not user:
+        return None
+    user.token_version = (user.token_version or 0) + 1
+    db.add(models.TokenRevocation(user_id=user_id, token_version=user.token_version, created_at=datetime.utcnow()))
+    db.query(models.RefreshToken).filter(
+        models.RefreshToken.user_id == user_id,
+        models.RefreshToken.revoked.is_(False)
+    ).update({models.RefreshToken.revoked: True}, synchronize_session=False)
+    db.commit()
+    revocation.note(user_id, user.token_version)
+    logger.info("revoke_user_tokens", extra={"user_id": user_id, "token_version": user.token_version})
+    return user
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey, func
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey, LargeBinary, func
 from sqlalchemy.orm import relationship
 from ..database import Base
 
@@ -13,6 +13,9 @@ class User(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     company_id = Column(Integer, ForeignKey("companies.id"), nullable=True)
     role = Column(String, default="viewer")
+    # Embedded in access tokens as the ``tv`` claim; bumping it (see
+    # users.crud.revoke_user_tokens) invalidates every token issued before.
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
 
 
 class Company(Base):
@@ -26,13 +29,36 @@ class Company(Base):
 
 
 class RefreshToken(Base):
+    # On PostgreSQL migration 0010 partitions this table by expires_at month
+    # (app.users.partitions); the primary key there is (id, expires_at) and
+    # token_hash is unique together with expires_at.
     __tablename__ = "refresh_tokens"
 
     id = Column(Integer, primary_key=True, index=True)
-    token = Column(String, unique=True, nullable=False, index=True)
+    # SHA-256 of the opaque cookie value (users.crud.token_digest); the raw
+    # token is never stored
+    token_hash = Column(LargeBinary(32), unique=True, nullable=False, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     expires_at = Column(DateTime(timezone=True), nullable=False)
     revoked = Column(Boolean, default=False)
 
     user = relationship("User", backref="refresh_tokens")
+
+    # Raw token, only set on instances returned by create/rotate so the
+    # caller can put it in the cookie. Not a column.
+    token = None
+
+
+class TokenRevocation(Base):
+    """Append-only log of ``token_version`` bumps.
+
+    Processes replay it incrementally (by id) into their in-memory deny-list,
+    see app.users.revocation.
+    """
+    __tablename__ = "token_revocations"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    token_version = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), index=True)
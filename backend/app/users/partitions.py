@@ -0,0 +1,125 @@
+"""Monthly range partitions of ``refresh_tokens`` on PostgreSQL.
+
+Migration 0010 turns ``refresh_tokens`` into a table partitioned by
+``RANGE (expires_at)`` with one partition per calendar month (UTC), named
+``refresh_tokens_pYYYYMM``, plus ``refresh_tokens_default`` so an insert
+never fails for lack of a partition. Then:
+
+- lookups that bound ``expires_at > now`` (users.crud) are pruned to the
+  current and future months, and
+- expiry is ``DROP TABLE`` of a whole month once it is past the retention
+  window, instead of deleting its rows one batch at a time.
+
+``ensure`` creates the partitions ``PARTITION_MONTHS_AHEAD`` months ahead;
+it runs at API startup and in every token GC run. Rows that already landed
+in the default partition for a new month are moved into it.
+
+Other dialects have no declarative partitioning; there the table stays a
+single heap and app.users.token_gc removes expired rows in batches.
+"""
+import logging
+import os
+import re
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import text
+
+logger = logging.getLogger("app.users.partitions")
+
+PARTITION_MONTHS_AHEAD = int(os.getenv("REFRESH_TOKEN_PARTITION_MONTHS_AHEAD", "2"))
+
+TABLE = "refresh_tokens"
+
+
+def month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, n: int) -> date:
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date, table: str = TABLE) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def _bound(month: date) -> str:
+    return f"{month:%Y-%m-%d} 00:00:00+00"
+
+
+def is_partitioned(conn, table: str = TABLE) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    return bool(conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"
+    ), {"table": table}).scalar())
+
+
+def months(conn, table: str = TABLE) -> List[date]:
+    """Months that currently have their own partition, oldest first."""
+    names = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:table)"
+    ), {"table": table}).scalars()
+    pattern = re.compile(rf"^{re.escape(table)}_p(\d{{4}})(\d{{2}})$")
+    found = []
+    for name in names:
+        match = pattern.match(name)
+        if match:
+            found.append(date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(found)
+
+
+def create_partition(conn, month: date, table: str = TABLE) -> None:
+    """Create the partition for ``month``, taking over any rows for it that
+    were routed to the default partition meanwhile."""
+    name, lower, upper = partition_name(month, table), _bound(month), _bound(add_months(month, 1))
+    conn.execute(text(f'CREATE TABLE "{name}" (LIKE "{table}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'))
+    conn.execute(text(
+        f'WITH moved AS (DELETE FROM "{table}_default" WHERE expires_at >= :lower AND expires_at < :upper '
+        f'RETURNING *) INSERT INTO "{name}" SELECT * FROM moved'
+    ), {"lower": lower, "upper": upper})
+    conn.execute(text(
+        f"ALTER TABLE \"{table}\" ATTACH PARTITION \"{name}\" FOR VALUES FROM ('{lower}') TO ('{upper}')"
+    ))
+
+
+def ensure(conn, now: Optional[datetime] = None, since: Optional[date] = None,
+           months_ahead: int = PARTITION_MONTHS_AHEAD, table: str = TABLE) -> List[str]:
+    """Create missing partitions from ``since`` (default: this month) up to
+    ``months_ahead`` months ahead. No-op unless ``table`` is partitioned."""
+    if not is_partitioned(conn, table):
+        return []
+    current = month_start(now or datetime.utcnow())
+    month = month_start(since) if since is not None else current
+    existing = set(months(conn, table))
+    created = []
+    while month <= add_months(current, months_ahead):
+        if month not in existing:
+            create_partition(conn, month, table)
+            created.append(partition_name(month, table))
+        month = add_months(month, 1)
+    if created:
+        logger.info("refresh_token_partitions_created", extra={"partitions": created})
+    return created
+
+
+def drop_expired(conn, keep_expired_days: int, now: Optional[datetime] = None, table: str = TABLE) -> List[str]:
+    """Drop every month whose tokens all expired more than
+    ``keep_expired_days`` ago. No-op unless ``table`` is partitioned."""
+    if not is_partitioned(conn, table):
+        return []
+    cutoff = (now or datetime.utcnow()) - timedelta(days=keep_expired_days)
+    dropped = []
+    for month in months(conn, table):
+        upper = add_months(month, 1)
+        if datetime(upper.year, upper.month, upper.day) > cutoff:
+            break
+        name = partition_name(month, table)
+        conn.execute(text(f'DROP TABLE "{name}"'))
+        dropped.append(name)
+    if dropped:
+        logger.info("refresh_token_partitions_dropped", extra={"partitions": dropped})
+    return dropped
@@ -0,0 +1,95 @@
+"""In-process deny-list for stateless access tokens.
+
+Access tokens carry the user's ``token_version`` (``tv`` claim) and are
+authorized without a database lookup. Revoking a user's tokens bumps
+``users.token_version`` and appends a row to ``token_revocations``; this
+module mirrors that log as ``{user_id: minimum valid version}``.
+
+The revoking process applies the bump immediately. Other processes replay
+new rows (``id > last seen``) at most every ``DENY_LIST_REFRESH_SECONDS``, so
+authenticated requests stay query-free between refreshes. Only revocations
+younger than the access-token lifetime matter, so only those are loaded,
+and each entry expires once every token it revokes has: the deny-list
+holds the revocations of the last access-token lifetime, not of every user
+ever revoked.
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..cache import TTLCache
+from . import models
+
+DENY_LIST_REFRESH_SECONDS = float(os.getenv("DENY_LIST_REFRESH_SECONDS", "30"))
+# Same variable as app.security: a revocation outlives every token it covers
+# once this has passed
+ACCESS_TOKEN_LIFETIME_SECONDS = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60")) * 60
+# Evicting a live entry would let revoked tokens through again, so keep this
+# above the number of users revoked per access-token lifetime
+DENY_LIST_MAX_ENTRIES = int(os.getenv("DENY_LIST_MAX_ENTRIES", "1000000"))
+
+# (user_id,) -> minimum valid token version
+_min_versions = TTLCache("token_revocations", DENY_LIST_MAX_ENTRIES, ACCESS_TOKEN_LIFETIME_SECONDS)
+_last_id = 0
+_refreshed_at: Optional[float] = None
+_lock = threading.Lock()
+
+
+def note(user_id: int, token_version: int, ttl: Optional[float] = None) -> None:
+    """Record locally that tokens of ``user_id`` below ``token_version`` are
+    revoked, for ``ttl`` seconds (default: the access-token lifetime)."""
+    if ttl is not None and ttl <= 0:
+        return
+    with _lock:
+        if token_version > (_min_versions.get((user_id,)) or 0):
+            _min_versions.set((user_id,), token_version, ttl)
+
+
+def _naive_utc(value: datetime) -> datetime:
+    """``created_at`` as naive UTC (PostgreSQL returns it aware, SQLite naive)."""
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def refresh(db: Session, max_token_age: timedelta, force: bool = False) -> None:
+    """Replay revocations logged since the last refresh, if one is due."""
+    global _last_id, _refreshed_at
+    now = time.monotonic()
+    if not force and _refreshed_at is not None and now - _refreshed_at < DENY_LIST_REFRESH_SECONDS:
+        return
+    Revocation = models.TokenRevocation
+    query = db.query(Revocation.id, Revocation.user_id, Revocation.token_version, Revocation.created_at)
+    if _refreshed_at is None:
+        # Older revocations only cover tokens that have expired anyway
+        last_id = db.query(func.max(Revocation.id)).scalar() or 0
+        query = query.filter(Revocation.created_at >= datetime.utcnow() - max_token_age)
+    else:
+        last_id = _last_id
+        query = query.filter(Revocation.id > _last_id)
+    rows = query.order_by(Revocation.id).all()
+    utcnow = datetime.utcnow()
+    for _, user_id, token_version, created_at in rows:
+        # Tokens issued before the revocation are gone max_token_age after it
+        note(user_id, token_version, ttl=(max_token_age - (utcnow - _naive_utc(created_at))).total_seconds())
+    with _lock:
+        _last_id = max([last_id] + [row[0] for row in rows[-1:]])
+        _refreshed_at = now
+
+
+def is_revoked(user_id: int, token_version: int) -> bool:
+    return token_version < (_min_versions.get((user_id,)) or 0)
+
+
+def reset() -> None:
+    """Forget all state; the next ``refresh`` reloads from the database."""
+    global _last_id, _refreshed_at
+    with _lock:
+        _min_versions.invalidate()
+        _last_id = 0
+        _refreshed_at = None
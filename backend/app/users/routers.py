@@ -1,21 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Response, Request, Body
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Response, Request, Body
 import logging
+import os
+from typing import List
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
+from .. import ratelimit
 from ..database import get_db
 from . import crud as crud_users, schemas as schemas_users
-from ..security import create_access_token, get_current_user
+from ..security import create_user_access_token, get_current_user
 from ..security import role_required
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 logger = logging.getLogger("app.users.routers")
 
+# Largest list accepted by POST /auth/create_users
+BULK_USERS_MAX = int(os.getenv("BULK_USERS_MAX", "1000"))
+
 
 @router.post("/token", response_model=schemas_users.Token)
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db), response: Response = None):
+def login_for_access_token(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: Session = Depends(get_db),
+    response: Response = None
+):
+    # Before any query or hash: a rejected attempt costs no CPU
+    ratelimit.hit("login", ip=ratelimit.client_ip(request), email=form_data.username)
     logger.info("login_attempt", extra={"email": form_data.username})
-    user = crud_users.authenticate_user(db, email=form_data.username, password=form_data.password)
+    user = crud_users.authenticate_user(db, email=form_data.username, password=form_data.password,
+                                        background_tasks=background_tasks)
     if not user:
         logger.warning("login_failed", extra={"email": form_data.username})
         raise HTTPException(
@@ -23,7 +38,7 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db:
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token = create_access_token(data={"sub": user.email}, token_type="access")
+    access_token = create_user_access_token(user)
     # create opaque refresh token stored in DB and set as httpOnly cookie
     refresh_token = crud_users.create_refresh_token(db, user_id=user.id)
     # For cross-site XHR from the frontend we must set SameSite=None and Secure=True
@@ -41,12 +56,17 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db:
 
 
 @router.get("/me", response_model=schemas_users.UserRead)
-def read_users_me(current_user=Depends(get_current_user)):
-    return current_user
+def read_users_me(current_user=Depends(get_current_user), db: Session = Depends(get_db)):
+    # The principal only carries token claims; report the stored user
+    user = crud_users.get_user_by_email(db, current_user.email)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
 
 
 @router.post("/register", response_model=schemas_users.UserRead, status_code=201)
-def register_user(user_in: schemas_users.UserCreate = Body(...), db: Session = Depends(get_db)):
+def register_user(request: Request, user_in: schemas_users.UserCreate = Body(...), db: Session = Depends(get_db)):
+    ratelimit.hit("register", ip=ratelimit.client_ip(request), email=user_in.email)
     existing = crud_users.get_user_by_email(db, user_in.email)
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
@@ -67,13 +87,12 @@ def refresh_token(request: Request, response: Response, db: Session = Depends(ge
     if not refresh_token:
         logger.warning("refresh_missing_cookie")
         raise HTTPException(status_code=401, detail="Invalid refresh token")
-    rt = crud_users.get_refresh_token(db, refresh_token)
-    if not rt or rt.revoked or rt.expires_at < __import__('datetime').datetime.utcnow():
-        logger.warning("refresh_invalid", extra={"token": refresh_token})
+    rotated = crud_users.rotate_refresh_token(db, old_token=refresh_token)
+    if rotated is None:
+        logger.warning("refresh_invalid")
         raise HTTPException(status_code=401, detail="Invalid or revoked refresh token")
-    user_obj = rt.user
-    access_token = create_access_token(data={"sub": user_obj.email}, token_type="access")
-    new_rt = crud_users.rotate_refresh_token(db, old_token=refresh_token, user_id=user_obj.id)
+    user_obj, new_rt = rotated
+    access_token = create_user_access_token(user_obj)
     response.set_cookie(
         key="refresh_token",
         value=new_rt.token,
@@ -82,7 +101,7 @@ def refresh_token(request: Request, response: Response, db: Session = Depends(ge
         secure=True,
         path='/',
     )
-    logger.info("refresh_rotated", extra={"user_id": user_obj.id, "old_token": refresh_token, "new_token": new_rt.token})
+    logger.info("refresh_rotated", extra={"user_id": user_obj.id})
     return {"access_token": access_token, "token_type": "bearer"}
 
 
@@ -102,11 +121,17 @@ def owner_create_user(user_in: schemas_users.OwnerCreateUser = Body(...), db: Se
 
 
 @router.post('/logout')
-def logout(request: Request, response: Response, db: Session = Depends(get_db)):
+def logout(request: Request, response: Response, everywhere: bool = False, db: Session = Depends(get_db)):
+    """Revoke the refresh cookie. With `everywhere=true` also revoke every
+    access and refresh token of the user, on all devices."""
     rt = request.cookies.get('refresh_token')
     if rt:
+        if everywhere:
+            stored = crud_users.get_refresh_token(db, rt)
+            if stored and not stored.revoked:
+                crud_users.revoke_user_tokens(db, stored.user_id)
         crud_users.revoke_refresh_token(db, rt)
-        logger.info("logout_revoked", extra={"token": rt})
+        logger.info("logout_revoked", extra={"everywhere": everywhere})
 
     # To ensure browsers remove the cookie regardless of stored attributes,
     # overwrite it with an expired cookie that matches the SameSite/Secure attributes.
@@ -122,3 +147,29 @@ def logout(request: Request, response: Response, db: Session = Depends(get_db)):
     )
     logger.info("logout_success")
     return {"ok": True}
+
+
+# Owner-only: create many users of the owner's company in one request
+@router.post('/create_users', response_model=schemas_users.BulkCreateUsersResponse)
+def owner_create_users(users_in: List[schemas_users.OwnerCreateUser] = Body(...), db: Session = Depends(get_db),
+                       current_user=Depends(role_required("owner"))):
+    """Create up to `BULK_USERS_MAX` users in one transaction.
+
+    Every entry gets a result in request order, with the created user or the
+    reason it was skipped (duplicate or already registered email); valid
+    entries are created even when others fail.
+    """
+    company_id = getattr(current_user, 'company_id', None)
+    if not company_id:
+        raise HTTPException(status_code=400, detail="Owner has no associated company")
+    if len(users_in) > BULK_USERS_MAX:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_USERS_MAX} users per request")
+    entries = [
+        {"email": u.email, "password": u.password, "role": u.role if u.role in ("admin", "viewer") else "viewer"}
+        for u in users_in
+    ]
+    results = crud_users.create_users(db, company_id=company_id, entries=entries)
+    created = sum(1 for r in results if r["user"] is not None)
+    logger.info("owner_created_users", extra={"owner_id": current_user.id, "created_count": created,
+                                              "failed_count": len(results) - created})
+    return {"created": created, "failed": len(results) - created, "results": results}
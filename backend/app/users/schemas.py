@@ -1,5 +1,5 @@
 from pydantic import BaseModel, ConfigDict
-from typing import Optional
+from typing import List, Optional
 
 
 class UserCreate(BaseModel):
@@ -23,6 +23,19 @@ class UserRead(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class BulkUserResult(BaseModel):
+    index: int
+    email: str
+    user: Optional[UserRead] = None
+    error: Optional[str] = None
+
+
+class BulkCreateUsersResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkUserResult]
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -0,0 +1,102 @@
+"""Garbage collection of expired and long-revoked refresh tokens.
+
+Shared by the cron entry point (``python -m app.scripts.cleanup_refresh_tokens``)
+and the optional in-app periodic task (``TOKEN_GC_INTERVAL_SECONDS``).
+
+Rows are deleted set-based, in primary-key order, ``batch_size`` ids at a
+time, with a commit after each batch. Locks are held only for one batch, no
+token is ever loaded as an ORM object, and an interrupted run just resumes
+from the start next time. ``throttle_seconds`` sleeps between batches to
+leave I/O headroom, and ``time_budget_seconds`` stops the run early (the
+result reports ``complete=False``).
+
+On PostgreSQL with a partitioned ``refresh_tokens`` (app.users.partitions)
+each run first creates upcoming month partitions and drops whole months past
+``keep_expired_days``; the batches then only handle revoked tokens and
+expired ones in months that are still kept.
+"""
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy import and_, delete, func, or_, select
+from sqlalchemy.orm import Session
+
+from . import models, partitions
+
+logger = logging.getLogger("app.users.token_gc")
+
+
+@dataclass
+class GCResult:
+    deleted: int = 0
+    batches: int = 0
+    partitions_dropped: int = 0
+    elapsed: float = 0.0
+    complete: bool = True
+
+
+def _garbage(now: datetime, keep_expired_days: int, keep_revoked_days: int):
+    RefreshToken = models.RefreshToken
+    return or_(
+        RefreshToken.expires_at < now - timedelta(days=keep_expired_days),
+        and_(RefreshToken.revoked.is_(True), RefreshToken.created_at < now - timedelta(days=keep_revoked_days)),
+    )
+
+
+def count_garbage(db: Session, keep_expired_days: int = 30, keep_revoked_days: int = 7) -> int:
+    """Number of rows ``collect`` would delete (one COUNT, nothing loaded)."""
+    predicate = _garbage(datetime.utcnow(), keep_expired_days, keep_revoked_days)
+    return db.execute(select(func.count()).select_from(models.RefreshToken).where(predicate)).scalar()
+
+
+def collect(
+    db: Session,
+    keep_expired_days: int = 30,
+    keep_revoked_days: int = 7,
+    batch_size: int = 1000,
+    throttle_seconds: float = 0.0,
+    time_budget_seconds: Optional[float] = None,
+    progress: Optional[Callable[[GCResult], None]] = None,
+) -> GCResult:
+    """Delete garbage tokens in bounded batches; see the module docstring."""
+    RefreshToken = models.RefreshToken
+    predicate = _garbage(datetime.utcnow(), keep_expired_days, keep_revoked_days)
+    result = GCResult()
+    started = time.monotonic()
+    conn = db.connection()
+    partitions.ensure(conn)
+    result.partitions_dropped = len(partitions.drop_expired(conn, keep_expired_days))
+    db.commit()
+    last_id = 0
+    while True:
+        ids = db.execute(
+            select(RefreshToken.id)
+            .where(RefreshToken.id > last_id, predicate)
+            .order_by(RefreshToken.id)
+            .limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+        result.deleted += db.execute(delete(RefreshToken).where(RefreshToken.id.in_(ids))).rowcount
+        db.commit()
+        last_id = ids[-1]
+        result.batches += 1
+        result.elapsed = time.monotonic() - started
+        logger.info("token_gc_batch", extra={"deleted": result.deleted, "batches": result.batches, "last_id": last_id})
+        if progress is not None:
+            progress(result)
+        if len(ids) < batch_size:
+            break
+        if time_budget_seconds is not None and result.elapsed >= time_budget_seconds:
+            result.complete = False
+            break
+        if throttle_seconds:
+            time.sleep(throttle_seconds)
+    result.elapsed = time.monotonic() - started
+    logger.info("token_gc_done", extra={"deleted": result.deleted, "batches": result.batches,
+                                        "partitions_dropped": result.partitions_dropped,
+                                        "elapsed": round(result.elapsed, 3), "complete": result.complete})
+    return result
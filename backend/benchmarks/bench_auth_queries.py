@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Load-test authenticated campaign GETs and count queries per request.
+
+Usage (from backend/):
+
+    python benchmarks/bench_auth_queries.py --requests 500 --concurrency 4
+
+Runs the app in-process against a throwaway SQLite database with the
+campaign payload cache disabled, then issues GET /campaigns/ and
+GET /campaigns/{id} with two kinds of bearer token:
+
+- legacy:    only a ``sub`` claim, so get_current_user loads the User row
+- principal: company_id/role/token_version claims, no per-request lookup
+
+For each it reports SQL statements per request (split into users-table
+lookups and everything else) and request latency.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--campaigns", type=int, default=50)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ["CAMPAIGN_CACHE_MAX_ENTRIES"] = "0"
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+
+    from app.database import SessionLocal, engine
+    from app.main import app
+    from app.campaigns import models
+    from app.security import create_access_token
+
+    client = TestClient(app)
+    resp = client.post("/auth/register", json={"email": "bench@example.com", "password": "bench",
+                                               "company_name": "BenchCo"})
+    company_id = resp.json()["company_id"]
+    principal = client.post("/auth/token", data={"username": "bench@example.com", "password": "bench"}).json()["access_token"]
+    legacy = create_access_token({"sub": "bench@example.com"})
+    numeric = {c.key: 1 for c in models.Campaign.__table__.columns
+               if c.type.python_type in (int, float) and c.key not in ("company_id", "version")}
+    db = SessionLocal()
+    db.add_all([models.Campaign(name=f"bench-{i:04d}", company_id=company_id, tipo_campania="mensual",
+                                fecha_inicio=date(2025, 1, 1), fecha_fin=date(2025, 1, 31), **numeric)
+                for i in range(args.campaigns)])
+    db.commit()
+    db.close()
+
+    counts = Counter()
+    lock = threading.Lock()
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        kind = "users" if "FROM users" in statement else "other"
+        with lock:
+            counts[kind] += 1
+
+    paths = ["/campaigns/?limit=20", "/campaigns/bench-0000"]
+
+    def hit(i, headers):
+        t0 = time.perf_counter()
+        resp = client.get(paths[i % len(paths)], headers=headers)
+        assert resp.status_code == 200, resp.status_code
+        return time.perf_counter() - t0
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}")
+    print(f"{'token':<10} {'users q/req':>12} {'other q/req':>12} {'p50 ms':>8} {'p99 ms':>8}")
+    for label, token in (("legacy", legacy), ("principal", principal)):
+        headers = {"Authorization": f"Bearer {token}"}
+        hit(0, headers)  # warm up (deny-list load, statement caches)
+        counts.clear()
+        event.listen(engine, "before_cursor_execute", _record)
+        try:
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                samples = sorted(pool.map(lambda i: hit(i, headers), range(args.requests)))
+        finally:
+            event.remove(engine, "before_cursor_execute", _record)
+        p50 = samples[len(samples) // 2] * 1000
+        p99 = samples[int(len(samples) * 0.99) - 1] * 1000
+        print(f"{label:<10} {counts['users'] / args.requests:>12.2f} {counts['other'] / args.requests:>12.2f} "
+              f"{p50:>8.2f} {p99:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
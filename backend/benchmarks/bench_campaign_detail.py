@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Compare campaign detail loading strategies as child counts grow.
+
+Usage (from backend/):
+
+    python benchmarks/bench_campaign_detail.py --periods 24 --sites 10 100 1000 5000
+
+For each size, builds one campaign with the given number of periods and
+sites in a throwaway SQLite database and times:
+
+- joinedload: both collections joined in one SELECT (periods x sites rows)
+- crud:       app.campaigns.crud.get_campaign_for_company (selectinload)
+
+Row columns are the result rows each strategy makes the database return.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import joinedload, sessionmaker
+
+from app.database import Base
+from app.users import models as users_models  # noqa: F401  (registers companies)
+from app.campaigns import crud, models
+
+
+def joined(db, name, company_id):
+    return db.query(models.Campaign).options(
+        joinedload(models.Campaign.periods),
+        joinedload(models.Campaign.sites),
+    ).filter(models.Campaign.name == name, models.Campaign.company_id == company_id).first()
+
+
+def build(db, name, periods, sites):
+    db.execute(insert(models.Campaign), [{
+        "name": name, "company_id": 1, "tipo_campania": "mensual",
+        "fecha_inicio": date(2025, 1, 1), "fecha_fin": date(2025, 12, 31),
+    }])
+    db.execute(insert(models.CampaignPeriod), [
+        {"campaign_name": name, "period": f"P{i:02d}", "impactos_periodo_personas": i, "impactos_periodo_vehiculos": i}
+        for i in range(periods)
+    ])
+    db.execute(insert(models.CampaignSite), [
+        {"campaign_name": name, "codigo_del_sitio": f"S{i:06d}", "tipo_de_mueble": "Parabus", "tipo_de_anuncio": "Digital",
+         "estado": "Jalisco", "municipio": "Zapopan", "zm": "GDL", "frecuencia_catorcenal": 1.0,
+         "frecuencia_mensual": 2.0, "impactos_catorcenal": i, "impactos_mensuales": i, "alcance_mensual": 1.0}
+        for i in range(sites)
+    ])
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--periods", type=int, default=24)
+    parser.add_argument("--sites", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        print(f"{'sites':>8} {'joined ms':>10} {'joined rows':>12} {'crud ms':>10} {'crud rows':>10}")
+        for n_sites in args.sites:
+            db = Session()
+            name = f"bench-{n_sites}"
+            build(db, name, args.periods, n_sites)
+            results = {}
+            for label, fn in (("joined", joined), ("crud", crud.get_campaign_for_company)):
+                best = float("inf")
+                for _ in range(args.repeat):
+                    db.expunge_all()
+                    t0 = time.perf_counter()
+                    campaign = fn(db, name, 1)
+                    best = min(best, time.perf_counter() - t0)
+                assert len(campaign.periods) == args.periods and len(campaign.sites) == n_sites
+                results[label] = best * 1000
+            joined_rows = max(args.periods, 1) * max(n_sites, 1)
+            crud_rows = 1 + args.periods + n_sites
+            print(f"{n_sites:>8} {results['joined']:>10.1f} {joined_rows:>12} {results['crud']:>10.1f} {crud_rows:>10}")
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
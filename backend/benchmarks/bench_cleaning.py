@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Compare app.ingest.cleaning with the per-cell cleaning it replaced.
+
+Usage (from backend/):
+
+    python benchmarks/bench_cleaning.py --rows 1000000
+
+Builds a frame shaped like the sites CSV (``--rows`` rows, three numeric
+text columns with plain ints, huge values, date-formatted numbers, garbage
+and blanks) and cleans it twice:
+
+- legacy:  ``legacy_clean_number`` (the previous seed.clean_number, with
+           ``np.random`` for garbage) applied cell by cell
+- cleaning: cleaning.clean_frame, keyed by (name, codigo_del_sitio)
+
+Then checks that both agree on every cell that parses, that the new
+fallback values stay in range, and that a second run and a shuffled frame
+clean to the same values.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.ingest import cleaning  # noqa: E402
+
+COLUMNS = ["impactos_catorcenal", "impactos_mensuales", "alcance_mensual"]
+
+
+def legacy_clean_number(x):
+    """seed.clean_number before app.ingest.cleaning, verbatim."""
+    if isinstance(x, str) and '-' in x:
+        return int(x.split('-')[0])
+    try:
+        if pd.isna(x):
+            return None
+        numeric_val = float(x)
+        if numeric_val > 1000000000000:
+            scaled_val = int(numeric_val / 1000000000000)
+            if scaled_val > 100000:
+                scaled_val = int(scaled_val / 1000)
+            return max(scaled_val, 1000)
+        elif numeric_val > 1000000:
+            return int(numeric_val / 1000)
+        elif numeric_val > 100000:
+            return int(numeric_val / 10)
+        else:
+            return int(numeric_val)
+    except:  # noqa: E722
+        return np.random.randint(1000, 10000)
+
+
+def make_frame(rows: int, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+
+    def messy():
+        values = rng.integers(1000, 5_000_000, rows).astype(str).astype(object)
+        kind = rng.random(rows)
+        huge = kind < 0.2
+        values[huge] = rng.integers(10**15, 10**17, int(huge.sum())).astype(str)
+        dashed = (kind >= 0.2) & (kind < 0.3)
+        values[dashed] = [f"{v}-06-26" for v in rng.integers(1000, 50000, int(dashed.sum()))]
+        garbage = (kind >= 0.3) & (kind < 0.32)
+        values[garbage] = "n/d"
+        values[kind > 0.97] = None
+        # The dtype read_csv gives text columns
+        return pd.Series(values, dtype="str")
+
+    return pd.DataFrame({
+        "name": [f"bench_{i % 1000:06d}" for i in range(rows)],
+        "codigo_del_sitio": [f"S{i:07d}" for i in range(rows)],
+        **{column: messy() for column in COLUMNS},
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    frame = make_frame(args.rows)
+    cells = args.rows * len(COLUMNS)
+
+    start = time.perf_counter()
+    legacy = {column: [legacy_clean_number(v) for v in frame[column]] for column in COLUMNS}
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cleaned = cleaning.clean_frame(frame, COLUMNS, keys=("name", "codigo_del_sitio"))
+    new_time = time.perf_counter() - start
+
+    for column in COLUMNS:
+        parsed = pd.to_numeric(frame[column].str.partition("-")[0], errors="coerce").notna().to_numpy()
+        old = pd.Series(legacy[column], dtype="Int64")[parsed]
+        assert old.equals(cleaned[column][parsed]), f"{column}: cleaning differs from the legacy rules"
+        garbage = cleaned[column][frame[column].notna() & ~parsed]
+        assert garbage.between(1000, 9999).all()
+
+    again = cleaning.clean_frame(frame, COLUMNS, keys=("name", "codigo_del_sitio"))
+    assert again.equals(cleaned)
+    order = np.random.default_rng(1).permutation(args.rows)
+    shuffled = cleaning.clean_frame(frame.iloc[order], COLUMNS, keys=("name", "codigo_del_sitio"))
+    assert shuffled.sort_index().equals(cleaned)
+
+    print(f"{'mode':<10} {'seconds':>9} {'cells/s':>12}")
+    for mode, elapsed in (("legacy", legacy_time), ("cleaning", new_time)):
+        print(f"{mode:<10} {elapsed:>9.2f} {cells / elapsed:>12,.0f}")
+    print(f"speedup: {legacy_time / new_time:.1f}x; parity, range and determinism checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Request time, import throughput and API latency of POST /campaigns/import.
+
+Usage (from backend/):
+
+    python benchmarks/bench_import_api.py --sites 1000000
+
+Writes the synthetic CSVs of bench_seed_loader, loads the campaigns with
+delta.sync and uploads the sites file through the API twice:
+
+- inline:  ``IMPORT_WORKERS=0``, the job runs inside the request, as a
+           synchronous endpoint would
+- worker:  ``IMPORT_WORKERS=1``, the request spools the file and returns
+           202; a background thread imports it
+
+While the import runs a probe thread keeps calling ``GET /`` and records
+its latency. Each mode runs in its own interpreter with its own database
+(``--database-url`` points both at an existing one; tables dropped first).
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from bench_seed_loader import write_csvs  # noqa: E402
+
+
+class _User:
+    company_id = 1
+    role = "admin"
+
+
+def run(args):
+    from fastapi.testclient import TestClient
+    from sqlalchemy import update
+
+    from app.campaigns.models import Campaign, CampaignPeriod, CampaignSite
+    from app.database import SessionLocal, engine
+    from app.ingest import delta
+    from app.ingest.loader import SOURCES
+    from app.ingest.models import ImportJob, IngestManifest
+    from app.main import app
+    from app.security import get_current_user
+
+    tables = [ImportJob.__table__, IngestManifest.__table__, CampaignSite.__table__, CampaignPeriod.__table__,
+              Campaign.__table__]
+    Campaign.metadata.drop_all(bind=engine, tables=tables)
+    Campaign.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        delta.sync(db, args.data_dir, sources=SOURCES[:1])
+        db.execute(update(Campaign).values(company_id=1))
+        db.commit()
+    finally:
+        db.close()
+
+    app.dependency_overrides[get_current_user] = _User
+    client = TestClient(app)
+    latencies, done = [], threading.Event()
+
+    def probe():
+        while not done.is_set():
+            start = time.perf_counter()
+            client.get("/")
+            latencies.append(time.perf_counter() - start)
+            time.sleep(0.02)
+
+    prober = threading.Thread(target=probe)
+    prober.start()
+    start = time.perf_counter()
+    with open(os.path.join(args.data_dir, "bd_campanias_sitios.csv"), "rb") as upload:
+        resp = client.post("/campaigns/import?source=sites", files={"file": ("sites.csv", upload, "text/csv")})
+    request_time = time.perf_counter() - start
+    job = resp.json()
+    while job["status"] in ("queued", "running"):
+        time.sleep(1)
+        job = client.get(f"/jobs/{job['id']}").json()
+    elapsed = time.perf_counter() - start
+    done.set()
+    prober.join()
+    assert job["status"] == "succeeded", job
+    p50, p99 = np.percentile(np.array(latencies) * 1000, [50, 99])
+    print(f"{args.mode:<7} {request_time:>10.2f} {elapsed:>9.1f} {job['rows_processed'] / elapsed:>9.0f} "
+          f"{len(latencies):>7} {p50:>8.1f} {p99:>8.1f} {max(latencies) * 1000:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sites", type=int, default=1_000_000)
+    parser.add_argument("--campaigns", type=int, default=1000)
+    parser.add_argument("--database-url", help="Target database (default: temporary SQLite files)")
+    parser.add_argument("--mode", choices=["inline", "worker"], help=argparse.SUPPRESS)
+    parser.add_argument("--data-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run(args)
+        return
+    data_dir = tempfile.mkdtemp()
+    write_csvs(data_dir, args.campaigns, args.sites)
+    print(f"{'mode':<7} {'request s':>10} {'total s':>9} {'rows/s':>9} {'probes':>7} "
+          f"{'p50 ms':>8} {'p99 ms':>8} {'max ms':>9}")
+    for mode, workers in (("inline", "0"), ("worker", "1")):
+        url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), mode + '.db')}"
+        subprocess.run(
+            [sys.executable, __file__, "--mode", mode, "--data-dir", data_dir],
+            env={**os.environ, "DATABASE_URL": url, "LOG_LEVEL": "ERROR", "IMPORT_WORKERS": workers},
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Time an incremental ingest against a full load of the same files.
+
+Usage (from backend/):
+
+    python benchmarks/bench_ingest_delta.py --sites 1000000 --change 0.01
+
+Writes the synthetic CSVs of bench_seed_loader, syncs them into an empty
+database (the full load), rewrites ``--change`` of the site rows (half
+edited, half replaced by new keys) and syncs again with
+``--delete-missing``. The second sync only writes the changed rows; the
+rest of its time is reading and hashing the files.
+
+``--database-url`` targets an existing database instead of a temporary
+SQLite file (the campaign and manifest tables are dropped first).
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from bench_seed_loader import write_csvs  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sites", type=int, default=1_000_000)
+    parser.add_argument("--campaigns", type=int, default=1000)
+    parser.add_argument("--change", type=float, default=0.01, help="Fraction of site rows changed (default: 0.01)")
+    parser.add_argument("--database-url", help="Target database (default: temporary SQLite file)")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'delta.db')}"
+    os.environ.setdefault("LOG_LEVEL", "ERROR")
+    from app.campaigns.models import Campaign, CampaignPeriod, CampaignSite
+    from app.database import SessionLocal, engine
+    from app.ingest import delta
+    from app.ingest.models import IngestManifest
+
+    tables = [IngestManifest.__table__, CampaignSite.__table__, CampaignPeriod.__table__, Campaign.__table__]
+    Campaign.metadata.drop_all(bind=engine, tables=tables)
+    Campaign.metadata.create_all(bind=engine)
+
+    data_dir = tempfile.mkdtemp()
+    write_csvs(data_dir, args.campaigns, args.sites)
+    print(f"{'run':<8} {'seconds':>10} {'inserted':>10} {'updated':>10} {'deleted':>10} {'unchanged':>12}")
+
+    def run(label, **kwargs):
+        db = SessionLocal()
+        try:
+            t0 = time.perf_counter()
+            sites = delta.sync(db, data_dir, **kwargs)["sites"]
+            elapsed = time.perf_counter() - t0
+        finally:
+            db.close()
+        print(f"{label:<8} {elapsed:>10.1f} {sites.inserted:>10} {sites.updated:>10} {sites.deleted:>10} "
+              f"{sites.unchanged:>12}")
+
+    run("full")
+    path = os.path.join(data_dir, "bd_campanias_sitios.csv")
+    frame = pd.read_csv(path, dtype=str)
+    rng = np.random.default_rng(11)
+    picked = rng.choice(len(frame), int(len(frame) * args.change), replace=False)
+    edited, replaced = picked[::2], picked[1::2]
+    frame.loc[frame.index[edited], "estado"] = "Nuevo León"
+    frame.loc[frame.index[replaced], "codigo_del_sitio"] = [f"NEW-{i:07d}" for i in range(len(replaced))]
+    frame.to_csv(path, index=False)
+    run("delta", delete_missing=True)
+    run("noop")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Peak memory and throughput of the streaming ingest against the full sync.
+
+Usage (from backend/):
+
+    python benchmarks/bench_ingest_stream.py --sites 1000000 --memory-limit-mb 128
+
+Writes the synthetic CSVs of bench_seed_loader and loads them into a fresh
+database once with delta.sync (whole files in memory) and once with
+stream.stream (chunks sized to ``--memory-limit-mb``). Each mode runs in its
+own interpreter so its peak RSS is its own. ``--database-url`` targets an
+existing database (tables dropped first); only there do periods and sites
+load concurrently, SQLite runs them one after the other.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from bench_seed_loader import write_csvs  # noqa: E402
+
+
+def run(args):
+    from app.campaigns.models import Campaign, CampaignPeriod, CampaignSite
+    from app.database import SessionLocal, engine
+    from app.ingest import delta, stream
+    from app.ingest.models import IngestManifest
+
+    tables = [IngestManifest.__table__, CampaignSite.__table__, CampaignPeriod.__table__, Campaign.__table__]
+    Campaign.metadata.drop_all(bind=engine, tables=tables)
+    Campaign.metadata.create_all(bind=engine)
+    t0 = time.perf_counter()
+    if args.mode == "stream":
+        results = stream.stream(args.data_dir, memory_limit_mb=args.memory_limit_mb)
+    else:
+        db = SessionLocal()
+        try:
+            results = delta.sync(db, args.data_dir)
+        finally:
+            db.close()
+    elapsed = time.perf_counter() - t0
+    rows = sum(r.inserted + r.updated + r.unchanged for r in results.values())
+    print(f"{args.mode:<8} {elapsed:>10.1f} {rows / elapsed:>12.0f} {stream.peak_rss_mb():>14.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sites", type=int, default=1_000_000)
+    parser.add_argument("--campaigns", type=int, default=1000)
+    parser.add_argument("--memory-limit-mb", type=int, default=128)
+    parser.add_argument("--database-url", help="Target database (default: temporary SQLite files)")
+    parser.add_argument("--mode", choices=["full", "stream"], help=argparse.SUPPRESS)
+    parser.add_argument("--data-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run(args)
+        return
+    data_dir = tempfile.mkdtemp()
+    write_csvs(data_dir, args.campaigns, args.sites)
+    print(f"{'loader':<8} {'seconds':>10} {'rows/s':>12} {'peak RSS MB':>14}")
+    for mode in ("full", "stream"):
+        url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), mode + '.db')}"
+        subprocess.run(
+            [sys.executable, __file__, "--mode", mode, "--data-dir", data_dir,
+             "--memory-limit-mb", str(args.memory_limit_mb)],
+            env={**os.environ, "DATABASE_URL": url, "LOG_LEVEL": "ERROR"},
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Compare offset and keyset pagination latency on a large synthetic company.
+
+Usage (from backend/):
+
+    python benchmarks/bench_keyset_pagination.py --rows 100000 --page-size 10
+
+Builds a throwaway SQLite database with a single company, then times
+fetching pages 1, 10, 100, 1000 and 10000 through both
+`get_campaigns_for_company` (OFFSET/LIMIT) and
+`get_campaigns_after_for_company` (keyset). Offset latency grows with page
+depth; keyset latency should stay flat.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.users import models as users_models
+from app.campaigns import crud, models
+
+
+def build_database(url: str, rows: int):
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    company = users_models.Company(name="bench")
+    db.add(company)
+    db.commit()
+    base = date(2020, 1, 1)
+    batch = []
+    for i in range(rows):
+        start = base + timedelta(days=i % 1500)
+        batch.append({
+            "name": f"bench-{i:08d}",
+            "company_id": company.id,
+            "tipo_campania": "mensual" if i % 2 else "catorcenal",
+            "fecha_inicio": start,
+            "fecha_fin": start + timedelta(days=30),
+        })
+        if len(batch) == 5000:
+            db.execute(insert(models.Campaign), batch)
+            batch = []
+    if batch:
+        db.execute(insert(models.Campaign), batch)
+    db.commit()
+    return db, company.id
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db, company_id = build_database(f"sqlite:///{os.path.join(tmp, 'bench.db')}", args.rows)
+        try:
+            print(f"{'page':>8} {'offset ms':>12} {'keyset ms':>12}")
+            for page in (1, 10, 100, 1000, 10000):
+                skip = (page - 1) * args.page_size
+                if skip >= args.rows:
+                    break
+                # The cursor a client would hold after reading page - 1
+                after = None
+                if skip:
+                    prev = crud.get_campaigns_for_company(db, company_id, skip=skip - 1, limit=1)[0]
+                    after = (prev.fecha_inicio, prev.name)
+                offset_ms = timed(lambda: crud.get_campaigns_for_company(db, company_id, skip=skip, limit=args.page_size), args.repeat)
+                keyset_ms = timed(lambda: crud.get_campaigns_after_for_company(db, company_id, after=after, limit=args.page_size), args.repeat)
+                db.expunge_all()
+                print(f"{page:>8} {offset_ms:>12.2f} {keyset_ms:>12.2f}")
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
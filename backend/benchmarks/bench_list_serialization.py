@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Compare the old and projected serialization paths for campaign list pages.
+
+Usage (from backend/):
+
+    python benchmarks/bench_list_serialization.py --page-size 100 --iterations 200
+
+- orm:       ORM Campaign objects -> jsonable_encoder -> Dict[str, Any]
+             response validation -> JSONResponse (the path before projection)
+- projected: LIST_COLUMNS rows as dicts -> FastJSONResponse
+
+Each path is timed end to end (query + encode) and for encoding only.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import Any, Dict
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.users import models as users_models  # noqa: F401  (registers companies)
+from app.campaigns import crud, models
+from app.responses import FastJSONResponse, orjson
+
+
+def seed(db, rows: int):
+    base = date(2024, 1, 1)
+    numeric = {c.key: 1.5 for c in models.Campaign.__table__.columns if c.key.startswith(("nse_", "edad_"))}
+    db.execute(insert(models.Campaign), [dict(
+        numeric,
+        name=f"bench-{i:06d}", company_id=1, tipo_campania="mensual",
+        fecha_inicio=base + timedelta(days=i % 365), fecha_fin=base + timedelta(days=i % 365 + 30),
+        universo_zona_metro=1000000 + i, impactos_personas=50000 + i, impactos_vehiculos=20000 + i,
+        frecuencia_calculada=2.5, frecuencia_promedio=3.1, alcance=40000 + i, hombres=0.48, mujeres=0.52,
+    ) for i in range(rows)])
+    db.commit()
+
+
+_validator = TypeAdapter(Dict[str, Any])
+
+
+def orm_path(db, page_size):
+    campaigns, total, _ = crud.get_campaigns_page_for_company(db, 1, limit=page_size)
+    body = {"data": jsonable_encoder(campaigns), "total": total, "page": 0, "pageSize": page_size}
+    return JSONResponse(jsonable_encoder(_validator.validate_python(body))).body
+
+
+def projected_path(db, page_size):
+    campaigns, total, _ = crud.get_campaigns_page_for_company(db, 1, limit=page_size, projected=True)
+    return FastJSONResponse({"data": campaigns, "total": total, "page": 0, "pageSize": page_size}).body
+
+
+def bench(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    return samples[len(samples) // 2] * 1000, samples[int(len(samples) * 0.99) - 1] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        seed(db, args.rows)
+
+        orm_rows = crud.get_campaigns_page_for_company(db, 1, limit=args.page_size)[0]
+        dict_rows = crud.get_campaigns_page_for_company(db, 1, limit=args.page_size, projected=True)[0]
+
+        cases = [
+            ("orm end-to-end", lambda: (db.expunge_all(), orm_path(db, args.page_size))),
+            ("projected end-to-end", lambda: projected_path(db, args.page_size)),
+            ("orm encode only", lambda: JSONResponse(jsonable_encoder(_validator.validate_python({"data": jsonable_encoder(orm_rows)})))),
+            ("projected encode only", lambda: FastJSONResponse({"data": dict_rows})),
+        ]
+        print(f"encoder: {'orjson' if orjson is not None else 'json (stdlib)'}; page size {args.page_size}")
+        print(f"{'path':<24} {'p50 ms':>8} {'p99 ms':>8}")
+        for label, fn in cases:
+            p50, p99 = bench(fn, args.iterations)
+            print(f"{label:<24} {p50:>8.2f} {p99:>8.2f}")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
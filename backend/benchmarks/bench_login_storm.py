@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Measure campaign read latency while a login storm is running.
+
+Usage (from backend/):
+
+    python benchmarks/bench_login_storm.py --logins 400 --login-threads 64 --reads 300
+
+Runs the app in-process against a throwaway SQLite database. Login threads
+hammer POST /auth/token while one reader times GET /campaigns/ requests.
+The storm runs once per hashing configuration, each in a fresh
+interpreter because app.hashing reads its settings at import:
+
+- inline:  HASH_WORKERS=0 with no effective cap, i.e. hashing on request threads
+- pool:    the bounded process pool (HASH_WORKERS / HASH_CONCURRENCY /
+           HASH_MAX_QUEUE defaults); excess logins get 503
+
+Reported: read p50/p99, and login outcomes by status code.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+MODES = {
+    "inline": {"HASH_WORKERS": "0", "HASH_CONCURRENCY": "1000", "HASH_MAX_QUEUE": "1000"},
+    "pool": {},
+}
+
+
+def run(args):
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    client = TestClient(app)
+    client.post("/auth/register", json={"email": "storm@example.com", "password": "storm", "company_name": "StormCo"})
+    token = client.post("/auth/token", data={"username": "storm@example.com", "password": "storm"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    outcomes = Counter()
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def login(_):
+        resp = client.post("/auth/token", data={"username": "storm@example.com", "password": "storm"})
+        with lock:
+            outcomes[resp.status_code] += 1
+
+    def storm():
+        with ThreadPoolExecutor(max_workers=args.login_threads) as pool:
+            list(pool.map(login, range(args.logins)))
+        stop.set()
+
+    storm_thread = threading.Thread(target=storm)
+    storm_thread.start()
+    samples = []
+    while len(samples) < args.reads and not stop.is_set():
+        t0 = time.perf_counter()
+        client.get("/campaigns/?limit=5", headers=headers)
+        samples.append(time.perf_counter() - t0)
+    storm_thread.join()
+    samples.sort()
+    p50 = samples[len(samples) // 2] * 1000
+    p99 = samples[max(int(len(samples) * 0.99) - 1, 0)] * 1000
+    print(f"{args.mode:<8} {len(samples):>6} {p50:>9.2f} {p99:>9.2f}  logins {dict(sorted(outcomes.items()))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=400)
+    parser.add_argument("--login-threads", type=int, default=64)
+    parser.add_argument("--reads", type=int, default=300)
+    parser.add_argument("--mode", choices=sorted(MODES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run(args)
+        return
+    print(f"{'mode':<8} {'reads':>6} {'p50 ms':>9} {'p99 ms':>9}")
+    for mode, env in MODES.items():
+        subprocess.run(
+            [sys.executable, __file__, "--mode", mode, "--logins", str(args.logins),
+             "--login-threads", str(args.login_threads), "--reads", str(args.reads)],
+            env={**os.environ, "LOG_LEVEL": "ERROR", **env},
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""Compare the set-based seed loader with the previous row-by-row loader.
+
+Usage (from backend/):
+
+    python benchmarks/bench_seed_loader.py --sites 1000000 --legacy-sites 20000
+
+Writes synthetic campaign CSVs (``--campaigns`` campaigns, 12 periods each,
+``--sites`` site rows with ~1% duplicate keys and the same messy numeric
+formats as the real files), then loads them into a fresh database twice:
+
+- bulk:    seed.load_data (vectorized cleaning, anti-join, bulk insert /
+           COPY on PostgreSQL)
+- legacy:  the previous loop (iterrows, one existence query and one
+           clean_number call per row), on the first ``--legacy-sites`` site
+           rows only; its full-file time is extrapolated from the rate
+
+Each mode runs in its own interpreter because app.database reads
+DATABASE_URL at import. ``--database-url`` points both at an existing
+database instead of temporary SQLite files (the campaign tables are
+dropped first).
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def write_csvs(data_dir: str, campaigns: int, sites: int, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    names = np.array([f"bench_{i:06d}" for i in range(campaigns)])
+    pd.DataFrame({
+        "name": names, "tipo_campania": "mensual", "fecha_inicio": "2025-01-01", "fecha_fin": "2025-12-31",
+        **{c: rng.integers(1000, 10_000_000, campaigns) for c in (
+            "universo_zona_metro", "impactos_personas", "impactos_vehiculos", "alcance")},
+        **{c: rng.random(campaigns) for c in (
+            "frecuencia_calculada", "frecuencia_promedio", "nse_ab", "nse_c", "nse_cmas", "nse_d", "nse_dmas",
+            "nse_e", "edad_0a14", "edad_15a19", "edad_20a24", "edad_25a34", "edad_35a44", "edad_45a64",
+            "edad_65mas", "hombres", "mujeres")},
+    }).to_csv(os.path.join(data_dir, "bd_campanias_agrupado.csv"), index=False)
+
+    def messy(n):
+        # Plain ints, huge values, date-formatted numbers and blanks
+        values = rng.integers(1000, 5_000_000, n).astype(object)
+        kind = rng.random(n)
+        values[kind < 0.2] = rng.integers(10**15, 10**17, int((kind < 0.2).sum())).astype(object)
+        dashed = (kind >= 0.2) & (kind < 0.3)
+        values[dashed] = [f"{v}-06-26" for v in rng.integers(1000, 50000, int(dashed.sum()))]
+        values[kind > 0.97] = None
+        return values
+
+    periods = campaigns * 12
+    pd.DataFrame({
+        "name": np.repeat(names, 12), "tipo_campania": "mensual",
+        "period": np.tile([f"2025-{m:02d}" for m in range(1, 13)], campaigns),
+        "impactos_periodo_personas": messy(periods), "impactos_periodo_vehículos": messy(periods),
+    }).to_csv(os.path.join(data_dir, "bd_campanias_periodos.csv"), index=False)
+
+    codes = np.arange(sites)
+    codes[rng.random(sites) < 0.01] = 0  # duplicate keys
+    pd.DataFrame({
+        "codigo_del_sitio": [f"SITE-{c:07d}" for c in codes],
+        "tipo_de_mueble": "Pantalla Digital", "tipo_de_anuncio": "Digital", "estado": "Jalisco",
+        "municipio": "Guadalajara", "zm": "Guadalajara",
+        "frecuencia_catorcenal": rng.random(sites) * 20, "frecuencia_mensual": rng.random(sites) * 30,
+        "impactos_catorcenal": messy(sites), "impactos_mensuales": messy(sites), "alcance_mensual": messy(sites),
+        "name": names[codes % campaigns],
+    }).to_csv(os.path.join(data_dir, "bd_campanias_sitios.csv"), index=False)
+
+
+def legacy_load(data_dir: str, limit: int) -> int:
+    """The row-by-row loader this benchmark replaces (campaigns, periods and
+    the first ``limit`` sites). Returns the site rows processed."""
+    from datetime import datetime
+
+    import seed
+    from app.campaigns.models import Campaign, CampaignPeriod, CampaignSite
+    from app.database import SessionLocal
+    from bench_cleaning import legacy_clean_number
+
+    db = SessionLocal()
+    try:
+        seen = set()
+        for _, row in pd.read_csv(os.path.join(data_dir, "bd_campanias_agrupado.csv")).iterrows():
+            if row["name"] in seen or db.query(Campaign).filter(Campaign.name == row["name"]).first():
+                continue
+            seen.add(row["name"])
+            db.add(Campaign(name=row["name"], tipo_campania=row["tipo_campania"],
+                            fecha_inicio=datetime.strptime(row["fecha_inicio"], "%Y-%m-%d").date(),
+                            fecha_fin=datetime.strptime(row["fecha_fin"], "%Y-%m-%d").date(),
+                            **{c: row[c] for c in seed.CAMPAIGN_COLUMNS[4:]}))
+        seen = set()
+        for _, row in pd.read_csv(os.path.join(data_dir, "bd_campanias_periodos.csv")).iterrows():
+            key = (row["name"], row["period"])
+            if key in seen or db.query(CampaignPeriod).filter(
+                    CampaignPeriod.campaign_name == key[0], CampaignPeriod.period == key[1]).first():
+                continue
+            seen.add(key)
+            db.add(CampaignPeriod(campaign_name=key[0], period=key[1],
+                                  impactos_periodo_personas=legacy_clean_number(row["impactos_periodo_personas"]),
+                                  impactos_periodo_vehiculos=legacy_clean_number(row["impactos_periodo_vehículos"])))
+        seen = set()
+        df = pd.read_csv(os.path.join(data_dir, "bd_campanias_sitios.csv"), nrows=limit)
+        for _, row in df.iterrows():
+            key = (row["name"], row["codigo_del_sitio"])
+            if key in seen or db.query(CampaignSite).filter(
+                    CampaignSite.campaign_name == key[0], CampaignSite.codigo_del_sitio == key[1]).first():
+                continue
+            seen.add(key)
+            db.add(CampaignSite(campaign_name=key[0], codigo_del_sitio=key[1],
+                                **{c: row[c] for c in seed.SITE_COLUMNS[2:9]},
+                                **{c: legacy_clean_number(row[c]) if not pd.isna(row[c]) else None
+                                   for c in seed.SITE_COLUMNS[9:]}))
+        db.commit()
+        return len(df)
+    finally:
+        db.close()
+
+
+def run(args):
+    from sqlalchemy import func, select
+
+    from app.campaigns.models import Campaign, CampaignPeriod, CampaignSite
+    from app.database import engine
+
+    tables = [CampaignSite.__table__, CampaignPeriod.__table__, Campaign.__table__]
+    Campaign.metadata.drop_all(bind=engine, tables=tables)
+    Campaign.metadata.create_all(bind=engine)
+    t0 = time.perf_counter()
+    if args.mode == "bulk":
+        import seed
+
+        seed.load_data(args.data_dir)
+        rows = args.sites
+    else:
+        rows = legacy_load(args.data_dir, args.legacy_sites)
+    elapsed = time.perf_counter() - t0
+    with engine.connect() as conn:
+        stored = conn.execute(select(func.count()).select_from(CampaignSite.__table__)).scalar()
+    full = elapsed * args.sites / rows
+    print(f"{args.mode:<8} {rows:>10} {elapsed:>10.1f} {rows / elapsed:>12.0f} {full:>14.1f} {stored:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sites", type=int, default=1_000_000)
+    parser.add_argument("--legacy-sites", type=int, default=20000)
+    parser.add_argument("--campaigns", type=int, default=1000)
+    parser.add_argument("--database-url", help="Target database (default: temporary SQLite files)")
+    parser.add_argument("--mode", choices=["bulk", "legacy"], help=argparse.SUPPRESS)
+    parser.add_argument("--data-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run(args)
+        return
+    data_dir = tempfile.mkdtemp()
+    t0 = time.perf_counter()
+    write_csvs(data_dir, args.campaigns, args.sites)
+    print(f"synthetic CSVs: {args.sites} sites, {args.campaigns} campaigns ({time.perf_counter() - t0:.1f}s)")
+    print(f"{'loader':<8} {'site rows':>10} {'seconds':>10} {'rows/s':>12} {'full file s':>14} {'stored':>12}")
+    for mode in ("bulk", "legacy"):
+        url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), mode + '.db')}"
+        subprocess.run(
+            [sys.executable, __file__, "--mode", mode, "--data-dir", data_dir, "--sites", str(args.sites),
+             "--legacy-sites", str(args.legacy_sites)],
+            env={**os.environ, "DATABASE_URL": url, "LOG_LEVEL": "ERROR"},
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Write and read times of Parquet snapshots against reading the database.
+
+Usage (from backend/):
+
+    python benchmarks/bench_snapshots.py --sites 1000000
+
+Loads the synthetic CSVs of bench_seed_loader into a fresh database (one
+company), writes a snapshot with app.campaigns.snapshots and then loads
+the company's site rows into pandas three ways:
+
+- sql:       pandas.read_sql over the tenant join, as reporting jobs do today
+- snapshot:  snapshots.read_table (memory-mapped, dictionary strings)
+- filtered:  the same with a filter on one campaign, which row-group
+             statistics mostly skip
+
+Runs in its own interpreter with DATABASE_URL set (``--database-url``
+targets an existing database; tables dropped first).
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from bench_seed_loader import write_csvs  # noqa: E402
+
+
+def run(args):
+    import pandas as pd
+    import pyarrow.dataset  # noqa: F401 - loaded lazily by the first filtered read; keep it out of the timing
+    from sqlalchemy import update
+
+    from app.campaigns import snapshots
+    from app.campaigns.models import Campaign, CampaignPeriod, CampaignSite
+    from app.database import engine
+    from app.ingest import stream
+    from app.ingest.models import IngestManifest
+
+    tables = [IngestManifest.__table__, CampaignSite.__table__, CampaignPeriod.__table__, Campaign.__table__]
+    Campaign.metadata.drop_all(bind=engine, tables=tables)
+    Campaign.metadata.create_all(bind=engine)
+    stream.stream(args.data_dir)
+    with engine.begin() as conn:
+        conn.execute(update(Campaign).values(company_id=1))
+
+    root = tempfile.mkdtemp()
+    t0 = time.perf_counter()
+    manifest = snapshots.write(1, root)
+    write_time = time.perf_counter() - t0
+    size = sum(t["bytes"] for t in manifest["tables"].values()) / (1024 * 1024)
+
+    t0 = time.perf_counter()
+    with engine.connect() as conn:
+        sql = pd.read_sql(snapshots._statement(CampaignSite, 1), conn)
+    sql_time = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    sites = snapshots.read_table(1, "campaign_sites", root=root).to_pandas()
+    read_time = time.perf_counter() - t0
+    assert len(sites) == len(sql) == manifest["tables"]["campaign_sites"]["rows"]
+
+    name = sites["campaign_name"].iloc[len(sites) // 2]
+    t0 = time.perf_counter()
+    one = snapshots.read_table(1, "campaign_sites", filters=[("campaign_name", "=", name)], root=root).to_pandas()
+    filter_time = time.perf_counter() - t0
+    assert len(one) == int((sites["campaign_name"] == name).sum())
+
+    rows = len(sites)
+    print(f"snapshot written in {write_time:.1f}s ({size:.1f} MB for {rows} sites)")
+    print(f"{'read':<10} {'seconds':>9} {'rows/s':>12}")
+    for mode, elapsed, count in (("sql", sql_time, rows), ("snapshot", read_time, rows),
+                                 ("filtered", filter_time, len(one))):
+        print(f"{mode:<10} {elapsed:>9.2f} {count / elapsed:>12,.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sites", type=int, default=1_000_000)
+    parser.add_argument("--campaigns", type=int, default=1000)
+    parser.add_argument("--database-url", help="Target database (default: a temporary SQLite file)")
+    parser.add_argument("--data-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.data_dir:
+        run(args)
+        return
+    data_dir = tempfile.mkdtemp()
+    write_csvs(data_dir, args.campaigns, args.sites)
+    url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'snapshots.db')}"
+    subprocess.run([sys.executable, __file__, "--data-dir", data_dir],
+                   env={**os.environ, "DATABASE_URL": url, "LOG_LEVEL": "ERROR"}, check=True)
+
+
+if __name__ == "__main__":
+    main()
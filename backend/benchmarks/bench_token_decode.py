@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Micro-benchmark get_current_user with and without the verified-token cache.
+
+Usage (from backend/):
+
+    python benchmarks/bench_token_decode.py --calls 50000 --tokens 20
+
+Calls the dependency directly (no HTTP stack) for ``--calls`` requests spread
+round-robin over ``--tokens`` distinct access tokens, first with the cache
+disabled (every call runs ``jwt.decode``) and then enabled, and reports the
+mean and p99 cost per call in microseconds.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=50000)
+    parser.add_argument("--tokens", type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+    from app.database import Base, SessionLocal, engine
+    from app.users import models  # noqa: F401  (registers tables)
+    from app import security
+
+    Base.metadata.create_all(bind=engine)
+
+    class _User:
+        email, company_id, role, token_version = "bench@example.com", 1, "owner", 0
+
+    tokens = []
+    for i in range(args.tokens):
+        user = _User()
+        user.id = i + 1
+        tokens.append(security.create_user_access_token(user))
+
+    db = SessionLocal()
+    print(f"{args.calls} calls over {args.tokens} tokens")
+    print(f"{'cache':<9} {'mean us':>9} {'p99 us':>9} {'hits':>8} {'misses':>8}")
+    try:
+        for label, maxsize in (("off", 0), ("on", security.ACCESS_TOKEN_CACHE_MAX_ENTRIES)):
+            cache = security._verified_tokens
+            cache.maxsize = maxsize
+            cache.invalidate()
+            security.get_current_user(tokens[0], db)  # warm up (deny-list load)
+            before = cache.stats()
+            samples = []
+            for i in range(args.calls):
+                t0 = time.perf_counter()
+                security.get_current_user(tokens[i % len(tokens)], db)
+                samples.append(time.perf_counter() - t0)
+            after = cache.stats()
+            samples.sort()
+            mean = sum(samples) / len(samples) * 1e6
+            p99 = samples[int(len(samples) * 0.99) - 1] * 1e6
+            print(f"{label:<9} {mean:>9.1f} {p99:>9.1f} {after['hit'] - before['hit']:>8} "
+                  f"{after['miss'] - before['miss']:>8}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
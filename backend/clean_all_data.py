@@ -1,114 +1,70 @@
 #!/usr/bin/env python3
 """
-Script para limpiar TODOS los datos CSV antes de cargarlos
+Script para limpiar TODOS los datos CSV antes de cargarlos.
+
+Aplica las reglas de app.ingest.cleaning (las mismas del seed) y escribe los
+archivos *_clean.csv junto a los originales.
 """
 
-import pandas as pd
-import numpy as np
+import argparse
 import os
 
-def safe_convert_to_int(val, max_int=1000000):  # Reducir límite a 1 millón para mayor seguridad
-    """Convierte un valor a entero seguro para PostgreSQL"""
-    try:
-        if pd.isna(val):
-            return None
-        
-        numeric_val = float(val)
-        
-        if numeric_val <= max_int:
-            return int(numeric_val)
-        else:
-            # Escalar valores muy grandes más agresivamente
-            scaled_val = int(numeric_val / 1000)  # Dividir por 1000
-            if scaled_val > max_int:
-                scaled_val = int(numeric_val / 10000)  # Dividir por 10,000
-            if scaled_val > max_int:
-                # Si aún es muy grande, usar valor aleatorio pequeño
-                scaled_val = np.random.randint(10000, 50000)
-            return scaled_val
-    except:
-        # Si no se puede convertir, generar valor aleatorio
-        return np.random.randint(10000, 50000)
+import numpy as np
+import pandas as pd
+
+from app.ingest import cleaning
+from app.ingest.loader import KEY_DTYPES, SITE_NUMBER_COLUMNS
+from clean_data import DATA_DIR, clean_campaign_periods_data, report
+
+# Además de las que carga el seed, el CSV de sitios trae estas columnas numéricas
+SITE_EXTRA_NUMBER_COLUMNS = [
+    'alcance_vehiculos_catorcenal', 'impactos_mensuales_prom_min_max', 'alcance_mensuales_prom_min_max',
+]
+# Límite de una columna INTEGER de PostgreSQL
+INTEGER_MAX = 2147483647
 
-def clean_all_data():
+
+def clean_all_data(data_dir=DATA_DIR, fallback=cleaning.DEFAULT_FALLBACK):
     """Limpia todos los archivos de datos"""
-    
-    data_dir = '/Users/lothmm/Downloads/prueba_tecnica_full_1/backend/data/'
-    
-    # 1. Limpiar bd_campanias_periodos.csv (ya hecho, pero verificar)
-    print("🔄 Verificando bd_campanias_periodos_clean.csv...")
-    periodos_file = os.path.join(data_dir, 'bd_campanias_periodos_clean.csv')
-    if os.path.exists(periodos_file):
-        print("✅ bd_campanias_periodos_clean.csv ya existe")
-    else:
-        print("❌ Necesita ejecutar clean_data.py primero")
-        return
-    
-    # 2. Limpiar bd_campanias_sitios.csv
+    # 1. Períodos
+    clean_campaign_periods_data(data_dir, fallback)
+
+    # 2. Sitios
     print("\n🔄 Limpiando bd_campanias_sitios.csv...")
     sitios_file = os.path.join(data_dir, 'bd_campanias_sitios.csv')
-    df_sitios = pd.read_csv(sitios_file)
-    
+    df_sitios = pd.read_csv(sitios_file, dtype=KEY_DTYPES)
     print(f"📊 Registros sitios originales: {len(df_sitios)}")
-    
-    # Columnas numéricas que pueden tener problemas
-    numeric_columns = [
-        'impactos_catorcenal', 'alcance_vehiculos_catorcenal',
-        'impactos_mensuales', 'alcance_mensual',
-        'impactos_mensuales_prom_min_max', 'alcance_mensuales_prom_min_max'
-    ]
-    
-    for col in numeric_columns:
-        if col in df_sitios.columns:
-            print(f"🔧 Limpiando columna: {col}")
-            changed_count = 0
-            for idx, val in enumerate(df_sitios[col]):
-                cleaned_val = safe_convert_to_int(val)
-                if cleaned_val != val and cleaned_val is not None:
-                    print(f"   📝 {col}[{idx}]: {val} -> {cleaned_val}")
-                    changed_count += 1
-                df_sitios.loc[idx, col] = cleaned_val
-            print(f"   ✅ {col}: {changed_count} valores modificados")
-    
-    # Guardar archivo limpio
+    columns = SITE_NUMBER_COLUMNS + SITE_EXTRA_NUMBER_COLUMNS
+    clean_sitios = cleaning.clean_frame(df_sitios, columns, fallback, keys=('name', 'codigo_del_sitio'))
+    report(df_sitios, clean_sitios, columns)
     clean_sitios_file = sitios_file.replace('.csv', '_clean.csv')
-    df_sitios.to_csv(clean_sitios_file, index=False)
+    clean_sitios.to_csv(clean_sitios_file, index=False)
     print(f"💾 Sitios limpios guardados en: {clean_sitios_file}")
-    
-    # 3. Verificar bd_campanias_agrupado.csv
+
+    # 3. Agrupado: solo columnas con valores que no caben en INTEGER
     print("\n🔄 Verificando bd_campanias_agrupado.csv...")
     agrupado_file = os.path.join(data_dir, 'bd_campanias_agrupado.csv')
-    df_agrupado = pd.read_csv(agrupado_file)
-    
+    df_agrupado = pd.read_csv(agrupado_file, dtype=KEY_DTYPES)
     print(f"📊 Registros agrupado: {len(df_agrupado)}")
-    
-    # Verificar si hay valores problemáticos en agrupado
-    numeric_cols_agrupado = df_agrupado.select_dtypes(include=[np.number]).columns
-    needs_cleaning = False
-    
-    for col in numeric_cols_agrupado:
-        max_val = df_agrupado[col].max()
-        if max_val > 2147483647:
-            print(f"⚠️ Columna {col} tiene valores muy grandes: {max_val}")
-            needs_cleaning = True
-    
-    if needs_cleaning:
-        print("🔧 Limpiando bd_campanias_agrupado.csv...")
-        for col in numeric_cols_agrupado:
-            for idx, val in enumerate(df_agrupado[col]):
-                if not pd.isna(val) and val > 2147483647:
-                    cleaned_val = safe_convert_to_int(val)
-                    print(f"   📝 {col}[{idx}]: {val} -> {cleaned_val}")
-                    df_agrupado.loc[idx, col] = cleaned_val
-        
+    numeric = df_agrupado.select_dtypes(include=[np.number]).columns
+    oversized = [col for col in numeric if df_agrupado[col].max() > INTEGER_MAX]
+    if oversized:
+        print(f"🔧 Limpiando columnas con valores muy grandes: {oversized}")
+        clean_agrupado = cleaning.clean_frame(df_agrupado, oversized, fallback, keys=('name',))
+        report(df_agrupado, clean_agrupado, oversized)
         clean_agrupado_file = agrupado_file.replace('.csv', '_clean.csv')
-        df_agrupado.to_csv(clean_agrupado_file, index=False)
+        clean_agrupado.to_csv(clean_agrupado_file, index=False)
         print(f"💾 Agrupado limpio guardado en: {clean_agrupado_file}")
     else:
         print("✅ bd_campanias_agrupado.csv no necesita limpieza")
-    
+
     print("\n🎉 ¡Limpieza de todos los archivos completada!")
 
+
 if __name__ == "__main__":
-    np.random.seed(42)  # Para resultados reproducibles
-    clean_all_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Limpia todos los CSV de campañas")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--seed", type=int, default=cleaning.CLEANING_SEED,
+                        help="Semilla de los valores de reemplazo (default: CLEANING_SEED o 42)")
+    args = parser.parse_args()
+    clean_all_data(args.data_dir, cleaning.Fallback(seed=args.seed))
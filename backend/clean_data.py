@@ -1,105 +1,55 @@
 #!/usr/bin/env python3
 """
-Script para limpiar y validar los datos de campañas antes de cargarlos
+Script para limpiar y validar los datos de períodos de campañas antes de cargarlos.
+
+Aplica las reglas de app.ingest.cleaning (las mismas del seed) y escribe
+bd_campanias_periodos_clean.csv junto al original.
 """
 
-import pandas as pd
-import numpy as np
+import argparse
 import os
 
-def clean_campaign_periods_data():
+import pandas as pd
+
+from app.ingest import cleaning
+from app.ingest.loader import KEY_DTYPES, PERIOD_NUMBER_COLUMNS
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+
+def report(raw, cleaned, columns):
+    """Imprime cuántos valores cambió la limpieza por columna."""
+    for col in columns:
+        if col not in raw:
+            continue
+        before = pd.to_numeric(raw[col], errors='coerce')
+        changed = int((raw[col].notna() & (before != cleaned[col].astype('float64'))).sum())
+        print(f"   ✅ {col}: {changed} valores modificados "
+              f"(rango {cleaned[col].min()} - {cleaned[col].max()})")
+
+
+def clean_campaign_periods_data(data_dir=DATA_DIR, fallback=cleaning.DEFAULT_FALLBACK):
     """Limpia los datos de períodos de campañas"""
-    
-    file_path = '/Users/lothmm/Downloads/prueba_tecnica_full_1/backend/data/bd_campanias_periodos.csv'
-    
+    file_path = os.path.join(data_dir, 'bd_campanias_periodos.csv')
+
     print("🔄 Cargando datos de períodos...")
-    df = pd.read_csv(file_path)
-    
+    df = pd.read_csv(file_path, dtype=KEY_DTYPES)
     print(f"📊 Registros originales: {len(df)}")
-    print("📋 Columnas:", df.columns.tolist())
-    
-    # Revisar la columna problemática
-    print("\n🔍 Analizando impactos_periodo_vehículos...")
-    vehiculos_col = 'impactos_periodo_vehículos'
-    
-    # Identificar valores que no son numéricos puros
-    non_numeric = []
-    valid_numeric = []
-    
-    for idx, val in enumerate(df[vehiculos_col]):
-        try:
-            # Intentar convertir a float
-            numeric_val = float(val)
-            # Verificar si es un número razonable (no demasiado grande)
-            if numeric_val <= 2147483647:  # Límite de integer
-                valid_numeric.append((idx, numeric_val))
-            else:
-                # Si es muy grande, lo escalamos más agresivamente
-                scaled_val = int(numeric_val / 100000000)  # Dividir por 100 millones directamente
-                if scaled_val > 1000000000:  # Si aún es muy grande
-                    scaled_val = np.random.randint(10000, 50000)
-                valid_numeric.append((idx, scaled_val))
-                print(f"⚠️ Escalando valor muy grande: {numeric_val} -> {scaled_val}")
-        except:
-            # Si no se puede convertir, es probablemente una fecha u otro formato
-            non_numeric.append((idx, val))
-    
-    print(f"❌ Valores no numéricos encontrados: {len(non_numeric)}")
-    for idx, val in non_numeric[:5]:  # Mostrar primeros 5
-        print(f"   Fila {idx}: {val}")
-    
-    print(f"✅ Valores numéricos válidos: {len(valid_numeric)}")
-    
-    # Limpiar datos
+
     print("\n🧹 Limpiando datos...")
-    
-    # Para valores no numéricos, generar valores aleatorios razonables
-    np.random.seed(42)  # Para resultados reproducibles
-    
-    for idx, val in non_numeric:
-        # Generar valor aleatorio entre 10,000 y 50,000 (valores típicos)
-        random_val = np.random.randint(10000, 50000)
-        df.loc[idx, vehiculos_col] = random_val
-        print(f"🔄 Reemplazando '{val}' -> {random_val}")
-    
-    # Actualizar valores muy grandes
-    for idx, val in valid_numeric:
-        df.loc[idx, vehiculos_col] = int(val)
-    
-    # Limpiar también la columna de personas si tiene problemas similares
-    personas_col = 'impactos_periodo_personas'
-    print(f"\n🔍 Analizando {personas_col}...")
-    
-    # Escalar valores muy grandes
-    for idx, val in enumerate(df[personas_col]):
-        try:
-            numeric_val = float(val)
-            if numeric_val > 2147483647:  # Si excede integer limit
-                scaled_val = int(numeric_val / 100000000)  # Dividir por 100 millones directamente
-                if scaled_val > 1000000000:  # Si aún es muy grande
-                    scaled_val = np.random.randint(50000, 200000)
-                df.loc[idx, personas_col] = scaled_val
-                print(f"⚠️ Escalando personas: {numeric_val} -> {scaled_val}")
-            else:
-                df.loc[idx, personas_col] = int(numeric_val)
-        except:
-            # Si no es numérico, generar valor aleatorio
-            random_val = np.random.randint(50000, 200000)
-            df.loc[idx, personas_col] = random_val
-            print(f"🔄 Reemplazando personas no numérico: {val} -> {random_val}")
-    
-    # Validar datos finales
-    print("\n✅ Validación final...")
-    print(f"📊 Registros finales: {len(df)}")
-    print(f"📈 Rango personas: {df[personas_col].min()} - {df[personas_col].max()}")
-    print(f"🚗 Rango vehículos: {df[vehiculos_col].min()} - {df[vehiculos_col].max()}")
-    
-    # Guardar archivo limpio
+    clean = cleaning.clean_frame(df, PERIOD_NUMBER_COLUMNS, fallback, keys=('name', 'period'))
+    report(df, clean, PERIOD_NUMBER_COLUMNS)
+
     clean_file_path = file_path.replace('.csv', '_clean.csv')
-    df.to_csv(clean_file_path, index=False)
+    clean.to_csv(clean_file_path, index=False)
     print(f"💾 Datos limpios guardados en: {clean_file_path}")
-    
     return clean_file_path
 
+
 if __name__ == "__main__":
-    clean_campaign_periods_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Limpia bd_campanias_periodos.csv")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--seed", type=int, default=cleaning.CLEANING_SEED,
+                        help="Semilla de los valores de reemplazo (default: CLEANING_SEED o 42)")
+    args = parser.parse_args()
+    clean_campaign_periods_data(args.data_dir, cleaning.Fallback(seed=args.seed))
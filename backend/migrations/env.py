@@ -17,8 +17,12 @@ config = context.config
 # Interpret the config file for Python logging.
 fileConfig(config.config_file_name)
 
-# Import your model's MetaData object here
+# Import your model's MetaData object here. The model modules must be imported
+# so their tables are registered on Base.metadata.
 from app.database import Base
+from app.users import models as _users_models  # noqa: F401
+from app.campaigns import models as _campaigns_models  # noqa: F401
+from app.ingest import models as _ingest_models  # noqa: F401
 
 target_metadata = Base.metadata
 
@@ -0,0 +1,35 @@
+"""add (company_id, fecha_inicio, name) index for keyset pagination
+
+Revision ID: 0004_campaigns_keyset_index
+Revises: 0003_users_email_unique
+Create Date: 2026-10-18 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0004_campaigns_keyset_index'
+down_revision = '0003_users_email_unique'
+branch_labels = None
+depends_on = None
+
+
+def _has_index(table: str, name: str) -> bool:
+    # 0001 builds tables from the current metadata, so fresh databases may
+    # already have this index.
+    inspector = sa.inspect(op.get_bind())
+    return any(ix["name"] == name for ix in inspector.get_indexes(table))
+
+
+def upgrade():
+    if not _has_index('campaigns', 'ix_campaigns_company_fecha_inicio_name'):
+        op.create_index(
+            'ix_campaigns_company_fecha_inicio_name',
+            'campaigns',
+            ['company_id', 'fecha_inicio', 'name'],
+        )
+
+
+def downgrade():
+    if _has_index('campaigns', 'ix_campaigns_company_fecha_inicio_name'):
+        op.drop_index('ix_campaigns_company_fecha_inicio_name', table_name='campaigns')
@@ -0,0 +1,40 @@
+"""add composite indexes for tenant-scoped campaign queries
+
+Revision ID: 0005_campaign_composite_indexes
+Revises: 0004_campaigns_keyset_index
+Create Date: 2026-10-18 00:10:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0005_campaign_composite_indexes'
+down_revision = '0004_campaigns_keyset_index'
+branch_labels = None
+depends_on = None
+
+
+# (index name, table, columns) matched to the filters in app/campaigns/crud.py
+INDEXES = [
+    ('ix_campaigns_company_tipo_fecha_inicio_name', 'campaigns', ['company_id', 'tipo_campania', 'fecha_inicio', 'name']),
+    ('ix_campaigns_company_fecha_fin', 'campaigns', ['company_id', 'fecha_fin']),
+    ('ix_campaign_periods_campaign_name_period', 'campaign_periods', ['campaign_name', 'period']),
+    ('ix_campaign_sites_campaign_name_codigo', 'campaign_sites', ['campaign_name', 'codigo_del_sitio']),
+]
+
+
+def _has_index(table: str, name: str) -> bool:
+    inspector = sa.inspect(op.get_bind())
+    return any(ix["name"] == name for ix in inspector.get_indexes(table))
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        if not _has_index(table, name):
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        if _has_index(table, name):
+            op.drop_index(name, table_name=table)
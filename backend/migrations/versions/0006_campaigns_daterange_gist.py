@@ -0,0 +1,34 @@
+"""add GiST daterange index for campaign date-overlap searches (PostgreSQL)
+
+Revision ID: 0006_campaigns_daterange_gist
+Revises: 0005_campaign_composite_indexes
+Create Date: 2026-10-18 00:20:00
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0006_campaigns_daterange_gist'
+down_revision = '0005_campaign_composite_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Other dialects fall back to the in-process interval tree in
+    # app/campaigns/intervals.py.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    # btree_gist lets the integer company_id share the GiST index with the
+    # range; it is a trusted extension, so the database owner may create it.
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    # The expression must match app.campaigns.crud._date_range exactly.
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_campaigns_company_fecha_range ON campaigns "
+        "USING gist (company_id, daterange(LEAST(fecha_inicio, fecha_fin), GREATEST(fecha_inicio, fecha_fin), '[]'))"
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("DROP INDEX IF EXISTS ix_campaigns_company_fecha_range")
@@ -0,0 +1,42 @@
+"""add version / updated_at to campaigns for conditional GETs
+
+Revision ID: 0007_campaign_row_version
+Revises: 0006_campaigns_daterange_gist
+Create Date: 2026-10-18 00:30:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0007_campaign_row_version'
+down_revision = '0006_campaigns_daterange_gist'
+branch_labels = None
+depends_on = None
+
+
+def _has_column(table: str, name: str) -> bool:
+    inspector = sa.inspect(op.get_bind())
+    return any(col["name"] == name for col in inspector.get_columns(table))
+
+
+def upgrade():
+    # The constant default backfills ``version``; the ORM sets both on writes.
+    if not _has_column('campaigns', 'version'):
+        op.add_column('campaigns', sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+    if not _has_column('campaigns', 'updated_at'):
+        # SQLite cannot add a column with a non-constant default to a table
+        # with rows: add it nullable, backfill, then tighten it in a batch
+        # (table copy on SQLite).
+        op.add_column('campaigns', sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+        op.execute("UPDATE campaigns SET updated_at = CURRENT_TIMESTAMP")
+        with op.batch_alter_table('campaigns') as batch:
+            batch.alter_column('updated_at', existing_type=sa.DateTime(timezone=True), nullable=False,
+                               server_default=sa.func.now())
+
+
+def downgrade():
+    with op.batch_alter_table('campaigns') as batch:
+        if _has_column('campaigns', 'updated_at'):
+            batch.drop_column('updated_at')
+        if _has_column('campaigns', 'version'):
+            batch.drop_column('version')
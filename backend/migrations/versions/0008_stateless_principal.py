@@ -0,0 +1,46 @@
+"""add users.token_version and token_revocations for stateless access tokens
+
+Revision ID: 0008_stateless_principal
+Revises: 0007_campaign_row_version
+Create Date: 2026-10-18 00:40:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0008_stateless_principal'
+down_revision = '0007_campaign_row_version'
+branch_labels = None
+depends_on = None
+
+
+def _has_column(table: str, name: str) -> bool:
+    inspector = sa.inspect(op.get_bind())
+    return any(col["name"] == name for col in inspector.get_columns(table))
+
+
+def _has_table(name: str) -> bool:
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    if not _has_column('users', 'token_version'):
+        op.add_column('users', sa.Column('token_version', sa.Integer(), nullable=False, server_default='0'))
+    if not _has_table('token_revocations'):
+        op.create_table(
+            'token_revocations',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+            sa.Column('token_version', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        )
+        op.create_index('ix_token_revocations_created_at', 'token_revocations', ['created_at'])
+
+
+def downgrade():
+    if _has_table('token_revocations'):
+        op.drop_index('ix_token_revocations_created_at', table_name='token_revocations')
+        op.drop_table('token_revocations')
+    if _has_column('users', 'token_version'):
+        with op.batch_alter_table('users') as batch:
+            batch.drop_column('token_version')
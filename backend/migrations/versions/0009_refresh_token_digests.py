@@ -0,0 +1,72 @@
+"""store refresh tokens as SHA-256 digests
+
+Revision ID: 0009_refresh_token_digests
+Revises: 0008_stateless_principal
+Create Date: 2026-10-18 00:50:00
+
+Existing raw tokens are hashed in place, so outstanding refresh cookies
+stay valid. The downgrade cannot recover raw tokens and revokes every
+session instead.
+"""
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0009_refresh_token_digests'
+down_revision = '0008_stateless_principal'
+branch_labels = None
+depends_on = None
+
+BATCH = 1000
+
+
+def _columns(table: str):
+    return {col["name"] for col in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def _indexes(table: str):
+    return {ix["name"] for ix in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    if 'token' not in _columns('refresh_tokens'):
+        return
+    bind = op.get_bind()
+    if 'token_hash' not in _columns('refresh_tokens'):
+        op.add_column('refresh_tokens', sa.Column('token_hash', sa.LargeBinary(32), nullable=True))
+    tokens = sa.table('refresh_tokens', sa.column('id', sa.Integer), sa.column('token', sa.String),
+                      sa.column('token_hash', sa.LargeBinary))
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(tokens.c.id, tokens.c.token).where(tokens.c.id > last_id).order_by(tokens.c.id).limit(BATCH)
+        ).fetchall()
+        if not rows:
+            break
+        bind.execute(
+            tokens.update().where(tokens.c.id == sa.bindparam('row_id')).values(token_hash=sa.bindparam('digest')),
+            [{'row_id': row.id, 'digest': hashlib.sha256(row.token.encode('utf-8')).digest()} for row in rows],
+        )
+        last_id = rows[-1].id
+    if 'ix_refresh_tokens_token' in _indexes('refresh_tokens'):
+        op.drop_index('ix_refresh_tokens_token', table_name='refresh_tokens')
+    with op.batch_alter_table('refresh_tokens') as batch:
+        batch.drop_column('token')
+        batch.alter_column('token_hash', existing_type=sa.LargeBinary(32), nullable=False)
+    op.create_index('ix_refresh_tokens_token_hash', 'refresh_tokens', ['token_hash'], unique=True)
+
+
+def downgrade():
+    if 'token_hash' not in _columns('refresh_tokens'):
+        return
+    op.drop_index('ix_refresh_tokens_token_hash', table_name='refresh_tokens')
+    with op.batch_alter_table('refresh_tokens') as batch:
+        batch.add_column(sa.Column('token', sa.String(), nullable=True))
+    # Raw tokens are gone: give every row a unique placeholder and revoke it
+    op.execute("UPDATE refresh_tokens SET token = 'revoked-' || id, revoked = true")
+    with op.batch_alter_table('refresh_tokens') as batch:
+        batch.drop_column('token_hash')
+        batch.alter_column('token', existing_type=sa.String(), nullable=False)
+    op.create_index('ix_refresh_tokens_token', 'refresh_tokens', ['token'], unique=True)
@@ -0,0 +1,92 @@
+"""partition refresh_tokens by expires_at month (PostgreSQL)
+
+Revision ID: 0010_refresh_tokens_partitioned
+Revises: 0009_refresh_token_digests
+Create Date: 2026-10-18 01:10:00
+
+The table is rebuilt as ``PARTITION BY RANGE (expires_at)`` with monthly
+partitions covering the existing rows (see app.users.partitions) and a
+default partition. A partitioned table's unique constraints must include
+the partition key, so the primary key becomes (id, expires_at) and the
+token_hash index becomes unique on (token_hash, expires_at). Token digests
+are random, so uniqueness of token_hash alone is unaffected in practice.
+
+Other dialects keep the single table; app.users.token_gc deletes expired
+rows in batches there.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.users import partitions
+
+# revision identifiers, used by Alembic.
+revision = '0010_refresh_tokens_partitioned'
+down_revision = '0009_refresh_token_digests'
+branch_labels = None
+depends_on = None
+
+COLUMNS = "id, token_hash, user_id, created_at, expires_at, revoked"
+
+
+def _create_table(sequence: str, partitioned: bool):
+    primary_key = "PRIMARY KEY (id, expires_at)" if partitioned else "PRIMARY KEY (id)"
+    suffix = " PARTITION BY RANGE (expires_at)" if partitioned else ""
+    op.execute(
+        f"CREATE TABLE refresh_tokens ("
+        f"id INTEGER NOT NULL DEFAULT nextval('{sequence}'), "
+        f"token_hash BYTEA NOT NULL, "
+        f"user_id INTEGER NOT NULL REFERENCES users (id), "
+        f"created_at TIMESTAMP WITH TIME ZONE DEFAULT now(), "
+        f"expires_at TIMESTAMP WITH TIME ZONE NOT NULL, "
+        f"revoked BOOLEAN, "
+        f"{primary_key}){suffix}"
+    )
+
+
+def _swap_out(old_name: str) -> str:
+    """Rename the current table out of the way, free its index names and
+    detach its id sequence so the replacement can take both over."""
+    bind = op.get_bind()
+    sequence = bind.execute(sa.text("SELECT pg_get_serial_sequence('refresh_tokens', 'id')")).scalar()
+    sequence = sequence or "refresh_tokens_id_seq"
+    if sequence == "refresh_tokens_id_seq" and not bind.execute(
+            sa.text("SELECT to_regclass('refresh_tokens_id_seq')")).scalar():
+        op.execute("CREATE SEQUENCE refresh_tokens_id_seq")
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY NONE")
+    op.execute("ALTER TABLE refresh_tokens ALTER COLUMN id DROP DEFAULT")
+    op.execute(f"ALTER TABLE refresh_tokens RENAME TO {old_name}")
+    for index in sa.inspect(bind).get_indexes(old_name):
+        op.execute(f'DROP INDEX IF EXISTS "{index["name"]}"')
+    op.execute(f"ALTER TABLE {old_name} DROP CONSTRAINT IF EXISTS refresh_tokens_pkey")
+    return sequence
+
+
+def _finish(old_name: str, sequence: str):
+    op.execute(f"INSERT INTO refresh_tokens ({COLUMNS}) SELECT {COLUMNS} FROM {old_name}")
+    op.execute(f"DROP TABLE {old_name} CASCADE")
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY refresh_tokens.id")
+    op.execute(f"SELECT setval('{sequence}', COALESCE((SELECT max(id) FROM refresh_tokens), 0) + 1, false)")
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql' or partitions.is_partitioned(bind):
+        return
+    sequence = _swap_out('refresh_tokens_unpartitioned')
+    _create_table(sequence, partitioned=True)
+    op.execute("CREATE TABLE refresh_tokens_default PARTITION OF refresh_tokens DEFAULT")
+    oldest = bind.execute(sa.text("SELECT min(expires_at) FROM refresh_tokens_unpartitioned")).scalar()
+    partitions.ensure(bind, since=oldest)
+    _finish('refresh_tokens_unpartitioned', sequence)
+    op.execute("CREATE UNIQUE INDEX ix_refresh_tokens_token_hash ON refresh_tokens (token_hash, expires_at)")
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql' or not partitions.is_partitioned(bind):
+        return
+    sequence = _swap_out('refresh_tokens_partitioned')
+    _create_table(sequence, partitioned=False)
+    _finish('refresh_tokens_partitioned', sequence)
+    op.create_index('ix_refresh_tokens_id', 'refresh_tokens', ['id'])
+    op.create_index('ix_refresh_tokens_token_hash', 'refresh_tokens', ['token_hash'], unique=True)
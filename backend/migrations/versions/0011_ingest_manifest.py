@@ -0,0 +1,37 @@
+"""add ingest_manifest for incremental CSV ingest
+
+Revision ID: 0011_ingest_manifest
+Revises: 0010_refresh_tokens_partitioned
+Create Date: 2026-10-18 02:10:00
+
+Starts empty: the first sync adopts the rows already loaded by seed.py
+(one update per row) and is incremental from then on.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0011_ingest_manifest'
+down_revision = '0010_refresh_tokens_partitioned'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name: str) -> bool:
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    if not _has_table('ingest_manifest'):
+        op.create_table(
+            'ingest_manifest',
+            sa.Column('source', sa.String(), primary_key=True),
+            sa.Column('key', sa.String(), primary_key=True),
+            sa.Column('row_hash', sa.BigInteger(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        )
+
+
+def downgrade():
+    if _has_table('ingest_manifest'):
+        op.drop_table('ingest_manifest')
@@ -0,0 +1,48 @@
+"""add import_jobs for asynchronous bulk imports
+
+Revision ID: 0012_import_jobs
+Revises: 0011_ingest_manifest
+Create Date: 2026-10-18 18:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0012_import_jobs'
+down_revision = '0011_ingest_manifest'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name: str) -> bool:
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    if not _has_table('import_jobs'):
+        op.create_table(
+            'import_jobs',
+            sa.Column('id', sa.String(), primary_key=True),
+            sa.Column('company_id', sa.Integer(), sa.ForeignKey('companies.id'), nullable=False),
+            sa.Column('source', sa.String(), nullable=False),
+            sa.Column('format', sa.String(), nullable=False),
+            sa.Column('filename', sa.String()),
+            sa.Column('status', sa.String(), nullable=False),
+            sa.Column('rows_total', sa.Integer()),
+            sa.Column('rows_processed', sa.Integer(), nullable=False),
+            sa.Column('inserted', sa.Integer(), nullable=False),
+            sa.Column('updated', sa.Integer(), nullable=False),
+            sa.Column('failed', sa.Integer(), nullable=False),
+            sa.Column('errors', sa.JSON(), nullable=False),
+            sa.Column('detail', sa.String()),
+            sa.Column('created_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+            sa.Column('started_at', sa.DateTime(timezone=True)),
+            sa.Column('finished_at', sa.DateTime(timezone=True)),
+        )
+        op.create_index('ix_import_jobs_company_id', 'import_jobs', ['company_id'])
+
+
+def downgrade():
+    if _has_table('import_jobs'):
+        op.drop_index('ix_import_jobs_company_id', table_name='import_jobs')
+        op.drop_table('import_jobs')
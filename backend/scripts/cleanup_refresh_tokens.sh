@@ -7,10 +7,20 @@ set -euo pipefail
 # Optional env vars:
 #   KEEP_EXPIRED_DAYS=30
 #   KEEP_REVOKED_DAYS=7
+#   GC_BATCH_SIZE=1000
+#   GC_THROTTLE_SECONDS=0
+#   GC_TIME_BUDGET_SECONDS=   (empty = no limit)
 
 KEEP_EXPIRED_DAYS="${KEEP_EXPIRED_DAYS:-30}"
 KEEP_REVOKED_DAYS="${KEEP_REVOKED_DAYS:-7}"
+GC_BATCH_SIZE="${GC_BATCH_SIZE:-1000}"
+GC_THROTTLE_SECONDS="${GC_THROTTLE_SECONDS:-0}"
+EXTRA_ARGS=()
+if [ -n "${GC_TIME_BUDGET_SECONDS:-}" ]; then
+  EXTRA_ARGS+=(--time-budget "$GC_TIME_BUDGET_SECONDS")
+fi
 
 echo "Running refresh_tokens cleanup (keep_expired_days=$KEEP_EXPIRED_DAYS, keep_revoked_days=$KEEP_REVOKED_DAYS)"
 
-python -m app.scripts.cleanup_refresh_tokens --keep-expired-days "$KEEP_EXPIRED_DAYS" --keep-revoked-days "$KEEP_REVOKED_DAYS"
+python -m app.scripts.cleanup_refresh_tokens --keep-expired-days "$KEEP_EXPIRED_DAYS" --keep-revoked-days "$KEEP_REVOKED_DAYS" \
+  --batch-size "$GC_BATCH_SIZE" --throttle "$GC_THROTTLE_SECONDS" ${EXTRA_ARGS[@]+"${EXTRA_ARGS[@]}"}
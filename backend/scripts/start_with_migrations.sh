@@ -15,4 +15,8 @@ echo "🧠 Running smart migrations..."
 python smart_migrations.py
 
 echo "🌐 Starting uvicorn server..."
+# Behind a TLS proxy the socket peer is the proxy: set RATE_LIMIT_TRUST_PROXY
+# to the number of proxies (render.yaml sets 1) so rate limits key on the
+# client's X-Forwarded-For entry instead of one shared proxy address.
+echo "   rate limits trust ${RATE_LIMIT_TRUST_PROXY:-0} proxy hop(s) in X-Forwarded-For"
 exec uvicorn app.main:app --host 0.0.0.0 --port 8000
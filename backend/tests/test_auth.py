@@ -35,3 +35,409 @@ def test_register_and_login():
     assert resp.status_code == 200
     me = resp.json()
     assert me["email"] == "owner@example.com"
+
+
+def test_access_token_authorizes_without_user_lookup():
+    from datetime import timedelta
+    from sqlalchemy import event
+    from app.database import engine, SessionLocal
+    from app.security import create_access_token
+    from app.users import crud as users_crud, revocation
+
+    resp = client.post("/auth/register", json={"email": "principal@example.com", "password": "secret",
+                                               "company_name": "PrincipalCo"})
+    assert resp.status_code == 201
+    user_id = resp.json()["id"]
+    token = client.post("/auth/token", data={"username": "principal@example.com", "password": "secret"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    db = SessionLocal()
+    try:
+        # Start inside the deny-list refresh interval
+        revocation.refresh(db, max_token_age=timedelta(hours=1), force=True)
+    finally:
+        db.close()
+
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        assert client.get("/campaigns/?limit=5", headers=headers).status_code == 200
+        assert client.get("/campaigns/missing", headers=headers).status_code == 404
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+    assert statements
+    assert not any("FROM users" in s or "token_revocations" in s for s in statements)
+
+    # Tokens minted without principal claims still work through a lookup
+    legacy = create_access_token({"sub": "principal@example.com"})
+    assert client.get("/campaigns/?limit=5", headers={"Authorization": f"Bearer {legacy}"}).status_code == 200
+
+    # Revocation rejects tokens carrying the old version; new logins work
+    db = SessionLocal()
+    try:
+        users_crud.revoke_user_tokens(db, user_id)
+    finally:
+        db.close()
+    assert client.get("/campaigns/?limit=5", headers=headers).status_code == 401
+    token = client.post("/auth/token", data={"username": "principal@example.com", "password": "secret"}).json()["access_token"]
+    assert client.get("/campaigns/?limit=5", headers={"Authorization": f"Bearer {token}"}).status_code == 200
+
+
+def test_verified_access_tokens_skip_signature_checks(monkeypatch):
+    from datetime import timedelta
+    from app import security
+
+    resp = client.post("/auth/register", json={"email": "tokencache@example.com", "password": "secret",
+                                               "company_name": "TokenCacheCo"})
+    assert resp.status_code == 201
+    token = client.post("/auth/token", data={"username": "tokencache@example.com", "password": "secret"}).json()["access_token"]
+    decodes = []
+    real_decode = security.jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        decodes.append(args[0])
+        return real_decode(*args, **kwargs)
+
+    monkeypatch.setattr(security.jwt, "decode", counting_decode)
+    before = security._verified_tokens.stats()
+    for _ in range(3):
+        assert client.get("/campaigns/?limit=5", headers={"Authorization": f"Bearer {token}"}).status_code == 200
+    after = security._verified_tokens.stats()
+    assert decodes == [token]
+    assert after["hit"] - before["hit"] == 2 and after["miss"] - before["miss"] == 1
+
+    # Invalid tokens are never cached; expired ones are rejected by jwt.decode
+    assert client.get("/campaigns/", headers={"Authorization": f"Bearer {token}x"}).status_code == 401
+    expired = security.create_access_token({"sub": "tokencache@example.com"}, expires_delta=timedelta(seconds=-1))
+    assert security.decode_access_token(expired) is None
+    assert security._verified_tokens.stats()["size"] == after["size"]
+
+
+def test_deny_list_replays_revocations_from_other_processes():
+    import time
+    from datetime import datetime, timedelta
+    from app.database import SessionLocal
+    from app.users import models, revocation
+
+    db = SessionLocal()
+    try:
+        revocation.reset()
+        revocation.refresh(db, max_token_age=timedelta(hours=1))
+        # Another worker revoked user 4242's tokens up to version 3
+        db.add(models.TokenRevocation(user_id=4242, token_version=3, created_at=datetime.utcnow()))
+        db.commit()
+        assert not revocation.is_revoked(4242, 2)
+        revocation.refresh(db, max_token_age=timedelta(hours=1), force=True)
+        assert revocation.is_revoked(4242, 2)
+        assert not revocation.is_revoked(4242, 3)
+        # A cold process loads recent revocations only
+        revocation.reset()
+        revocation.refresh(db, max_token_age=timedelta(hours=1))
+        assert revocation.is_revoked(4242, 2)
+
+        # Entries expire with the last token they cover, so the deny-list
+        # does not grow with every user ever revoked
+        revocation.note(4343, 5, ttl=0.05)
+        assert revocation.is_revoked(4343, 4)
+        time.sleep(0.1)
+        assert not revocation.is_revoked(4343, 4)
+        db.add(models.TokenRevocation(user_id=4444, token_version=2,
+                                      created_at=datetime.utcnow() - timedelta(minutes=59, seconds=59)))
+        db.commit()
+        revocation.refresh(db, max_token_age=timedelta(hours=1), force=True)
+        assert revocation.is_revoked(4444, 1)
+        time.sleep(1.1)
+        assert not revocation.is_revoked(4444, 1)
+        assert revocation.is_revoked(4242, 2)
+    finally:
+        db.close()
+
+
+def test_login_returns_503_when_hashing_is_saturated(monkeypatch):
+    from app import hashing
+
+    resp = client.post("/auth/register", json={"email": "busy@example.com", "password": "secret"})
+    assert resp.status_code == 201
+    monkeypatch.setattr(hashing, "HASH_QUEUE_TIMEOUT_SECONDS", 0.05)
+    held = 0
+    while hashing._slots.acquire(blocking=False):
+        held += 1
+    try:
+        resp = client.post("/auth/token", data={"username": "busy@example.com", "password": "secret"})
+        assert resp.status_code == 503
+        assert resp.headers["retry-after"] == "1"
+        monkeypatch.setattr(hashing, "HASH_MAX_QUEUE", 0)
+        resp = client.post("/auth/register", json={"email": "busy2@example.com", "password": "secret"})
+        assert resp.status_code == 503
+    finally:
+        for _ in range(held):
+            hashing._slots.release()
+    assert hashing.queue_depth() == 0
+    monkeypatch.undo()
+    assert client.post("/auth/token", data={"username": "busy@example.com", "password": "secret"}).status_code == 200
+
+
+def test_hashing_process_pool_round_trip(monkeypatch):
+    from app import hashing
+
+    monkeypatch.setattr(hashing, "HASH_WORKERS", 1)
+    try:
+        hashed = hashing.hash_password("s3cret")
+        assert hashing.verify_password("s3cret", hashed)
+        assert not hashing.verify_password("wrong", hashed)
+        monkeypatch.setattr(hashing, "HASH_BATCH_PARALLELISM", 2)
+        batch = hashing.hash_passwords(["a", "b", "c"])
+        assert [hashing.verify_password(p, h) for p, h in zip("abc", batch)] == [True, True, True]
+    finally:
+        if hashing._executor is not None:
+            hashing._executor.shutdown()
+            hashing._executor = None
+
+
+def _stored_hash(email):
+    from app.database import SessionLocal
+    from app.users import crud as users_crud
+
+    db = SessionLocal()
+    try:
+        return users_crud.get_user_by_email(db, email).hashed_password
+    finally:
+        db.close()
+
+
+def _set_stored_hash(email, hashed):
+    from app.database import SessionLocal
+    from app.users import models
+
+    db = SessionLocal()
+    try:
+        db.query(models.User).filter(models.User.email == email).update({models.User.hashed_password: hashed})
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_login_rehashes_off_policy_hashes_in_background():
+    from passlib.hash import pbkdf2_sha256
+    from app.security import pwd_context
+
+    assert client.post("/auth/register", json={"email": "rehash@example.com", "password": "secret"}).status_code == 201
+    current = _stored_hash("rehash@example.com")
+    assert not pwd_context.needs_update(current)
+
+    # Over-cost hash from an older policy: login succeeds, then it is rehashed
+    _set_stored_hash("rehash@example.com", pbkdf2_sha256.using(rounds=100000).hash("secret"))
+    assert client.post("/auth/token", data={"username": "rehash@example.com", "password": "secret"}).status_code == 200
+    upgraded = _stored_hash("rehash@example.com")
+    assert upgraded.startswith("$pbkdf2-sha256$") and not pwd_context.needs_update(upgraded)
+    assert pwd_context.verify("secret", upgraded)
+
+    # Already on policy: left alone
+    assert client.post("/auth/token", data={"username": "rehash@example.com", "password": "secret"}).status_code == 200
+    assert _stored_hash("rehash@example.com") == upgraded
+
+    # Failed logins never rehash
+    _set_stored_hash("rehash@example.com", pbkdf2_sha256.using(rounds=100000).hash("secret"))
+    stale = _stored_hash("rehash@example.com")
+    assert client.post("/auth/token", data={"username": "rehash@example.com", "password": "nope"}).status_code == 401
+    assert _stored_hash("rehash@example.com") == stale
+
+
+def test_login_upgrades_legacy_bcrypt_hashes():
+    from passlib.hash import bcrypt
+
+    try:
+        legacy = bcrypt.using(rounds=4).hash("secret")
+    except Exception:
+        pytest.skip("bcrypt backend unavailable")
+    assert client.post("/auth/register", json={"email": "bcrypt@example.com", "password": "secret"}).status_code == 201
+    _set_stored_hash("bcrypt@example.com", legacy)
+    assert client.post("/auth/token", data={"username": "bcrypt@example.com", "password": "secret"}).status_code == 200
+    assert _stored_hash("bcrypt@example.com").startswith("$pbkdf2-sha256$")
+
+
+def test_refresh_rotation_is_single_use_and_stores_digests():
+    from datetime import datetime, timedelta
+    from app.database import SessionLocal
+    from app.users import crud as users_crud, models
+
+    resp = client.post("/auth/register", json={"email": "rotate@example.com", "password": "secret"})
+    user_id = resp.json()["id"]
+    db = SessionLocal()
+    try:
+        rt = users_crud.create_refresh_token(db, user_id=user_id)
+        stored = db.query(models.RefreshToken).filter(models.RefreshToken.user_id == user_id).one()
+        assert stored.token_hash == users_crud.token_digest(rt.token) and len(stored.token_hash) == 32
+
+        user, new = users_crud.rotate_refresh_token(db, rt.token)
+        assert user.id == user_id and user.email == "rotate@example.com"
+        assert new.token != rt.token
+        assert users_crud.get_refresh_token(db, rt.token).revoked
+        # A replayed (or concurrently used) token is rejected
+        assert users_crud.rotate_refresh_token(db, rt.token) is None
+        assert users_crud.rotate_refresh_token(db, "unknown") is None
+
+        db.query(models.RefreshToken).filter(models.RefreshToken.token_hash == users_crud.token_digest(new.token)).update(
+            {models.RefreshToken.expires_at: datetime.utcnow() - timedelta(seconds=1)})
+        db.commit()
+        assert users_crud.rotate_refresh_token(db, new.token) is None
+        assert users_crud.get_refresh_token(db, new.token) is None
+        expired = db.query(models.RefreshToken).filter(
+            models.RefreshToken.token_hash == users_crud.token_digest(new.token)).one()
+        assert not expired.revoked
+    finally:
+        db.close()
+
+
+def test_token_gc_deletes_garbage_in_bounded_batches():
+    from datetime import datetime, timedelta
+    from app.database import SessionLocal
+    from app.users import crud as users_crud, models, token_gc
+
+    user_id = client.post("/auth/register", json={"email": "tokengc@example.com", "password": "secret"}).json()["id"]
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        def add(n, **fields):
+            for _ in range(n):
+                rt = users_crud.create_refresh_token(db, user_id=user_id)
+                db.query(models.RefreshToken).filter(
+                    models.RefreshToken.token_hash == users_crud.token_digest(rt.token)).update(fields)
+            db.commit()
+
+        add(5, expires_at=now - timedelta(days=40))
+        add(2, revoked=True, created_at=now - timedelta(days=10))
+        add(1, revoked=True)  # recently revoked: kept for audit
+        add(1, expires_at=now - timedelta(days=1))  # recently expired: kept
+        assert token_gc.count_garbage(db) == 7
+
+        seen = []
+        partial = token_gc.collect(db, batch_size=2, time_budget_seconds=0, progress=seen.append)
+        assert (partial.deleted, partial.batches, partial.complete) == (2, 1, False)
+        assert len(seen) == 1
+
+        result = token_gc.collect(db, batch_size=2)
+        assert (result.deleted, result.batches, result.complete) == (5, 3, True)
+        assert token_gc.count_garbage(db) == 0
+        assert db.query(models.RefreshToken).filter(models.RefreshToken.user_id == user_id).count() == 2
+    finally:
+        db.close()
+
+
+def test_refresh_token_partition_helpers():
+    from datetime import date, datetime
+    from app.database import engine
+    from app.users import partitions
+
+    assert partitions.add_months(date(2026, 11, 1), 2) == date(2027, 1, 1)
+    assert partitions.add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+    assert partitions.partition_name(date(2026, 3, 1)) == "refresh_tokens_p202603"
+    assert partitions.month_start(datetime(2026, 10, 18, 12)) == date(2026, 10, 1)
+    # SQLite keeps a single table: partition maintenance is a no-op there
+    with engine.connect() as conn:
+        assert not partitions.is_partitioned(conn)
+        assert partitions.ensure(conn) == [] and partitions.drop_expired(conn, 30) == []
+
+
+def test_login_rate_limit_rejects_before_hashing(monkeypatch, tmp_path):
+    from app import hashing, ratelimit
+
+    assert client.post("/auth/register", json={"email": "limited@example.com", "password": "secret"}).status_code == 201
+    monkeypatch.setattr(ratelimit, "storage", ratelimit.MemoryStorage())
+    monkeypatch.setitem(ratelimit.LIMITS, "login", {"ip": None, "email": ratelimit.parse_limit("2/60")})
+    hashes = []
+    real_verify = hashing.verify_password
+    monkeypatch.setattr(hashing, "verify_password", lambda *a: hashes.append(1) or real_verify(*a))
+
+    form = {"username": "limited@example.com", "password": "wrong"}
+    assert [client.post("/auth/token", data=form).status_code for _ in range(2)] == [401, 401]
+    # Emails are normalized, so changing case does not get a fresh bucket
+    resp = client.post("/auth/token", data={"username": "LIMITED@example.com", "password": "secret"})
+    assert resp.status_code == 429
+    assert 1 <= int(resp.headers["retry-after"]) <= 30
+    assert len(hashes) == 2
+    # Other emails are unaffected
+    assert client.post("/auth/token", data={"username": "other@example.com", "password": "x"}).status_code == 401
+    metrics = client.get("/metrics")
+    if metrics.status_code == 200:
+        assert 'app_rate_limit_rejected_total{endpoint="login",scope="email"}' in metrics.text
+
+    # Workers sharing a SQLite file share buckets
+    path = str(tmp_path / "buckets.db")
+    a, b = ratelimit.SQLiteStorage(path), ratelimit.SQLiteStorage(path)
+    assert a.take("k", 2, 1 / 60, now=1000.0) == 0
+    assert b.take("k", 2, 1 / 60, now=1000.0) == 0
+    assert a.take("k", 2, 1 / 60, now=1000.0) == 60
+    assert b.take("k", 2, 1 / 60, now=1060.0) == 0
+
+
+def test_rate_limit_keys_on_forwarded_client_ip(monkeypatch):
+    from app import ratelimit
+
+    monkeypatch.setattr(ratelimit, "storage", ratelimit.MemoryStorage())
+    monkeypatch.setitem(ratelimit.LIMITS, "login", {"ip": ratelimit.parse_limit("1/60"), "email": None})
+
+    def login(forwarded):
+        return client.post("/auth/token", data={"username": "nobody@example.com", "password": "x"},
+                           headers={"X-Forwarded-For": forwarded}).status_code
+
+    # Without trusted proxies the header is ignored: one bucket for the peer
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_TRUST_PROXY", 0)
+    assert [login("203.0.113.1"), login("203.0.113.2")] == [401, 429]
+
+    # One trusted proxy: the hop it appended is the key, client-sent hops are not
+    monkeypatch.setattr(ratelimit, "storage", ratelimit.MemoryStorage())
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_TRUST_PROXY", 1)
+    assert [login("203.0.113.1"), login("203.0.113.2"), login("spoofed, 203.0.113.1")] == [401, 401, 429]
+
+    # Two proxies (e.g. a CDN in front of the load balancer)
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_TRUST_PROXY", 2)
+    assert login("spoofed, 198.51.100.7, 10.0.0.2") == 401
+    assert login("other, 198.51.100.7, 10.0.0.3") == 429
+
+
+def test_owner_bulk_creates_users_in_one_transaction():
+    from sqlalchemy import event
+    from app.database import engine
+
+    assert client.post("/auth/register", json={"email": "bulkowner@example.com", "password": "secret",
+                                               "company_name": "BulkCo"}).status_code == 201
+    assert client.post("/auth/register", json={"email": "bulktaken@example.com", "password": "secret"}).status_code == 201
+    token = client.post("/auth/token", data={"username": "bulkowner@example.com", "password": "secret"}).json()["access_token"]
+    payload = [{"email": f"bulk{i}@example.com", "password": f"pw{i}", "role": "admin" if i == 0 else "viewer"}
+               for i in range(5)]
+    payload += [{"email": "bulk1@example.com", "password": "again"},
+                {"email": "bulktaken@example.com", "password": "x"},
+                {"email": "bulk9@example.com", "password": "pw9", "role": "owner"}]
+
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        resp = client.post("/auth/create_users", json=payload, headers={"Authorization": f"Bearer {token}"})
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+    assert resp.status_code == 200
+    body = resp.json()
+    assert (body["created"], body["failed"]) == (6, 2)
+    assert [r["index"] for r in body["results"]] == list(range(8))
+    assert body["results"][5]["error"] == "Duplicate email in request"
+    assert body["results"][6]["error"] == "Email already registered"
+    assert body["results"][0]["user"]["role"] == "admin"
+    # Owners cannot be created in bulk either
+    assert body["results"][7]["user"]["role"] == "viewer"
+    assert len({r["user"]["company_id"] for r in body["results"] if r["user"]}) == 1
+    # One IN lookup, no per-user count(), and the inserts in one transaction
+    assert sum(1 for s in statements if s.lstrip().upper().startswith("SELECT") and "FROM users" in s) == 1
+    assert not any("count(" in s.lower() for s in statements)
+    assert client.post("/auth/token", data={"username": "bulk3@example.com", "password": "pw3"}).status_code == 200
+
+    viewer = client.post("/auth/token", data={"username": "bulk4@example.com", "password": "pw4"}).json()["access_token"]
+    assert client.post("/auth/create_users", json=payload[:1],
+                       headers={"Authorization": f"Bearer {viewer}"}).status_code == 403
@@ -39,7 +39,8 @@ def test_refresh_rotate_and_logout():
     # get the RefreshToken from DB
     rt_obj = crud_users.get_refresh_token(db, rt)
     assert rt_obj is not None
-    old_token = rt_obj.token
+    # Only the digest is stored; the cookie keeps the raw value
+    old_token = rt
 
     # call refresh -> should rotate. Ensure the client cookie jar contains the token.
     client.cookies.set('refresh_token', old_token)
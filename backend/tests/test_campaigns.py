@@ -81,3 +81,398 @@ def test_campaign_crud_and_isolation():
     assert resp.status_code == 200
     dataB = resp.json()
     assert dataB["total"] == 0 or all(c["company_id"] != data["data"][0].get("company_id") for c in dataB["data"]) 
+
+
+def test_campaign_keyset_pagination():
+    make_user("ownerK@example.com", "secretK", "CompanyK")
+    token = login("ownerK@example.com", "secretK")
+    headers = {"Authorization": f"Bearer {token}"}
+    # Two campaigns share a start date so the name tie-breaker is exercised
+    dates = ["2025-03-01", "2025-01-01", "2025-02-01", "2025-01-01", "2025-04-01", "2025-05-01", "2025-02-15"]
+    for i, d in enumerate(dates):
+        payload = sample_campaign_payload(f"campK{i}")
+        payload["fecha_inicio"] = d
+        payload["fecha_fin"] = "2025-12-31"
+        resp = client.post("/campaigns/", json=payload, headers=headers)
+        assert resp.status_code == 201
+
+    expected = [c["name"] for c in sorted(
+        ({"name": f"campK{i}", "d": d} for i, d in enumerate(dates)),
+        key=lambda c: (c["d"], c["name"]),
+    )]
+
+    # Offset mode still works and hands out a cursor for the next page
+    resp = client.get("/campaigns/?skip=0&limit=3", headers=headers)
+    assert resp.status_code == 200
+    body = resp.json()
+    assert [c["name"] for c in body["data"]] == expected[:3]
+    assert body["next_cursor"]
+
+    seen = [c["name"] for c in body["data"]]
+    cursor = body["next_cursor"]
+    while cursor:
+        resp = client.get(f"/campaigns/?limit=3&after={cursor}", headers=headers)
+        assert resp.status_code == 200
+        body = resp.json()
+        assert body["total"] == len(dates)
+        seen.extend(c["name"] for c in body["data"])
+        cursor = body["next_cursor"]
+    assert seen == expected
+
+    resp = client.get("/campaigns/?limit=3&after=not-a-cursor", headers=headers)
+    assert resp.status_code == 400
+
+
+def test_campaign_list_count_modes_single_round_trip():
+    from sqlalchemy import event
+    from app.database import engine
+
+    make_user("ownerC@example.com", "secretC", "CompanyC")
+    token = login("ownerC@example.com", "secretC")
+    headers = {"Authorization": f"Bearer {token}"}
+    for i in range(4):
+        resp = client.post("/campaigns/", json=sample_campaign_payload(f"campC{i}"), headers=headers)
+        assert resp.status_code == 201
+
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if "FROM campaigns" in statement:
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        resp = client.get("/campaigns/?skip=0&limit=3", headers=headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["total"] == 4
+    assert body["has_more"] is True
+    # Page and total come back from a single query
+    assert len(statements) == 1
+
+    resp = client.get("/campaigns/?skip=3&limit=3&count=none", headers=headers)
+    body = resp.json()
+    assert body["total"] is None
+    assert len(body["data"]) == 1
+    assert body["has_more"] is False
+
+    # Past the end no row carries the total, but it is still exact
+    resp = client.get("/campaigns/?skip=10&limit=3", headers=headers)
+    assert resp.json()["total"] == 4
+
+    # estimate falls back to an exact count on SQLite
+    resp = client.get("/campaigns/?limit=3&count=estimate", headers=headers)
+    assert resp.json()["total"] == 4
+
+    resp = client.get("/campaigns/?limit=3&count=bogus", headers=headers)
+    assert resp.status_code == 422
+
+
+def test_search_by_date_is_bounded_and_paginated():
+    make_user("ownerD@example.com", "secretD", "CompanyD")
+    token = login("ownerD@example.com", "secretD")
+    headers = {"Authorization": f"Bearer {token}"}
+    spans = [("2025-01-01", "2025-01-31"), ("2025-02-01", "2025-02-28"), ("2025-01-15", "2025-03-15"),
+             ("2025-04-01", "2025-04-30"), ("2024-12-01", "2025-01-05")]
+    for i, (s, e) in enumerate(spans):
+        payload = sample_campaign_payload(f"campD{i}")
+        payload["fecha_inicio"], payload["fecha_fin"] = s, e
+        assert client.post("/campaigns/", json=payload, headers=headers).status_code == 201
+
+    url = "/campaigns/search-by-date/?start_date=2025-01-20T00:00:00&end_date=2025-02-10T00:00:00&limit=2"
+    resp = client.get(url, headers=headers)
+    assert resp.status_code == 200
+    names = [c["name"] for c in resp.json()]
+    assert names == ["campD0", "campD2"]
+    cursor = resp.headers.get("x-next-cursor")
+    assert cursor
+
+    resp = client.get(f"{url}&after={cursor}", headers=headers)
+    assert [c["name"] for c in resp.json()] == ["campD1"]
+    assert "x-next-cursor" not in resp.headers
+
+    # Writes invalidate the per-company interval index
+    payload = sample_campaign_payload("campD9")
+    payload["fecha_inicio"], payload["fecha_fin"] = "2025-02-01", "2025-02-02"
+    assert client.post("/campaigns/", json=payload, headers=headers).status_code == 201
+    resp = client.get(url.replace("limit=2", "limit=10"), headers=headers)
+    assert [c["name"] for c in resp.json()] == ["campD0", "campD2", "campD1", "campD9"]
+
+
+def test_campaign_detail_does_not_join_periods_with_sites():
+    from sqlalchemy import event
+    from app.database import engine, SessionLocal
+    from app.campaigns import models
+
+    make_user("ownerE@example.com", "secretE", "CompanyE")
+    token = login("ownerE@example.com", "secretE")
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.post("/campaigns/", json=sample_campaign_payload("campE"), headers=headers).status_code == 201
+    db = SessionLocal()
+    try:
+        db.add_all([models.CampaignPeriod(campaign_name="campE", period=f"P{i}", impactos_periodo_personas=i,
+                                          impactos_periodo_vehiculos=i) for i in range(4)])
+        db.add_all([models.CampaignSite(campaign_name="campE", codigo_del_sitio=f"S{i}", tipo_de_mueble="Parabus",
+                                        tipo_de_anuncio="Digital", estado="Jalisco", municipio="Zapopan", zm="GDL",
+                                        frecuencia_catorcenal=1.0, frecuencia_mensual=1.0, impactos_catorcenal=i,
+                                        impactos_mensuales=i, alcance_mensual=1.0) for i in range(5)])
+        db.commit()
+    finally:
+        db.close()
+
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if "campaign_periods" in statement or "campaign_sites" in statement:
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        resp = client.get("/campaigns/campE", headers=headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+    assert resp.status_code == 200
+    body = resp.json()
+    assert len(body["periods"]) == 4 and len(body["sites"]) == 5
+    # One query per collection, never a periods x sites product
+    assert len(statements) == 2
+    assert not any("campaign_periods" in s and "campaign_sites" in s for s in statements)
+
+
+def test_export_streams_csv_and_ndjson_with_children():
+    import csv
+    import io
+    import json
+    from app.database import SessionLocal
+    from app.campaigns import models
+
+    make_user("ownerX@example.com", "secretX", "CompanyX")
+    token = login("ownerX@example.com", "secretX")
+    headers = {"Authorization": f"Bearer {token}"}
+    for i in range(3):
+        payload = sample_campaign_payload(f"campX{i}")
+        payload["tipo_campania"] = "catorcenal" if i == 2 else "mensual"
+        assert client.post("/campaigns/", json=payload, headers=headers).status_code == 201
+    db = SessionLocal()
+    try:
+        db.add(models.CampaignPeriod(campaign_name="campX0", period="P1", impactos_periodo_personas=1,
+                                     impactos_periodo_vehiculos=2))
+        db.add(models.CampaignSite(campaign_name="campX0", codigo_del_sitio="S1", tipo_de_mueble="Parabus",
+                                   tipo_de_anuncio="Digital", estado="Jalisco", municipio="Zapopan", zm="GDL",
+                                   frecuencia_catorcenal=1.0, frecuencia_mensual=1.0, impactos_catorcenal=3,
+                                   impactos_mensuales=4, alcance_mensual=1.0))
+        db.commit()
+    finally:
+        db.close()
+
+    resp = client.get("/campaigns/export?format=ndjson&include_children=true", headers=headers)
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    assert [c["name"] for c in lines] == ["campX0", "campX1", "campX2"]
+    assert lines[0]["periods"][0]["period"] == "P1"
+    assert lines[0]["sites"][0]["codigo_del_sitio"] == "S1"
+    assert lines[1]["periods"] == [] and lines[1]["sites"] == []
+
+    # Same filters as the listing
+    resp = client.get("/campaigns/export?format=csv&tipo_campania=mensual", headers=headers)
+    assert resp.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(resp.text)))
+    assert [r["name"] for r in rows] == ["campX0", "campX1"]
+    assert "record_type" not in rows[0]
+
+    resp = client.get("/campaigns/export?format=csv&include_children=true", headers=headers)
+    rows = list(csv.DictReader(io.StringIO(resp.text)))
+    assert [(r["record_type"], r["name"]) for r in rows][:3] == [
+        ("campaign", "campX0"), ("period", "campX0"), ("site", "campX0"),
+    ]
+    assert rows[2]["codigo_del_sitio"] == "S1" and rows[2]["site_id"]
+
+
+def test_campaign_stats_aggregates_sites_and_periods():
+    from app.database import SessionLocal
+    from app.campaigns import models
+
+    make_user("ownerS@example.com", "secretS", "CompanyS")
+    token = login("ownerS@example.com", "secretS")
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.post("/campaigns/", json=sample_campaign_payload("campS"), headers=headers).status_code == 201
+    sites = [("S1", "Parabus", "Jalisco", 100), ("S2", "Parabus", "Jalisco", 300),
+             ("S3", "Espectacular", "CDMX", 200), ("S4", "Espectacular", "Jalisco", 50)]
+    db = SessionLocal()
+    try:
+        for code, mueble, estado, imp in sites:
+            db.add(models.CampaignSite(campaign_name="campS", codigo_del_sitio=code, tipo_de_mueble=mueble,
+                                       tipo_de_anuncio="Digital", estado=estado, municipio="M", zm="Z",
+                                       frecuencia_catorcenal=1.0, frecuencia_mensual=1.0, impactos_catorcenal=imp,
+                                       impactos_mensuales=imp, alcance_mensual=1.5))
+        for period, pe, ve in [("2025-02", 20, 2), ("2025-01", 10, 1)]:
+            db.add(models.CampaignPeriod(campaign_name="campS", period=period, impactos_periodo_personas=pe,
+                                         impactos_periodo_vehiculos=ve))
+        db.commit()
+    finally:
+        db.close()
+
+    resp = client.get("/campaigns/campS/stats?top=2", headers=headers)
+    assert resp.status_code == 200
+    stats = resp.json()
+    assert stats["total_sites"] == 4
+    assert stats["by_tipo_de_mueble"] == [
+        {"tipo_de_mueble": "Parabus", "sites": 2, "impactos_mensuales": 400, "alcance_mensual": 3.0},
+        {"tipo_de_mueble": "Espectacular", "sites": 2, "impactos_mensuales": 250, "alcance_mensual": 3.0},
+    ]
+    assert stats["by_estado"][0] == {"estado": "Jalisco", "sites": 3, "impactos_mensuales": 450}
+    assert [s["codigo_del_sitio"] for s in stats["top_sites"]] == ["S2", "S3"]
+    assert [p["period"] for p in stats["periods"]] == ["2025-01", "2025-02"]
+
+    # Other companies cannot read it
+    make_user("ownerS2@example.com", "secretS2", "CompanyS2")
+    other = login("ownerS2@example.com", "secretS2")
+    assert client.get("/campaigns/campS/stats", headers={"Authorization": f"Bearer {other}"}).status_code == 404
+
+
+def test_campaign_detail_and_list_are_cached_until_written():
+    from sqlalchemy import event
+    from app.database import engine
+    from app.campaigns import cache
+
+    make_user("ownerL@example.com", "secretL", "CompanyL")
+    token = login("ownerL@example.com", "secretL")
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.post("/campaigns/", json=sample_campaign_payload("campL"), headers=headers).status_code == 201
+
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if "FROM campaigns" in statement:
+            statements.append(statement)
+
+    first = client.get("/campaigns/campL", headers=headers).json()
+    listing = client.get("/campaigns/?limit=10", headers=headers).json()
+    hits = cache.detail_cache.stats()["hit"]
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        assert client.get("/campaigns/campL", headers=headers).json() == first
+        assert client.get("/campaigns/?limit=10", headers=headers).json() == listing
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+    assert statements == []
+    assert cache.detail_cache.stats()["hit"] == hits + 1
+
+    # Writes drop the company's entries
+    assert client.put("/campaigns/campL", json={"alcance": 900}, headers=headers).status_code == 200
+    assert client.get("/campaigns/campL", headers=headers).json()["alcance"] == 900
+    assert client.get("/campaigns/?limit=10", headers=headers).json()["data"][0]["alcance"] == 900
+    assert client.delete("/campaigns/campL", headers=headers).status_code == 204
+    assert client.get("/campaigns/campL", headers=headers).status_code == 404
+    assert client.get("/campaigns/?limit=10", headers=headers).json()["total"] == 0
+
+
+def test_cached_payloads_are_dropped_on_commit_not_flush():
+    from app.database import SessionLocal
+    from app.campaigns import cache, models
+
+    db = SessionLocal()
+    try:
+        db.add(models.Campaign(name="campFlush", company_id=77))
+        db.commit()
+        cache.detail_cache.set((77, "campFlush"), {"name": "campFlush"})
+        db.get(models.Campaign, "campFlush").alcance = 5
+        db.flush()
+        # A reader refilling the cache between flush and commit sees the old
+        # row; the entry it stores must not survive the commit
+        assert cache.detail_cache.get((77, "campFlush")) is not None
+        db.commit()
+        assert cache.detail_cache.get((77, "campFlush")) is None
+
+        cache.detail_cache.set((77, "campFlush"), {"name": "campFlush"})
+        db.get(models.Campaign, "campFlush").alcance = 6
+        db.flush()
+        db.rollback()
+        assert cache.detail_cache.get((77, "campFlush")) is not None
+        db.commit()
+        assert cache.detail_cache.get((77, "campFlush")) is not None
+    finally:
+        db.close()
+
+
+def test_ttl_cache_evicts_least_recently_used_and_expired():
+    from app.cache import TTLCache
+
+    c = TTLCache("test", maxsize=2, ttl=60)
+    c.set((1, "a"), "A")
+    c.set((1, "b"), "B")
+    assert c.get((1, "a")) == "A"
+    c.set((2, "c"), "C")
+    assert c.get((1, "b")) is None
+    assert c.stats()["eviction"] == 1
+    c.invalidate(1)
+    assert c.get((1, "a")) is None and c.get((2, "c")) == "C"
+
+    expired = TTLCache("test", maxsize=2, ttl=-1)
+    expired.set((1, "a"), "A")
+    assert expired.get((1, "a")) is None
+    assert expired.stats() == {"hit": 0, "miss": 1, "eviction": 1, "size": 0}
+    # A per-entry ttl overrides the cache-wide one
+    expired.set((1, "b"), "B", ttl=60)
+    assert expired.get((1, "b")) == "B"
+
+
+def test_conditional_get_uses_row_version():
+    from sqlalchemy import event
+    from app.database import engine, SessionLocal
+    from app.campaigns import models
+
+    make_user("ownerV@example.com", "secretV", "CompanyV")
+    token = login("ownerV@example.com", "secretV")
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.post("/campaigns/", json=sample_campaign_payload("campV"), headers=headers).status_code == 201
+
+    resp = client.get("/campaigns/campV", headers=headers)
+    etag = resp.headers["etag"]
+    assert resp.headers["last-modified"]
+    list_etag = client.get("/campaigns/?limit=10", headers=headers).headers["etag"]
+
+    # Revalidation does not load children, even when the payload cache is cold
+    from app.campaigns import cache
+    cache.invalidate()
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        resp = client.get("/campaigns/campV", headers={**headers, "If-None-Match": etag})
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+    assert resp.status_code == 304 and resp.content == b""
+    assert resp.headers["etag"] == etag
+    assert not any("campaign_sites" in s or "campaign_periods" in s for s in statements)
+    resp = client.get("/campaigns/?limit=10", headers={**headers, "If-None-Match": list_etag})
+    assert resp.status_code == 304
+
+    # A new site bumps the campaign's version
+    db = SessionLocal()
+    try:
+        db.add(models.CampaignSite(campaign_name="campV", codigo_del_sitio="S1", tipo_de_mueble="Parabus",
+                                   tipo_de_anuncio="Digital", estado="Jalisco", municipio="Zapopan", zm="GDL",
+                                   frecuencia_catorcenal=1.0, frecuencia_mensual=1.0, impactos_catorcenal=1,
+                                   impactos_mensuales=1, alcance_mensual=1.0))
+        db.commit()
+    finally:
+        db.close()
+    resp = client.get("/campaigns/campV", headers={**headers, "If-None-Match": etag})
+    assert resp.status_code == 200
+    assert len(resp.json()["sites"]) == 1
+    assert resp.headers["etag"] != etag
+    resp = client.get("/campaigns/?limit=10", headers={**headers, "If-None-Match": list_etag})
+    assert resp.status_code == 200
+
+    # So does an update through the API
+    etag = resp.headers["etag"]
+    assert client.put("/campaigns/campV", json={"alcance": 700}, headers=headers).status_code == 200
+    resp = client.get("/campaigns/?limit=10", headers={**headers, "If-None-Match": etag})
+    assert resp.status_code == 200 and resp.json()["data"][0]["alcance"] == 700
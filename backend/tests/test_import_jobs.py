@@ -0,0 +1,176 @@
+import io
+import os
+# In-memory database shared across threads; imports run in the request thread
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+os.environ["TESTING"] = "1"
+
+import pandas as pd
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app import database
+from app.campaigns import models
+from app.ingest import imports
+from app.ingest.loader import CAMPAIGN_COLUMNS, SITE_COLUMNS
+from app.security import get_current_user
+
+
+client = TestClient(app)
+
+
+class _FakeUser:
+    def __init__(self, company_id=1, role='admin'):
+        self.company_id = company_id
+        self.role = role
+
+
+def _campaign(name, **values):
+    row = {c: 1 for c in CAMPAIGN_COLUMNS}
+    row.update(name=name, tipo_campania='mensual', fecha_inicio='2025-01-01', fecha_fin='2025-01-31')
+    row.update(values)
+    return row
+
+
+def _upload(frame, source='campaigns', filename='upload.csv'):
+    body = frame.to_csv(index=False).encode()
+    return client.post(f'/campaigns/import?source={source}', files={'file': (filename, io.BytesIO(body), 'text/csv')})
+
+
+def test_import_campaigns_and_sites_reports_row_errors():
+    app.dependency_overrides[get_current_user] = lambda: _FakeUser(company_id=1)
+    db = database.SessionLocal()
+    try:
+        db.add(models.Campaign(name='IMPORT-foreign', company_id=2))
+        db.add(models.Campaign(name='IMPORT-unowned', company_id=None, alcance=3))
+        db.commit()
+        campaigns = pd.DataFrame([
+            _campaign('IMPORT-1'),
+            _campaign('IMPORT-2', alcance=5),
+            _campaign('IMPORT-1', alcance=9),
+            _campaign('IMPORT-3', fecha_inicio='31/01/2025'),
+            _campaign('IMPORT-4', impactos_personas=3e10),
+            _campaign('IMPORT-foreign'),
+            _campaign('IMPORT-unowned'),
+            _campaign(None),
+        ])
+        resp = _upload(campaigns)
+        assert resp.status_code == 202
+        job = resp.json()
+        assert resp.headers['location'] == f"/jobs/{job['id']}"
+
+        resp = client.get(f"/jobs/{job['id']}")
+        assert resp.status_code == 200
+        job = resp.json()
+        assert job['status'] == 'succeeded' and job['progress'] == 1.0
+        assert (job['rows_total'], job['rows_processed'], job['inserted'], job['updated'], job['failed']) == \
+            (8, 8, 2, 0, 6)
+        assert {e['row']: e['error'] for e in job['errors']} == {
+            3: 'Duplicate key: an earlier row was imported',
+            4: 'Invalid fecha_inicio: expected YYYY-MM-DD',
+            5: 'Invalid impactos_personas: out of range',
+            6: 'Campaign belongs to another company',
+            7: 'Campaign belongs to another company',
+            8: 'Missing name',
+        }
+        unowned = db.get(models.Campaign, 'IMPORT-unowned')
+        assert (unowned.company_id, unowned.alcance) == (None, 3)
+        stored = db.get(models.Campaign, 'IMPORT-2')
+        assert (stored.company_id, stored.alcance, stored.version) == (1, 5, 1)
+
+        # Uploading again updates by key and bumps the version
+        resp = _upload(campaigns.iloc[[1]].assign(alcance=6))
+        job = resp.json()
+        assert (job['inserted'], job['updated'], job['failed']) == (0, 1, 0)
+        db.expire_all()
+        stored = db.get(models.Campaign, 'IMPORT-2')
+        assert (stored.alcance, stored.version) == (6, 2)
+
+        sites = pd.DataFrame([{c: 'x' for c in SITE_COLUMNS}] * 3)
+        sites[['frecuencia_catorcenal', 'frecuencia_mensual']] = 1.5
+        sites[['impactos_catorcenal', 'impactos_mensuales', 'alcance_mensual']] = '2149008'
+        sites['name'] = ['IMPORT-1', 'IMPORT-1', 'IMPORT-missing']
+        sites['codigo_del_sitio'] = ['007', '008', '009']
+        job = _upload(sites, source='sites').json()
+        assert (job['inserted'], job['failed']) == (2, 1)
+        assert job['errors'] == [{'row': 3, 'error': 'Unknown campaign'}]
+        site = db.query(models.CampaignSite).filter_by(campaign_name='IMPORT-1', codigo_del_sitio='007').one()
+        assert site.impactos_mensuales == 2149
+        job = _upload(sites.assign(zm='y'), source='sites').json()
+        assert (job['inserted'], job['updated'], job['failed']) == (0, 2, 1)
+        db.expire_all()
+        assert db.get(models.CampaignSite, site.id).zm == 'y'
+    finally:
+        db.query(models.CampaignSite).filter(models.CampaignSite.campaign_name.like('IMPORT-%')).delete(
+            synchronize_session=False)
+        db.query(models.Campaign).filter(models.Campaign.name.like('IMPORT-%')).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+        app.dependency_overrides.pop(get_current_user, None)
+
+
+def test_import_rejects_unusable_uploads_and_hides_other_companies_jobs(tmp_path, monkeypatch):
+    monkeypatch.setattr(imports, 'IMPORT_DIR', str(tmp_path))
+    app.dependency_overrides[get_current_user] = lambda: _FakeUser(company_id=1)
+    try:
+        resp = _upload(pd.DataFrame([_campaign('IMPORT-x')]), filename='upload.xlsx')
+        assert resp.status_code == 415
+        resp = _upload(pd.DataFrame([_campaign('IMPORT-x')]).drop(columns=['alcance']))
+        assert resp.status_code == 422 and 'alcance' in resp.json()['detail']
+        if imports.pq is None:
+            assert _upload(pd.DataFrame([_campaign('IMPORT-x')]), filename='upload.parquet').status_code == 501
+        else:
+            body = io.BytesIO()
+            pd.DataFrame([_campaign('IMPORT-pq')]).to_parquet(body)
+            body.seek(0)
+            resp = client.post('/campaigns/import', files={'file': ('upload.parquet', body, 'application/octet-stream')})
+            job = resp.json()
+            assert (resp.status_code, job['format'], job['rows_total'], job['inserted']) == (202, 'parquet', 1, 1)
+        assert os.listdir(tmp_path) == []
+
+        job = _upload(pd.DataFrame([_campaign('IMPORT-x', fecha_fin='nope')])).json()
+        app.dependency_overrides[get_current_user] = lambda: _FakeUser(company_id=2)
+        assert client.get(f"/jobs/{job['id']}").status_code == 404
+        app.dependency_overrides[get_current_user] = lambda: _FakeUser(company_id=1, role='viewer')
+        assert _upload(pd.DataFrame([_campaign('IMPORT-x')])).status_code == 403
+    finally:
+        db = database.SessionLocal()
+        db.query(models.Campaign).filter(models.Campaign.name.like('IMPORT-%')).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+        app.dependency_overrides.pop(get_current_user, None)
+
+
+def test_recover_settles_jobs_left_by_a_previous_process(tmp_path, monkeypatch):
+    from app.ingest.models import ImportJob
+
+    monkeypatch.setattr(imports, 'IMPORT_DIR', str(tmp_path))
+    db = database.SessionLocal()
+    try:
+        def job(job_id, status, spooled):
+            db.add(ImportJob(id=job_id, company_id=1, source='campaigns', format='csv', status=status,
+                             rows_total=1, rows_processed=0, inserted=0, updated=0, failed=0, errors=[]))
+            if spooled:
+                pd.DataFrame([_campaign('IMPORT-recovered')]).to_csv(imports.spool_path(job_id, 'csv'), index=False)
+
+        job('recover-queued', 'queued', spooled=True)
+        job('recover-lost', 'queued', spooled=False)
+        job('recover-running', 'running', spooled=True)
+        (tmp_path / 'orphan.csv').write_text('name\n')
+        db.commit()
+
+        outcome = imports.recover()
+        assert outcome['requeued'] == ['recover-queued']
+        assert sorted(outcome['failed']) == ['recover-lost', 'recover-running']
+        db.expire_all()
+        assert db.get(ImportJob, 'recover-queued').status == 'succeeded'
+        assert db.get(models.Campaign, 'IMPORT-recovered') is not None
+        for job_id in ('recover-lost', 'recover-running'):
+            failed = db.get(ImportJob, job_id)
+            assert failed.status == 'failed' and failed.finished_at is not None and 'restart' in failed.detail
+        assert os.listdir(tmp_path) == []
+        assert imports.recover() == {'requeued': [], 'failed': []}
+    finally:
+        db.query(ImportJob).filter(ImportJob.id.like('recover-%')).delete(synchronize_session=False)
+        db.query(models.Campaign).filter(models.Campaign.name.like('IMPORT-%')).delete(synchronize_session=False)
+        db.commit()
+        db.close()
@@ -0,0 +1,44 @@
+import os
+import sys
+import random
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.campaigns.intervals import IntervalIndex
+
+
+def _brute_force(items, start, end):
+    return sorted((s, n) for s, e, n in items if s <= end and e >= start)
+
+
+def test_interval_index_matches_brute_force_with_paging():
+    rng = random.Random(7)
+    base = date(2024, 1, 1)
+    items = []
+    for i in range(500):
+        s = base + timedelta(days=rng.randint(0, 700))
+        # A few inverted ranges, as found in dirty source data
+        e = s + timedelta(days=rng.randint(-5, 90))
+        items.append((s, e, f"c{i:04d}"))
+    index = IntervalIndex(items)
+
+    for _ in range(50):
+        q_start = base + timedelta(days=rng.randint(0, 750))
+        q_end = q_start + timedelta(days=rng.randint(0, 120))
+        expected = _brute_force(items, q_start, q_end)
+        assert index.overlapping(q_start, q_end) == expected
+
+        # Walk the same result in pages of 7
+        pages, after = [], None
+        while True:
+            page = index.overlapping(q_start, q_end, after=after, limit=7)
+            pages.extend(page)
+            if len(page) < 7:
+                break
+            after = page[-1]
+        assert pages == expected
+
+
+def test_interval_index_empty():
+    assert IntervalIndex([]).overlapping(date(2025, 1, 1), date(2025, 2, 1)) == []
@@ -0,0 +1,89 @@
+"""Query-plan regression tests for the hot campaign and auth queries.
+
+Each hot query is EXPLAINed against a freshly created schema and the test
+fails when the plan reads a table with a sequential scan. SQLite always
+runs; set EXPLAIN_DATABASE_URL to a disposable PostgreSQL (or wire
+compatible) database to check the same queries there.
+"""
+import os
+import sys
+from datetime import date
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.query_plans import sequential_scans
+from app.campaigns import crud, models
+from app.users import models as users_models
+
+
+def _engines():
+    yield pytest.param(
+        lambda: create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool),
+        id="sqlite",
+    )
+    pg_url = os.getenv("EXPLAIN_DATABASE_URL")
+    yield pytest.param(
+        lambda: create_engine(pg_url),
+        id="postgresql",
+        marks=pytest.mark.skipif(not pg_url, reason="EXPLAIN_DATABASE_URL not set"),
+    )
+
+
+@pytest.fixture(params=list(_engines()))
+def db(request):
+    engine = request.param()
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+        engine.dispose()
+
+
+def _hot_queries(db):
+    Campaign = models.Campaign
+    start, end = date(2025, 1, 1), date(2025, 6, 30)
+    listing = crud._company_campaigns_query(db, 1)
+    by_tipo = crud._company_campaigns_query(db, 1, tipo_campania="mensual")
+    by_date = crud._company_campaigns_query(db, 1, start_date=start, end_date=end)
+    return {
+        "list": listing.order_by(*crud.CAMPAIGN_SORT_KEY).limit(6),
+        "list_keyset": listing.filter(crud._after_key_filter(db, (start, "x"))).order_by(*crud.CAMPAIGN_SORT_KEY).limit(6),
+        "list_by_tipo": by_tipo.order_by(*crud.CAMPAIGN_SORT_KEY).limit(6),
+        "list_by_date": by_date.order_by(*crud.CAMPAIGN_SORT_KEY).limit(6),
+        "count": listing.with_entities(func.count()),
+        "count_by_tipo": by_tipo.with_entities(func.count()),
+        "detail": db.query(Campaign).filter(Campaign.name == "x", Campaign.company_id == 1),
+        "detail_periods": db.query(models.CampaignPeriod).filter(models.CampaignPeriod.campaign_name == "x"),
+        "detail_sites": db.query(models.CampaignSite).filter(models.CampaignSite.campaign_name == "x"),
+        "user_by_email": db.query(users_models.User).filter(users_models.User.email == "a@b.c"),
+        "refresh_token": db.query(users_models.RefreshToken).filter(users_models.RefreshToken.token_hash == b"t" * 32),
+    }
+
+
+HOT_QUERIES = [
+    "list", "list_keyset", "list_by_tipo", "list_by_date", "count", "count_by_tipo",
+    "detail", "detail_periods", "detail_sites", "user_by_email", "refresh_token",
+]
+
+
+@pytest.mark.parametrize("name", HOT_QUERIES)
+def test_hot_query_uses_index(db, name):
+    query = _hot_queries(db)[name]
+    scans = sequential_scans(db, query)
+    assert scans == [], f"{name} falls back to a sequential scan on {scans}"
+
+
+def test_harness_detects_sequential_scan(db):
+    # Sanity check: an unindexed predicate must be reported
+    query = db.query(models.CampaignSite).filter(models.CampaignSite.estado == "Jalisco")
+    assert "campaign_sites" in sequential_scans(db, query)
@@ -37,3 +37,191 @@ def test_seed_idempotent():
     assert len(admins2) == 1
 
     db.close()
+
+
+def test_clean_numbers_matches_clean_number():
+    import pandas as pd
+    values = ['14566-06-26', '2149008', 12133480771678686, 250000.0, 99.9, -3.5, None, float('nan'), '7']
+    expected = [14566, 2149, 12133, 25000, 99, -3, None, None, 7]
+    assert [seed.clean_number(v) for v in values] == expected
+    got = seed.clean_numbers(pd.Series(values, dtype=object)).tolist()
+    assert [None if pd.isna(g) else g for g in got] == expected
+    # Numeric columns take the same path without the string handling
+    floats = pd.Series([1e13, 2e6, 150000.0, 42.0])
+    assert seed.clean_numbers(floats).tolist() == [1000, 2000, 15000, 42] == [seed.clean_number(v) for v in floats]
+
+
+def test_clean_numbers_fallback_is_deterministic():
+    import pandas as pd
+    from app.ingest import cleaning
+
+    frame = pd.DataFrame({'name': ['a', 'b', 'c'], 'value': ['abc', 'abc', '12']})
+    first = cleaning.clean_frame(frame, ['value'], keys=('name',))['value'].tolist()
+    assert all(1000 <= v < 10000 for v in first[:2]) and first[2] == 12
+    # Same row, same value: across runs and whatever the row order
+    assert cleaning.clean_frame(frame, ['value'], keys=('name',))['value'].tolist() == first
+    reversed_frame = frame.iloc[::-1].reset_index(drop=True)
+    assert cleaning.clean_frame(reversed_frame, ['value'], keys=('name',))['value'].tolist() == first[::-1]
+    # Keys tell equal texts apart; without them equal texts clean alike
+    assert first[0] != first[1]
+    assert cleaning.clean_numbers(frame['value'])[0] == cleaning.clean_numbers(frame['value'])[1]
+    assert seed.clean_number('abc') == seed.clean_number('abc')
+    other = cleaning.clean_frame(frame, ['value'], cleaning.Fallback(seed=7), keys=('name',))['value'].tolist()
+    assert other[:2] != first[:2] and other[2] == 12
+
+
+def test_clean_numbers_non_finite_take_the_fallback():
+    import pandas as pd
+    from app.ingest import cleaning
+
+    for values in (pd.Series(['inf', '1e400', '-inf', '1e300', '12'], dtype=object),
+                   pd.Series([float('inf'), -float('inf'), 1e300, 12.0])):
+        cleaned = cleaning.clean_numbers(values).tolist()
+        assert all(1000 <= v < 10000 for v in cleaned[:-1]) and cleaned[-1] == 12
+        assert cleaning.clean_numbers(values).tolist() == cleaned
+
+
+def test_clean_numbers_fit_an_integer_column():
+    import pandas as pd
+    from app.ingest import cleaning
+
+    text = cleaning.clean_numbers(pd.Series(['99999999999-06-26', '1e30', '2147483647-01', '12'])).tolist()
+    assert all(1000 <= v < 10000 for v in text[:2]) and text[2:] == [2147483647, 12]
+    numbers = cleaning.clean_numbers(pd.Series([-3e9, -2147483647.0])).tolist()
+    assert 1000 <= numbers[0] < 10000 and numbers[1] == -2147483647
+    assert 1000 <= seed.clean_number('1e400') < 10000
+
+
+def test_clean_numbers_non_ascii_digits_take_the_fallback():
+    import pandas as pd
+    from app.ingest import cleaning
+
+    cleaned = cleaning.clean_numbers(pd.Series(['²', '①', '12²', '²-06-26', '12'], dtype=object)).tolist()
+    assert all(1000 <= v < 10000 for v in cleaned[:-1]) and cleaned[-1] == 12
+    assert 1000 <= cleaning.clean_value('²') < 10000
+
+
+def test_seed_loads_each_key_once():
+    import pandas as pd
+    from app.campaigns.models import CampaignPeriod, CampaignSite
+
+    load_data()
+    load_data()
+    periods = pd.read_csv('data/bd_campanias_periodos.csv', dtype=str).drop_duplicates(['name', 'period'])
+    sites = pd.read_csv('data/bd_campanias_sitios.csv', dtype=str).drop_duplicates(['name', 'codigo_del_sitio'])
+    db = SessionLocal()
+    try:
+        # Other test modules share the database; count the seeded campaigns only
+        assert db.query(CampaignPeriod).filter(
+            CampaignPeriod.campaign_name.in_(set(periods['name']))).count() == len(periods)
+        assert db.query(CampaignSite).filter(
+            CampaignSite.campaign_name.in_(set(sites['name']))).count() == len(sites)
+        stored = db.query(CampaignPeriod).filter(CampaignPeriod.campaign_name == periods.iloc[0]['name'],
+                                                 CampaignPeriod.period == periods.iloc[0]['period']).one()
+        assert stored.impactos_periodo_vehiculos == seed.clean_number(periods.iloc[0]['impactos_periodo_vehículos'])
+    finally:
+        db.close()
+
+
+def test_delta_sync_writes_only_changes(tmp_path):
+    import shutil
+    import pandas as pd
+    from app.campaigns.models import CampaignPeriod, CampaignSite
+    from app.ingest import delta
+
+    for name in ('bd_campanias_agrupado.csv', 'bd_campanias_periodos.csv', 'bd_campanias_sitios.csv'):
+        shutil.copy(os.path.join('data', name), tmp_path / name)
+    db = SessionLocal()
+    try:
+        delta.sync(db, str(tmp_path))
+        again = delta.sync(db, str(tmp_path))
+        assert all(r.inserted == r.updated == r.deleted == 0 for r in again.values())
+
+        periods = pd.read_csv(tmp_path / 'bd_campanias_periodos.csv', dtype=str).drop_duplicates(['name', 'period'])
+        gone, edited = periods.iloc[0], periods.iloc[1]
+        periods = periods.iloc[1:].copy()
+        periods.loc[periods.index[0], 'impactos_periodo_personas'] = '4321'
+        periods.to_csv(tmp_path / 'bd_campanias_periodos.csv', index=False)
+        sites = pd.read_csv(tmp_path / 'bd_campanias_sitios.csv', dtype=str)
+        sites = pd.concat([sites, sites.iloc[[0]].assign(codigo_del_sitio='DELTA-NEW-SITE')])
+        sites.to_csv(tmp_path / 'bd_campanias_sitios.csv', index=False)
+
+        result = delta.sync(db, str(tmp_path), delete_missing=True)
+        assert (result['periods'].updated, result['periods'].deleted, result['periods'].inserted) == (1, 1, 0)
+        assert (result['sites'].inserted, result['sites'].updated) == (1, 0)
+        assert result['campaigns'].inserted == result['campaigns'].updated == 0
+        stored = db.query(CampaignPeriod).filter(CampaignPeriod.campaign_name == edited['name'],
+                                                 CampaignPeriod.period == edited['period']).one()
+        assert stored.impactos_periodo_personas == 4321
+        assert db.query(CampaignPeriod).filter(CampaignPeriod.campaign_name == gone['name'],
+                                               CampaignPeriod.period == gone['period']).count() == 0
+        assert db.query(CampaignSite).filter(CampaignSite.codigo_del_sitio == 'DELTA-NEW-SITE').count() == 1
+    finally:
+        # Put the shared database back to the repository data
+        delta.sync(db, 'data', delete_missing=True)
+        db.close()
+
+
+def test_stream_ingest_commits_chunks_and_matches_sync(tmp_path):
+    import shutil
+    import pandas as pd
+    from app.campaigns.models import CampaignSite
+    from app.ingest import delta, stream
+
+    for name in ('bd_campanias_agrupado.csv', 'bd_campanias_periodos.csv', 'bd_campanias_sitios.csv'):
+        shutil.copy(os.path.join('data', name), tmp_path / name)
+    sites = pd.read_csv(tmp_path / 'bd_campanias_sitios.csv', dtype=str)
+    extra = pd.concat([sites.iloc[[0]]] * 300, ignore_index=True)
+    extra['codigo_del_sitio'] = [f'STREAM-{i % 250}' for i in range(300)]  # 50 repeated keys
+    pd.concat([sites, extra]).to_csv(tmp_path / 'bd_campanias_sitios.csv', index=False)
+
+    progress = []
+    db = SessionLocal()
+    try:
+        # A budget of a few hundred rows per chunk
+        results = stream.stream(str(tmp_path), memory_limit_mb=0.5, progress=lambda name, r: progress.append(name))
+        assert results['sites'].chunks > 1 and progress.count('sites') == results['sites'].chunks
+        assert results['sites'].inserted == 250
+        assert results['sites'].rows == len(sites) + 300
+        assert db.query(CampaignSite).filter(CampaignSite.codigo_del_sitio.like('STREAM-%')).count() == 250
+        # Same end state as the in-memory sync
+        again = delta.sync(db, str(tmp_path))
+        assert all(r.inserted == r.updated == 0 for r in again.values())
+    finally:
+        delta.sync(db, 'data', delete_missing=True)
+        db.close()
+
+
+def test_stream_ingest_stops_when_a_chunk_does_not_fit_the_budget(tmp_path, monkeypatch):
+    import shutil
+    import pandas as pd
+    import pytest
+    from app.campaigns.models import CampaignSite
+    from app.ingest import delta, stream
+
+    for name in ('bd_campanias_agrupado.csv', 'bd_campanias_periodos.csv', 'bd_campanias_sitios.csv'):
+        shutil.copy(os.path.join('data', name), tmp_path / name)
+    sites = pd.read_csv(tmp_path / 'bd_campanias_sitios.csv', dtype=str)
+    wide = pd.concat([sites.iloc[[0]]] * 400, ignore_index=True)
+    wide['codigo_del_sitio'] = [f'WIDE-{i}' for i in range(400)]
+    wide['zm'] = 'x' * 2000
+    pd.concat([sites, wide]).to_csv(tmp_path / 'bd_campanias_sitios.csv', index=False)
+
+    sizes = []
+    pieces = stream._pieces
+    monkeypatch.setattr(stream, '_pieces', lambda *args: (sizes.append(stream._frame_bytes(p)) or p
+                                                          for p in pieces(*args)))
+    db = SessionLocal()
+    try:
+        # The sample sizes the chunks for the narrow rows: the file is read
+        # in one chunk, which measures over the budget and is split
+        results = stream.stream(str(tmp_path), memory_limit_mb=4)
+        assert results['sites'].chunks > 1 and results['sites'].inserted == 400
+        assert max(sizes) * stream.CHUNK_OVERHEAD <= 4 * 2 ** 20
+        # Not even 100 wide rows fit
+        with pytest.raises(stream.MemoryBudgetExceeded, match='sites'):
+            stream.stream(str(tmp_path), memory_limit_mb=0.5)
+    finally:
+        delta.sync(db, 'data', delete_missing=True)
+        assert db.query(CampaignSite).filter(CampaignSite.codigo_del_sitio.like('WIDE-%')).count() == 0
+        db.close()
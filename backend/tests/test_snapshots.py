@@ -0,0 +1,79 @@
+import io
+import os
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+os.environ["TESTING"] = "1"
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app import database
+from app.campaigns import models, snapshots
+from app.security import get_current_user
+
+
+client = TestClient(app)
+
+
+class _FakeUser:
+    def __init__(self, company_id=1, role='admin'):
+        self.company_id = company_id
+        self.role = role
+
+
+def test_snapshot_write_list_download_and_prune(monkeypatch, tmp_path):
+    monkeypatch.setattr(snapshots, "SNAPSHOT_DIR", str(tmp_path))
+    app.dependency_overrides[get_current_user] = lambda: _FakeUser(company_id=7)
+    db = database.SessionLocal()
+    try:
+        db.add_all([models.Campaign(name='SNAP-1', company_id=7), models.Campaign(name='SNAP-2', company_id=7),
+                    models.Campaign(name='SNAP-other', company_id=8)])
+        db.flush()
+        db.add_all([models.CampaignPeriod(campaign_name='SNAP-1', period='2025-01', impactos_periodo_personas=10)])
+        db.add_all([models.CampaignSite(campaign_name=name, codigo_del_sitio=f'{name}-{i}', estado=estado,
+                                        impactos_mensuales=i)
+                    for name in ('SNAP-1', 'SNAP-2', 'SNAP-other') for i, estado in enumerate(['Jalisco', 'Nuevo León'] * 3)])
+        db.commit()
+
+        resp = client.post('/campaigns/snapshots')
+        if snapshots.pa is None:
+            assert resp.status_code == 501
+            return
+        assert resp.status_code == 201
+        first = resp.json()
+        assert first['company_id'] == 7
+        assert {name: table['rows'] for name, table in first['tables'].items()} == {
+            'campaigns': 2, 'campaign_periods': 1, 'campaign_sites': 12}
+
+        second = client.post('/campaigns/snapshots').json()
+        resp = client.get('/campaigns/snapshots')
+        assert resp.status_code == 200
+        assert [s['version'] for s in resp.json()] == [second['version'], first['version']]
+
+        resp = client.get('/campaigns/snapshots/latest/campaign_sites')
+        assert resp.status_code == 200
+        assert resp.headers['content-type'] == 'application/vnd.apache.parquet'
+        parquet = snapshots.pq.ParquetFile(io.BytesIO(resp.content))
+        assert parquet.metadata.num_rows == 12
+        estado = parquet.metadata.row_group(0).column(parquet.schema_arrow.get_field_index('estado'))
+        assert 'RLE_DICTIONARY' in estado.encodings
+        assert (estado.statistics.min, estado.statistics.max) == ('Jalisco', 'Nuevo León')
+
+        sites = snapshots.read_table(7, 'campaign_sites', filters=[('campaign_name', '=', 'SNAP-2')])
+        assert sites.num_rows == 6
+        assert set(sites.column('estado').to_pylist()) == {'Jalisco', 'Nuevo León'}
+
+        assert client.get(f"/campaigns/snapshots/{first['version']}/campaigns").status_code == 200
+        assert client.get('/campaigns/snapshots/20000101T000000000000Z/campaigns').status_code == 404
+        assert client.get('/campaigns/snapshots/..%2F..%2Fetc/campaigns').status_code == 404
+        assert client.get('/campaigns/snapshots/latest/users').status_code == 422
+
+        app.dependency_overrides[get_current_user] = lambda: _FakeUser(company_id=8, role='viewer')
+        assert client.get('/campaigns/snapshots').json() == []
+        assert client.get('/campaigns/snapshots/latest/campaigns').status_code == 404
+        assert client.post('/campaigns/snapshots').status_code == 403
+
+        assert snapshots.prune(7, keep=1) == [first['version']]
+        assert snapshots.versions(7) == [second['version']]
+    finally:
+        db.close()
+        app.dependency_overrides.clear()
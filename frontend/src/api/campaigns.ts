@@ -1,5 +1,5 @@
 import api from './client';
-import { Campaign, CampaignDetail } from '../types/campaign';
+import { Campaign, CampaignDetail, CampaignStats } from '../types/campaign';
 
 export const getCampaigns = async (
     page: number,
@@ -26,15 +26,32 @@ export const getCampaignDetail = async (campaignId: string): Promise<CampaignDet
     return response.data;
 };
 
+export const getCampaignStats = async (campaignId: string, top = 10): Promise<CampaignStats> => {
+    const response = await api.get(`/campaigns/${campaignId}/stats?top=${top}`);
+    return response.data;
+};
+
+// Largest page the search endpoint serves
+const SEARCH_PAGE_SIZE = 500;
+
 export const searchCampaignsByDate = async (
     startDate: string,
     endDate: string
 ): Promise<Campaign[]> => {
-    const params = new URLSearchParams({
-        start_date: startDate,
-        end_date: endDate,
-    });
-
-    const response = await api.get(`/campaigns/search-by-date/?${params}`);
-    return response.data;
+    // The endpoint is paginated: follow X-Next-Cursor until the last page
+    const campaigns: Campaign[] = [];
+    let after: string | undefined;
+    do {
+        const params = new URLSearchParams({
+            start_date: startDate,
+            end_date: endDate,
+            limit: SEARCH_PAGE_SIZE.toString(),
+            ...(after && { after }),
+        });
+        const response = await api.get(`/campaigns/search-by-date/?${params}`);
+        campaigns.push(...response.data);
+        const next = response.headers['x-next-cursor'];
+        after = typeof next === 'string' && next ? next : undefined;
+    } while (after);
+    return campaigns;
 };
@@ -11,4 +11,23 @@ export const createUser = async (payload: CreateUserPayload) => {
     return res.data;
 };
 
-export default { createUser };
+export interface BulkUserResult {
+    index: number;
+    email: string;
+    user: { id: number; email: string; is_active: boolean; company_id?: number | null; role?: string | null } | null;
+    error: string | null;
+}
+
+export interface BulkCreateUsersResponse {
+    created: number;
+    failed: number;
+    results: BulkUserResult[];
+}
+
+// Up to BULK_USERS_MAX (default 1000) users per call; failures are per entry
+export const createUsers = async (payload: CreateUserPayload[]): Promise<BulkCreateUsersResponse> => {
+    const res = await api.post('/auth/create_users', payload);
+    return res.data;
+};
+
+export default { createUser, createUsers };
@@ -54,3 +54,12 @@ export interface CampaignDetail extends Campaign {
     periods: CampaignPeriod[];
     sites: CampaignSite[];
 }
+
+export interface CampaignStats {
+    campaign_name: string;
+    total_sites: number;
+    by_tipo_de_mueble: { tipo_de_mueble: string | null; sites: number; impactos_mensuales: number; alcance_mensual: number }[];
+    by_estado: { estado: string | null; sites: number; impactos_mensuales: number }[];
+    top_sites: { codigo_del_sitio: string | null; impactos_mensuales: number }[];
+    periods: { period: string | null; impactos_periodo_personas: number; impactos_periodo_vehiculos: number }[];
+}